@@ -19,12 +19,14 @@
 
 __author__ = 'Tim Pederick'
 __version__ = '0.0_1.1' # The _N.n part is the OpenVG API version wrapped.
-__all__ = ['context', 'matrix', 'native', 'path',
+__all__ = ['assets', 'chart', 'context', 'damage', 'farm', 'fit', 'geometry',
+           'matrix', 'native', 'path', 'pick', 'profile', 'render', 'server',
+           'stroke', 'tiles',
            'flatten', 'unflatten',
            'OpenVGError', 'BadHandleError', 'IllegalArgumentError',
            'OutOfMemoryError', 'PathCapabilityError',
            'UnsupportedImageFormatError', 'UnsupportedPathFormatError',
-           'ImageInUseError', 'NoContextError',
+           'ImageInUseError', 'NoContextError', 'ContextThreadError',
            'error_codes']
 
 # Standard library imports.
@@ -157,6 +159,11 @@ class NoContextError(OpenVGError):
     default_msg = 'no current OpenVG context'
 
 
+class ContextThreadError(OpenVGError):
+    '''A context was used from a thread in which it is not current.'''
+    default_msg = 'context is current in another thread'
+
+
 class BadWarpError(OpenVGError):
     '''There is no non-degenerate transform that meets the constraints.'''
     default_msg = 'no warp meets constraints'
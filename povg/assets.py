@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+
+'''Path and image assets shared between processes.
+
+Worker processes that each parse and hold the same assets multiply the
+memory they use by the number of workers. An AssetStore instead packs
+the segment commands and coordinates of paths, and the pixels of images,
+into shared memory once. Workers map the same pages, and upload assets
+to their own contexts straight from them, so memory stays flat however
+many workers there are.
+
+    store = AssetStore()
+    store.add_path('logo', logo_path)
+    store.add_image('paper', pixels, 256, 256)
+    with Farm(512, 512) as farm:
+        frames = farm.map(draw_page, [(store, page) for page in pages])
+
+    def draw_page(store, page):
+        store.path('logo').draw(fill=True)
+
+'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+__all__ = ['AssetKinds', 'Asset', 'AssetStore']
+
+# Standard library imports.
+from collections import namedtuple
+from ctypes import c_ubyte, sizeof
+from multiprocessing import shared_memory
+
+# Local imports.
+from . import native, OpenVGError
+from .context import ImageQuality
+from .farm import attach
+from .params import ImageFormats, PathCapabilities, PathFormats
+from .path import Path, c_datatypes, data_array, path_data
+
+AssetKinds = namedtuple('AssetKinds_tuple', ('PATH', 'IMAGE'))('path', 'image')
+
+# Where an asset is, and what is needed to upload it. The details are,
+# for a path: its format, datatype, scale, bias and number of segments;
+# and for an image: its width, height, format and stride.
+Asset = namedtuple('Asset', ('kind', 'segment', 'offset', 'size', 'details'))
+
+def _align(offset, alignment=8):
+    '''Round an offset up to a multiple of an alignment.'''
+    return -(-offset // alignment) * alignment
+
+class AssetStore:
+    '''Paths and images, kept in shared memory for any process to use.
+
+    The process that creates a store adds assets to it, and owns its
+    shared memory. The store can then be pickled and sent to any number
+    of other processes (as an argument of a Farm drawing function, for
+    instance), which only receive the index of the assets. Each process
+    maps the shared memory the first time it needs it.
+
+    Assets added after a copy of the store was sent are not known to
+    that copy; send it again to share them.
+
+    Instance attributes:
+        segment_size -- The size of each shared memory segment that
+            assets are packed into. Assets larger than this get a
+            segment of their own.
+        owner -- Whether this process created the store, and so may add
+            assets to it and must close it.
+
+    '''
+    def __init__(self, segment_size=16 * 2 ** 20):
+        '''Create an empty store.
+
+        Keyword arguments:
+            segment_size -- As the instance attribute. The default is
+                16 MiB.
+
+        '''
+        self.segment_size, self.owner = segment_size, True
+        self._index = {}
+        self._blocks = {}
+        self._current, self._used = None, 0
+        self._loaded = {}
+
+    def __getstate__(self):
+        return {'segment_size': self.segment_size, '_index': self._index}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.owner = False
+        self._blocks = {}
+        self._current, self._used = None, 0
+        self._loaded = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def __getitem__(self, name):
+        '''Get the Asset named tuple describing an asset.'''
+        return self._index[name]
+
+    def close(self):
+        '''Forget the assets, and free the shared memory if it is owned.
+
+        Paths and images already uploaded are not affected. Any buffers
+        got from buffer() become invalid.
+
+        '''
+        self.unload()
+        for block in self._blocks.values():
+            try:
+                block.close()
+            except BufferError:
+                # Buffers still refer to it, but it goes once they do.
+                pass
+            if self.owner:
+                block.unlink()
+        self._blocks = {}
+        self._index = {}
+
+    def _block(self, segment):
+        '''Get a shared memory segment, mapping it if need be.'''
+        try:
+            return self._blocks[segment]
+        except KeyError:
+            return attach(segment)
+
+    def _store(self, name, kind, details, parts):
+        '''Copy the parts of an asset into shared memory, and index it.'''
+        if not self.owner:
+            raise ValueError('assets can only be added where the store '
+                             'was created')
+        if name in self._index:
+            raise ValueError('there is already an asset named '
+                             '{!r}'.format(name))
+        size = 0
+        for part in parts:
+            size = _align(size) + len(part)
+
+        offset = _align(self._used)
+        if self._current is None or offset + size > self.segment_size:
+            block = shared_memory.SharedMemory(
+                create=True, size=max(size, self.segment_size))
+            self._blocks[block.name] = block
+            offset = 0
+            if size < self.segment_size:
+                # Later assets can share this one's segment.
+                self._current = block.name
+        else:
+            block = self._blocks[self._current]
+        if block.name == self._current:
+            self._used = offset + size
+
+        position = offset
+        for part in parts:
+            position = _align(position)
+            block.buf[position:position + len(part)] = part
+            position += len(part)
+        self._index[name] = Asset(kind, block.name, offset, size, details)
+
+    def add_path(self, name, path_or_data,
+                 path_format=PathFormats.STANDARD, datatype=None,
+                 scale=None, bias=None):
+        '''Add a path (or a glyph outline) to the store.
+
+        Keyword arguments:
+            name -- The name to give the asset. It must not already be in
+                use.
+            path_or_data -- A Path whose segment data is known (see
+                Path.segment_data()), or a 2-tuple of segment commands
+                and raw coordinate data.
+            path_format -- The command format of the path. The default is
+                PathFormats.STANDARD.
+            datatype, scale, bias -- The datatype, scale and bias of the
+                data. These are ignored for a Path, which has its own;
+                otherwise, any omitted take their defaults.
+        Raises:
+            ValueError -- If the name is already in use, or the store was
+                not created in this process.
+
+        '''
+        commands, data, datatype, scale, bias = path_data(path_or_data,
+                                                          datatype, scale,
+                                                          bias)
+        self._store(name, AssetKinds.PATH,
+                    (path_format, datatype, scale, bias, len(commands)),
+                    (bytes(commands), bytes(data_array(data, datatype))))
+
+    def add_image(self, name, pixels, width, height,
+                  image_format=ImageFormats.sRGBA_8888, stride=None):
+        '''Add an image to the store.
+
+        Keyword arguments:
+            name -- The name to give the asset. It must not already be in
+                use.
+            pixels -- A buffer of the pixel data, row by row from the
+                bottom row up (as OpenVG numbers them).
+            width, height -- The size of the image, in pixels.
+            image_format -- The format of the pixel data, from the
+                ImageFormats named tuple. The default is sRGBA_8888.
+            stride -- The number of bytes from the start of one row to
+                the start of the next. If omitted, the rows are taken to
+                be packed together at four bytes to a pixel.
+        Raises:
+            ValueError -- If the name is already in use, the store was
+                not created in this process, or there are too few bytes
+                of pixel data.
+
+        '''
+        stride = width * 4 if stride is None else stride
+        pixels = memoryview(pixels).cast('B')
+        if len(pixels) < stride * height:
+            raise ValueError('too few bytes for a {}×{} '
+                             'image'.format(width, height))
+        self._store(name, AssetKinds.IMAGE,
+                    (width, height, image_format, stride),
+                    (pixels[:stride * height],))
+
+    def buffer(self, name):
+        '''Get the shared memory holding an asset, without copying it.
+
+        For a path, the segment commands come first, followed (at the
+        next multiple of eight bytes) by the raw coordinate data.
+
+        Returns:
+            A memoryview of the asset's bytes. It must be released before
+            the store is closed.
+
+        '''
+        asset = self._index[name]
+        block = self._block(asset.segment)
+        return block.buf[asset.offset:asset.offset + asset.size]
+
+    def _array(self, asset, ctype, start, count):
+        '''Get a native array over part of an asset, without copying.'''
+        return (ctype * count).from_buffer(self._block(asset.segment).buf,
+                                           asset.offset + start)
+
+    def path(self, name, capabilities=PathCapabilities(ALL=1)):
+        '''Get a path from the store, uploading it if need be.
+
+        The path is uploaded to the current context straight from shared
+        memory, the first time it is asked for in this process. After
+        that, the same Path object is returned, so it must only be used
+        with that context.
+
+        Keyword arguments:
+            name -- The name of the asset.
+            capabilities -- The capabilities of the path, if it has not
+                already been uploaded. The default is all capabilities.
+        Returns:
+            A Path. It does not keep a client-side copy of its data.
+
+        '''
+        try:
+            return self._loaded[name]
+        except KeyError:
+            pass
+        asset = self._index[name]
+        if asset.kind != AssetKinds.PATH:
+            raise TypeError('{!r} is not a path'.format(name))
+        path_format, datatype, scale, bias, num_segments = asset.details
+        ctype = c_datatypes[datatype]
+        start = _align(num_segments)
+        num_coords = (asset.size - start) // sizeof(ctype)
+
+        path = Path(path_format, datatype, scale, bias, num_segments,
+                    num_coords, capabilities, keep_data=False)
+        native.vgAppendPathData(path, num_segments,
+                                self._array(asset, c_ubyte, 0, num_segments),
+                                self._array(asset, ctype, start, num_coords))
+        self._loaded[name] = path
+        return path
+
+    def image(self, name, quality=(ImageQuality.NON_ANTIALIASED |
+                                   ImageQuality.FASTER |
+                                   ImageQuality.BETTER)):
+        '''Get an image from the store, uploading it if need be.
+
+        As with path(), the image is uploaded straight from shared memory
+        the first time it is asked for in this process, and must then
+        only be used with the same context.
+
+        Keyword arguments:
+            name -- The name of the asset.
+            quality -- The allowed resampling qualities of the image, as a
+                bitmask of values from the ImageQuality named tuple. The
+                default is all of them.
+        Returns:
+            The native handle of the image.
+
+        '''
+        try:
+            return self._loaded[name]
+        except KeyError:
+            pass
+        asset = self._index[name]
+        if asset.kind != AssetKinds.IMAGE:
+            raise TypeError('{!r} is not an image'.format(name))
+        width, height, image_format, stride = asset.details
+
+        handle = native.vgCreateImage(image_format, width, height, quality)
+        if not handle:
+            raise OpenVGError('image creation unexpectedly failed')
+        native.vgImageSubData(handle,
+                              self._array(asset, c_ubyte, 0, asset.size),
+                              stride, image_format, 0, 0, width, height)
+        self._loaded[name] = handle
+        return handle
+
+    def unload(self):
+        '''Free every path and image uploaded from the store.
+
+        This must be called with the context they were uploaded to still
+        current. They are uploaded again if they are asked for later.
+
+        '''
+        loaded, self._loaded = self._loaded, {}
+        for name, value in loaded.items():
+            if self._index[name].kind == AssetKinds.IMAGE:
+                native.vgDestroyImage(value)
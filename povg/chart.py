@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+'''Chart-oriented path builders.
+
+A time series with millions of samples, drawn into a few hundred pixels
+of width, needs no more than a few points per pixel column to look
+exactly the same. The builders in this module reduce samples to those
+points before they ever reach OpenVG.
+
+'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+__all__ = ['m4_columns', 'LineSeries']
+
+# Standard library imports.
+from bisect import bisect_left
+from math import floor
+
+# Local imports.
+from .params import PathDatatypes
+from .path import Path, PathSegments, SegmentCommand
+
+def _as_list(values):
+    '''Get a list from any sequence, including arrays that have tolist().'''
+    try:
+        return values.tolist()
+    except AttributeError:
+        return list(values)
+
+def m4_columns(xs, ys, x_start, x_per_column, lo=0, hi=None):
+    '''Reduce samples to the first, lowest, highest and last per column.
+
+    This is M4 decimation: a line drawn through the four points kept for
+    each pixel column rasterises identically to one drawn through every
+    sample in that column.
+
+        >>> list(m4_columns([0, 1, 2, 3, 4, 5], [5, 1, 9, 4, 4, 4], 0, 4))
+        [(0, ((0, 5), (1, 1), (2, 9), (3, 4))), (1, ((4, 4), (5, 4)))]
+
+    Keyword arguments:
+        xs, ys -- Sequences of the sample coordinates. The x values must
+            be in non-decreasing order.
+        x_start -- The x value at the left edge of column 0.
+        x_per_column -- The width of each column, in x units.
+        lo, hi -- The range of samples to use. The default is all of
+            them.
+    Yields:
+        2-tuples of a column number and a tuple of between one and four
+        (x, y) points, in sample order, for each column that has any
+        samples.
+
+    '''
+    if hi is None:
+        hi = len(xs)
+    while lo < hi:
+        column = int(floor((xs[lo] - x_start) / x_per_column))
+        end = bisect_left(xs, x_start + (column + 1) * x_per_column, lo, hi)
+        # Guard against rounding putting the boundary at or before lo.
+        end = max(end, lo + 1)
+
+        span = ys[lo:end]
+        low, high = min(span), max(span)
+        indices = sorted({lo, lo + span.index(low), lo + span.index(high),
+                          end - 1})
+        yield column, tuple((xs[n], ys[n]) for n in indices)
+        lo = end
+
+class LineSeries:
+    '''A time-series polyline, decimated per pixel column as it grows.
+
+    Samples are reduced with M4 decimation (see m4_columns()) and
+    appended to a path as LINE_TO segments. Every column is given
+    exactly four segments, repeating points where there are fewer, so
+    that the last column (which may still receive samples) can be
+    rewritten in place as more samples arrive.
+
+    Instance attributes:
+        path -- The Path holding the decimated polyline, in the same
+            coordinates as the samples. It needs the MODIFY capability.
+        x_start -- The x value at the left edge of pixel column 0.
+        x_per_pixel -- The width of a pixel column, in x units.
+
+    '''
+    SEGMENTS_PER_COLUMN = 4
+
+    def __init__(self, x_range, width, path=None):
+        '''Initialise the series.
+
+        Keyword arguments:
+            x_range -- A 2-tuple of the x values at the left and right
+                edges of the chart.
+            width -- The width of the chart, in pixels. Samples beyond
+                the right edge are decimated at the same rate, so the
+                series may continue to grow past it.
+            path -- An optional empty path, with datatype F, to build
+                the series in. If omitted, a new path is created.
+
+        '''
+        x_min, x_max = x_range
+        self.x_start = x_min
+        self.x_per_pixel = (x_max - x_min) / width
+        self.path = (Path(datatype=PathDatatypes.F) if path is None else
+                     path)
+        self._reset()
+
+    def _reset(self):
+        '''Forget all samples.'''
+        # The column still open to new samples, the index of its first
+        # segment in the path, and the points it has been decimated to so
+        # far (which is all that is needed to decimate it further).
+        self._column, self._column_start = None, None
+        self._xs, self._ys = [], []
+        self._num_segments = 0
+
+    def __len__(self):
+        '''Get the number of segments in the decimated path.'''
+        return self._num_segments
+
+    def clear(self):
+        '''Remove all samples from the series and its path.'''
+        self.path.clear()
+        self._reset()
+
+    def _column_data(self, points):
+        '''Get the four LINE_TO coordinate pairs for a column.'''
+        points = points + (points[-1],) * (self.SEGMENTS_PER_COLUMN -
+                                           len(points))
+        return [coord for point in points for coord in point]
+
+    def extend(self, xs, ys):
+        '''Add samples to the series.
+
+        However many samples are added, this results in at most one
+        vgModifyPathCoords() call (for the previously open column) and
+        one vgAppendPathData() call (for new columns).
+
+        Keyword arguments:
+            xs, ys -- Sequences of the new sample coordinates. The x
+                values must be in non-decreasing order, and no less than
+                any x value already in the series.
+
+        '''
+        xs, ys = _as_list(xs), _as_list(ys)
+        if len(xs) != len(ys):
+            raise ValueError('x and y sequences differ in length')
+        if not xs:
+            return
+        if self._xs and xs[0] < self._xs[-1]:
+            raise ValueError('samples must be added in x order')
+
+        # Decimate the open column's points along with the new samples.
+        xs, ys = self._xs + xs, self._ys + ys
+        columns = list(m4_columns(xs, ys, self.x_start, self.x_per_pixel))
+
+        commands, data = [], []
+        line = SegmentCommand(PathSegments.LINE_TO)
+        first = 0
+        if self._column is not None:
+            # The open column is already in the path, so rewrite it (if the
+            # new samples changed it at all).
+            column, points = columns[0]
+            if points != tuple(zip(self._xs, self._ys)):
+                self.path.modify_path(self._column_start,
+                                      self.SEGMENTS_PER_COLUMN,
+                                      self._column_data(points))
+            first = 1
+        elif self._num_segments == 0:
+            commands.append(SegmentCommand(PathSegments.MOVE_TO))
+            data.extend((xs[0], ys[0]))
+        start = self._column_start
+
+        for column, points in columns[first:]:
+            start = self._num_segments + len(commands)
+            commands.extend([line] * self.SEGMENTS_PER_COLUMN)
+            data.extend(self._column_data(points))
+        self.path.append_data(commands, data)
+        self._num_segments += len(commands)
+
+        # Keep only the points of the (new) open column.
+        self._column, points = columns[-1]
+        self._column_start = start
+        self._xs, self._ys = [x for x, _ in points], [y for _, y in points]
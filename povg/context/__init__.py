@@ -21,17 +21,22 @@
 
 __all__ = ['MatrixMode', 'FillRule', 'ImageQuality', 'RenderingQuality',
            'BlendMode', 'ImageMode', 'CapStyle', 'JoinStyle', 'PixelLayout',
-           'Context']
+           'StateBlock', 'Context']
 
 # Standard library imports.
 from collections import namedtuple
+from contextlib import contextmanager
 from ctypes import c_float, c_int
 
 # Local library imports.
-from .. import flatten, unflatten
+from .. import flatten, unflatten, ContextThreadError
+from .. import native
+from ..matrix import Matrix, matrix_type
+from ..profile import current_profile
+from ..render import renderer_for, renderer_of, running_renderers
 from ..native import (vgFlush, vgFinish, vgSeti, vgSetf, vgSetiv, vgSetfv,
                       vgGetVectorSize, vgGeti, vgGetf, vgGetiv, vgGetfv,
-                      c_int_p, c_float_p)
+                      vgGetMatrix, c_int_p, c_float_p)
 
 # Context parameter types.
 _params = {
@@ -127,6 +132,89 @@ PixelLayout = namedtuple('PixelLayout_tuple',
                           'RGB_HORIZONTAL', 'BGR_HORIZONTAL')
                          )(0x1300, 0x1301, 0x1302, 0x1303, 0x1304)
 
+# Bundles of context settings.
+_state_fields = ('fill_rule', 'blend_mode', 'image_mode', 'image_quality',
+                 'rendering_quality', 'masking', 'scissoring',
+                 'scissor_rects', 'color_transform', 'color_transform_values',
+                 'stroke_line_width', 'stroke_cap_style', 'stroke_join_style',
+                 'stroke_miter_limit', 'stroke_dash_pattern',
+                 'stroke_dash_phase', 'stroke_dash_phase_reset',
+                 'tile_fill_color', 'clear_color')
+_bool_fields = frozenset(('masking', 'scissoring', 'color_transform',
+                          'stroke_dash_phase_reset'))
+_float_fields = frozenset(('stroke_line_width', 'stroke_miter_limit',
+                           'stroke_dash_phase'))
+_float_vector_fields = frozenset(('color_transform_values',
+                                  'stroke_dash_pattern', 'tile_fill_color',
+                                  'clear_color'))
+
+def _normalize_setting(name, value):
+    '''Put a setting into the form that the context will report it in.'''
+    if value is None:
+        return None
+    elif name in _bool_fields:
+        return bool(value)
+    elif name in _float_fields:
+        return c_float(value).value
+    elif name in _float_vector_fields:
+        return tuple(c_float(elem).value for elem in value)
+    elif name == 'scissor_rects':
+        return tuple(tuple(int(elem) for elem in rect) for rect in value)
+    else:
+        return int(value)
+
+class StateBlock(namedtuple('StateBlock', _state_fields)):
+    '''An immutable bundle of context settings.
+
+    Each setting is named as the Context attribute it applies to. Any
+    setting that is left as None is not part of the block, and is left
+    alone when the block is applied (see Context.apply()). Values are
+    converted to the form in which the context reports them, so that
+    blocks can be compared with the current state, and they are
+    hashable, so that they can be shared and used as dictionary keys.
+
+        >>> StateBlock(fill_rule=FillRule.EVEN_ODD, stroke_line_width=2)
+        StateBlock(fill_rule=6400, stroke_line_width=2.0)
+
+    '''
+    __slots__ = ()
+
+    def __new__(cls, **settings):
+        '''Create the block.
+
+        Keyword arguments:
+            Any of the settings named in _fields.
+
+        '''
+        unknown = set(settings).difference(cls._fields)
+        if unknown:
+            raise TypeError('unknown context settings: '
+                            '{}'.format(', '.join(sorted(unknown))))
+        return super().__new__(cls, *(_normalize_setting(name,
+                                                         settings.get(name))
+                                      for name in cls._fields))
+
+    def __repr__(self):
+        return 'StateBlock({})'.format(', '.join(
+            '{}={!r}'.format(name, value) for name, value in self.items()))
+
+    def items(self):
+        '''Get (name, value) pairs for the settings in this block.'''
+        return [(name, value) for name, value in zip(self._fields, self)
+                if value is not None]
+
+    def replace(self, **settings):
+        '''Get a copy of this block with some settings changed.
+
+        Keyword arguments:
+            Any of the settings named in _fields. Passing None removes
+            a setting from the block.
+
+        '''
+        merged = dict(self.items())
+        merged.update(settings)
+        return StateBlock(**merged)
+
 # Context parameter getter/setter factories.
 def _get_vector(param_id, type_=int, flattened=False, known_size=None):
     '''Dynamically create a getter function for a vector parameter.
@@ -165,10 +253,12 @@ def _get_vector(param_id, type_=int, flattened=False, known_size=None):
             raise TypeError('known_size must be supplied if flattened is True')
 
         def getter(self):
-            size = vgGetVectorSize(param_id)
-            array = (c_itemtype * size)()
-            getv_fn(param_id, size, array)
-            return unflatten((type_(elem) for elem in array), known_size)
+            array = native.cached_param(param_id, True, type_ is float)
+            if array is None:
+                size = vgGetVectorSize(param_id)
+                array = (c_itemtype * size)()
+                getv_fn(param_id, size, array)
+            return unflatten(tuple(type_(elem) for elem in array), known_size)
     else:
         # Create a function that either returns the static size (if we know
         # what that is) or fetches the current size when called.
@@ -176,9 +266,11 @@ def _get_vector(param_id, type_=int, flattened=False, known_size=None):
                  (lambda: vgGetVectorSize(param_id)))
 
         def getter(self):
-            size = sizer()
-            array = (c_itemtype * size)()
-            getv_fn(param_id, size, array)
+            array = native.cached_param(param_id, True, type_ is float)
+            if array is None:
+                size = sizer()
+                array = (c_itemtype * size)()
+                getv_fn(param_id, size, array)
             return tuple(type_(elem) for elem in array)
 
     return getter
@@ -215,20 +307,31 @@ def _set_vector(param_id, type_=int, flattened=False, known_size=None):
                            (vgSetiv, c_int))
 
     # Construct the setter function, with the above details baked in.
+    def set_flat(flat):
+        # Skip building the array if the value is known to be unchanged.
+        if (native.cached_param(param_id, True, type_ is float) ==
+                tuple(c_itemtype(elem).value for elem in flat)):
+            return
+        size = len(flat)
+        array = (c_itemtype * size)(*flat)
+        setv_fn(param_id, size, array)
+
     if flattened:
         def setter(self, val):
-            flat = flatten(val, known_size)
-            size = len(flat)
-            array = (c_itemtype * size)(*flat)
-            setv_fn(param_id, size, array)
+            set_flat(flatten(val, known_size))
     else:
         def setter(self, val):
-            size = len(val)
-            array = (c_itemtype * size)(*val)
-            setv_fn(param_id, size, array)
+            set_flat(tuple(val))
 
     return setter
 
+def _thread_checked(fn):
+    '''Wrap a property function to check the calling thread first.'''
+    def wrapped_fn(self, *args):
+        self._check_thread()
+        return fn(self, *args)
+    return wrapped_fn
+
 def _get(param, name, values, type_=int, from_nt=None):
     '''Create a read-only property with a scalar value.
 
@@ -256,7 +359,7 @@ def _get(param, name, values, type_=int, from_nt=None):
                  'The {} (read-only).\n\n    Possible values are '
                  '{}.\n'.format(name, values))
 
-    return property(fget=lambda self: type_(get_fn(param_id)),
+    return property(fget=_thread_checked(lambda self: type_(get_fn(param_id))),
                     doc=docstring)
 
 def _getv(param, name, values, type_=int, flattened=False, known_size=None):
@@ -317,8 +420,10 @@ def _getset(param, name, values, type_=int, from_nt=None):
     docstring = ('Whether or not {}.\n'.format(name) if type_ is bool else
                  'The {}.\n\n    Legal values are {}.\n'.format(name, values))
 
-    return property(fget=lambda self: type_(get_fn(param_id)),
-                    fset=lambda self, val: set_fn(param_id, c_type(val)),
+    return property(fget=_thread_checked(lambda self:
+                                         type_(get_fn(param_id))),
+                    fset=_thread_checked(lambda self, val:
+                                         set_fn(param_id, c_type(val))),
                     doc=docstring)
 
 def _getsetv(param, name, values, type_=int, flattened=False, known_size=None):
@@ -347,8 +452,10 @@ def _getsetv(param, name, values, type_=int, flattened=False, known_size=None):
 
     '''
     param_id = _params[param]
-    return property(fget=_get_vector(param_id, type_, flattened, known_size),
-                    fset=_set_vector(param_id, type_, flattened, known_size),
+    return property(fget=_thread_checked(_get_vector(param_id, type_,
+                                                     flattened, known_size)),
+                    fset=_thread_checked(_set_vector(param_id, type_,
+                                                     flattened, known_size)),
                     doc=('The {}.\n\n'
                          '    Legal values are {}.\n'.format(name, values)))
 
@@ -357,8 +464,9 @@ class Context:
     '''Represents the OpenVG context.
 
     Because of the design of OpenVG, instances of this class will all
-    access the same context state. It is therefore not generally useful
-    to have more than one Context instance in use.
+    access the same context state: that of the context current in the
+    calling thread. It is therefore not generally useful to have more
+    than one Context instance in use.
 
     Context attributes:
         matrix_mode
@@ -501,15 +609,16 @@ class Context:
 
     # Filter settings
     # TODO: One property for both filter source format conversions.
-    filter_format_linear = _getset('FILTER_FORMAT_LINEAR', 'filter formats are '
-                                   'converted to a linear colour space',
+    filter_format_linear = _getset('FILTER_FORMAT_LINEAR', 'filter formats '
+                                   'are converted to a linear colour space',
                                    'booleans', type_=bool)
     filter_format_premult = _getset('FILTER_FORMAT_PREMULTIPLIED', 'filter '
                                     'formats are converted to a premultiplied '
                                     'colour space', 'booleans', type_=bool)
+    # TODO: Bitmask!
     filter_channel_mask = _getset('FILTER_CHANNEL_MASK', 'colour channels of '
                                   'the filtered image to write', 'bitmasks of '
-                                  'red, green, blue and alpha') # TODO: Bitmask!
+                                  'red, green, blue and alpha')
 
     # Read-only implementation limits
     max_scissor_rects = _get('MAX_SCISSOR_RECTS', 'maximum number of '
@@ -547,6 +656,288 @@ class Context:
                                       '(minimum 16.0)',
                                       type_=float)
 
+    def _check_thread(self):
+        '''Check that this context may be used from the calling thread.
+
+        Instances of this class always use the current context of the
+        calling thread, so any thread may use them. Subclasses that
+        stand for one particular context override this.
+
+        '''
+
+    def _owning_thread(self):
+        '''Get the identifier of the thread in which this context is used.
+
+        Instances of this class stand for whichever context is current
+        in the calling thread, so one is only known to be used in a
+        render thread if there is just one running. Subclasses that
+        stand for one particular context override this.
+
+        Returns:
+            The thread identifier, or None if not known.
+
+        '''
+        renderers = running_renderers()
+        return renderers[0].ident if len(renderers) == 1 else None
+
+    def _renderer(self, renderer=None):
+        '''Get the render thread that owns this context.
+
+        Keyword arguments:
+            renderer -- The render.RenderThread to use. If omitted or
+                None, the one whose setup function returned this
+                context is used, or else the one running in the thread
+                that this context is used in (see _owning_thread()).
+        Raises:
+            ContextThreadError -- If no running RenderThread is given
+                or found.
+
+        '''
+        if renderer is None:
+            renderer = renderer_of(self)
+        if renderer is None:
+            thread = self._owning_thread()
+            if thread is not None:
+                renderer = renderer_for(thread)
+        if renderer is None or not renderer.is_alive():
+            raise ContextThreadError('context is not owned by a running '
+                                     'render thread')
+        return renderer
+
+    def _record(self):
+        '''Get the state record, once the calling thread is checked.'''
+        self._check_thread()
+        return native.current_state()
+
+    def profile(self):
+        '''Get the capabilities of the implementation.
+
+        The implementation is probed only the first time this is called
+        for a context. A Profile saved from an earlier run can be made
+        current with its install() method instead, in which case no
+        probing is done at all.
+
+        Returns:
+            A Profile of the implementation limits, description strings
+            and hardware-accelerated formats.
+
+        '''
+        self._check_thread()
+        return current_profile()
+
+    @property
+    def shadowing(self):
+        '''Whether or not context parameters are shadowed.
+
+        When this is True, context parameters are recorded on the client
+        side as they are set or read, so that reading them again needs
+        no native call, and setting one to the value it already has is
+        skipped. All changes to the context must then be made through
+        Povg (or be followed by native.invalidate_state()).
+
+        The read-only implementation limits are always recorded after
+        they are first read, whether or not this is True.
+
+        '''
+        return self._record().shadowing
+
+    @shadowing.setter
+    def shadowing(self, val):
+        record = self._record()
+        record.shadowing = bool(val)
+        if not val:
+            record.params.clear()
+            record.sizes.clear()
+
+    @property
+    def tracking(self):
+        '''Whether or not the matrix mode and matrices are tracked.
+
+        When this is True, the matrix mode and the matrix in each mode
+        are recorded on the client side, so that selecting a mode or
+        loading a matrix that OpenVG already has is skipped, relative
+        transforms are worked out without native calls, and the matrix
+        stack methods never need to read matrices back. All changes of
+        context must then go through Povg (as EGLContext.make_current()
+        does), and all changes to matrices too (or be followed by
+        native.invalidate_state()).
+
+        When this is False, as it is by default, every matrix function
+        reaches OpenVG, though matrices deferred by the matrix stack
+        methods still wait until something is drawn.
+
+        '''
+        return self._record().tracking
+
+    @tracking.setter
+    def tracking(self, val):
+        self._check_thread()
+        native.set_tracking(val)
+
+    # Bundles of settings
+    def get_state(self, *names):
+        '''Get current context settings as a StateBlock.
+
+        Keyword arguments:
+            The names of the settings to get. If none are given, all
+            settings that a StateBlock can hold are got.
+
+        '''
+        return StateBlock(**{name: getattr(self, name)
+                             for name in (names or StateBlock._fields)})
+
+    def apply(self, block):
+        '''Apply a StateBlock to the context.
+
+        Settings that the block leaves as None are not touched. While
+        shadowing is on (see the shadowing attribute), settings that
+        already have the value in the block are skipped, so that only
+        those that differ cost a native call.
+
+        '''
+        for name, value in block.items():
+            setattr(self, name, value)
+
+    @contextmanager
+    def state(self, block):
+        '''Apply a StateBlock within a with statement.
+
+        On exit, the settings that the block changed are restored to
+        their previous values.
+
+        '''
+        previous = self.get_state(*(name for name, _ in block.items()))
+        self.apply(block)
+        try:
+            yield
+        finally:
+            self.apply(previous)
+
+    # Matrix stacks
+    def _matrix_values(self, mode):
+        '''Get the values of the matrix that will be in effect in a mode.'''
+        values = self._record().matrix(mode)
+        if values is None:
+            # Not known on the client side, so read it back (just once).
+            selected = self.matrix_mode
+            self.matrix_mode = mode
+            m = matrix_type()
+            vgGetMatrix(m)
+            self.matrix_mode = selected
+            values = tuple(m)
+        return values
+
+    def get_matrix(self, mode=None):
+        '''Get the matrix that will be in effect in a given mode.
+
+        Keyword arguments:
+            mode -- A value from the MatrixMode named tuple. If omitted,
+                the current matrix mode is used.
+        Returns:
+            A Matrix object.
+
+        '''
+        return Matrix.from_values(self._matrix_values(
+            self.matrix_mode if mode is None else mode))
+
+    def load_matrix(self, matrix, mode=None):
+        '''Replace the matrix in a given mode.
+
+        The matrix is not loaded into OpenVG until it is needed for
+        drawing.
+
+        Keyword arguments:
+            matrix -- The Matrix to load.
+            mode -- A value from the MatrixMode named tuple. If omitted,
+                the current matrix mode is used.
+
+        '''
+        self._check_thread()
+        native.defer_matrix(self.matrix_mode if mode is None else mode,
+                            matrix.values)
+
+    def mult_matrix(self, matrix, mode=None):
+        '''Right-multiply the matrix in a given mode by another.
+
+        The product is worked out on the client side, and is not loaded
+        into OpenVG until it is needed for drawing.
+
+        Keyword arguments:
+            matrix -- The Matrix to multiply by.
+            mode -- A value from the MatrixMode named tuple. If omitted,
+                the current matrix mode is used.
+
+        '''
+        if mode is None:
+            mode = self.matrix_mode
+        product = Matrix.from_values(self._matrix_values(mode))
+        product *= matrix
+        native.defer_matrix(mode, product.values)
+
+    def push_matrix(self, mode=None):
+        '''Save the matrix in a given mode on that mode's matrix stack.
+
+        OpenVG has no matrix stack of its own, so each matrix mode has
+        one kept on the client side.
+
+        Keyword arguments:
+            mode -- A value from the MatrixMode named tuple. If omitted,
+                the current matrix mode is used.
+
+        '''
+        self._push(self.matrix_mode if mode is None else mode)
+
+    def _push(self, mode):
+        '''Push the matrix in a mode, and get the values pushed.'''
+        values = self._matrix_values(mode)
+        self._record().stacks.setdefault(mode, []).append(values)
+        return values
+
+    def pop_matrix(self, mode=None):
+        '''Restore the matrix in a given mode from that mode's stack.
+
+        The restored matrix is not loaded into OpenVG until it is needed
+        for drawing.
+
+        Keyword arguments:
+            mode -- A value from the MatrixMode named tuple. If omitted,
+                the current matrix mode is used.
+
+        '''
+        if mode is None:
+            mode = self.matrix_mode
+        stack = self._record().stacks.get(mode)
+        if not stack:
+            raise IndexError('pop from empty matrix stack')
+        native.defer_matrix(mode, stack.pop())
+
+    @contextmanager
+    def transform(self, matrix, mode=None):
+        '''Apply a transform within a with statement.
+
+        On entry, the matrix in the given mode is pushed onto the stack
+        and right-multiplied by the given matrix; on exit, it is popped
+        again. Nesting these gives hierarchical transforms, which read
+        the matrix back from OpenVG at most once on entry, and only if
+        it is not known on the client side (see the tracking attribute),
+        and never on exit.
+
+        Keyword arguments:
+            matrix -- The Matrix to apply.
+            mode -- A value from the MatrixMode named tuple. If omitted,
+                the current matrix mode is used.
+
+        '''
+        if mode is None:
+            mode = self.matrix_mode
+        product = Matrix.from_values(self._push(mode))
+        try:
+            product *= matrix
+            native.defer_matrix(mode, product.values)
+            yield
+        finally:
+            self.pop_matrix(mode)
+
     @staticmethod
     def flush():
         '''Force operations on the current context to finish.
@@ -567,3 +958,40 @@ class Context:
 
         '''
         vgFinish()
+
+    async def flush_async(self, renderer=None):
+        '''Force operations on this context to finish, from a coroutine.
+
+        This is like flush(), but it is called in the render.RenderThread
+        that owns this context, without blocking the event loop.
+
+        Keyword arguments:
+            renderer -- The RenderThread that owns this context. If
+                omitted or None, the one whose setup function returned
+                this context is used, or else the one in which this
+                context is current. An instance of this class itself
+                (rather than a subclass) stands for whichever context is
+                current, so failing those it uses the only RenderThread
+                running, if there is just one.
+        Raises:
+            ContextThreadError -- If no running RenderThread is given
+                or found.
+
+        '''
+        await self._renderer(renderer).run_async(vgFlush)
+
+    async def finish_async(self, renderer=None):
+        '''Wait for operations on this context to finish, from a coroutine.
+
+        This is like finish(), but it is called in the render.RenderThread
+        that owns this context, and the calling coroutine waits for it
+        without blocking the event loop.
+
+        Keyword arguments:
+            renderer -- As for flush_async().
+        Raises:
+            ContextThreadError -- If no running RenderThread is given
+                or found.
+
+        '''
+        await self._renderer(renderer).run_async(vgFinish)
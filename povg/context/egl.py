@@ -19,6 +19,9 @@
 # You should have received a copy of the GNU General Public License
 # along with Povg. If not, see <http://www.gnu.org/licenses/>.
 
+# Standard library imports.
+from threading import get_ident
+
 # Pegl imports.
 import pegl.attribs
 import pegl.config
@@ -28,6 +31,7 @@ import pegl.surface
 
 # Local imports.
 from . import Context
+from .. import native, ContextThreadError
 
 # And now the unholy offspring of an EGL context and an OpenVG context!
 class EGLContext(pegl.context.Context, Context):
@@ -40,6 +44,8 @@ class EGLContext(pegl.context.Context, Context):
         string 'OpenVG'.
     api_version -- Inherited from pegl.context.Context, but never
         relevant.
+    state_record -- The native.StateRecord of what Povg knows of this
+        context's state.
 
     Access to OpenVG-specific context parameters is possible through
     attributes inherited from Context. Note that these parameters apply
@@ -48,6 +54,15 @@ class EGLContext(pegl.context.Context, Context):
     context instance is current (using make_current()) before querying
     or setting any of these parameters.
 
+    An EGL context can only be current in one thread at a time. Once it
+    is made current in one thread, it is bound to that thread (until a
+    different context is made current there), and using it from any
+    other thread, or before it is made current, raises
+    ContextThreadError. A context that stops being used in its thread
+    (when the thread ends, say) must be unbound with unbind() before any
+    other thread can make it current; RenderThread does this when it
+    stops.
+
     '''
     def __init__(self, display=None, config=None, share_context=None):
         '''Create the context.
@@ -73,6 +88,72 @@ class EGLContext(pegl.context.Context, Context):
         # Sanity check.
         assert self.api == 'OpenVG'
 
+        # What the client side knows of this context's state.
+        self.state_record = native.StateRecord()
+
+    def make_current(self, *args, **kwargs):
+        '''Make this context current.
+
+        This also switches Povg over to this context's record of its own
+        state (see native.StateRecord), and binds this context to the
+        calling thread. All arguments are passed on to
+        pegl.context.Context.make_current().
+
+        Raises:
+            ContextThreadError -- If this context is bound to another
+                thread.
+
+        '''
+        thread = self.state_record.thread
+        if thread is not None and thread != get_ident():
+            raise ContextThreadError('context is current in another thread '
+                                     '(ID {})'.format(thread))
+        super().make_current(*args, **kwargs)
+        native.set_state(self.state_record)
+
+    def unbind(self):
+        '''Release this context from the thread it is bound to.
+
+        This may be called from the bound thread, or from any other
+        once the bound thread has ended. It does not release the context
+        in EGL itself, which must be done separately if the thread is
+        still running.
+
+        '''
+        record = self.state_record
+        if record.thread == get_ident() and native.current_state() is record:
+            native.set_state()
+        record.thread = None
+
+    def _owning_thread(self):
+        '''Get the identifier of the thread this context is bound to.'''
+        return self.state_record.thread
+
+    async def swap_async(self, surface):
+        '''Post a surface's back buffer, from a coroutine.
+
+        The buffers are swapped in the render.RenderThread that owns this
+        context, without blocking the event loop.
+
+        Keyword arguments:
+            surface -- The WindowSurface to swap, which must be the draw
+                surface of this context.
+        Raises:
+            ContextThreadError -- If this context is not owned by a
+                running RenderThread.
+
+        '''
+        await self._renderer().run_async(surface.swap_buffers)
+
+    def _check_thread(self):
+        '''Check that this context is bound to the calling thread.'''
+        thread = self.state_record.thread
+        if thread is None:
+            raise ContextThreadError('context is not current in any thread')
+        if thread != get_ident():
+            raise ContextThreadError('context is current in another thread '
+                                     '(ID {})'.format(thread))
+
 # TODO: Subclass pegl.surface.WindowSurface and provide new names (without the
 # openvg_ prefix) for openvg_alpha_premultiplied and openvg_colorspace? And
 # possibly allow these (and render_buffer) to be set in the constructor without
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+
+'''Damage tracking, for redrawing only what has changed.
+
+When only a small part of a scene changes between frames, there is no
+need to redraw the whole surface. This module collects the regions that
+have changed (the "damage"), merges them into the few rectangles that
+OpenVG can scissor to, and clears and redraws just those.
+
+'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+__all__ = ['merge_rects', 'DamageTracker']
+
+# Standard library imports.
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+from heapq import heapify, heappop, heappush
+from math import ceil, floor
+
+# Local imports.
+from . import native
+from .context import Context, MatrixMode
+
+# How many rectangles on either side, from left to right, each one is
+# costed against for merging.
+_NEIGHBOURS = 8
+
+def _union(a, b):
+    '''Get the bounding rectangle of two rectangles.'''
+    x, y = min(a[0], b[0]), min(a[1], b[1])
+    return (x, y, max(a[0] + a[2], b[0] + b[2]) - x,
+            max(a[1] + a[3], b[1] + b[3]) - y)
+
+def _overlap(a, b):
+    '''Check whether two rectangles have any area in common.'''
+    return (a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and
+            a[1] < b[1] + b[3] and b[1] < a[1] + a[3])
+
+def _area(rect):
+    return rect[2] * rect[3]
+
+def _shared_area(a, b):
+    '''Get the area that two rectangles have in common.'''
+    width = min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0])
+    height = min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1])
+    return width * height if width > 0 and height > 0 else 0
+
+def _added_area(a, b):
+    '''Get the area that merging two rectangles covers needlessly.'''
+    return _area(_union(a, b)) - _area(a) - _area(b) + _shared_area(a, b)
+
+def _merge_free(rects):
+    '''Merge every pair of rectangles whose union covers no new area.
+
+    The rectangles are swept from left to right, each being checked
+    against only those still reaching it. A merged rectangle may now
+    merge with others, so the sweep is repeated until nothing merges.
+
+    '''
+    rects = sorted(rects)
+    merged_any = True
+    while merged_any:
+        merged_any = False
+        merged, active = [], []
+        for rect in rects:
+            active = [n for n in active
+                      if merged[n][0] + merged[n][2] >= rect[0]]
+            for n in active:
+                if _added_area(rect, merged[n]) == 0:
+                    merged[n] = _union(rect, merged[n])
+                    merged_any = True
+                    break
+            else:
+                active.append(len(merged))
+                merged.append(rect)
+        rects = sorted(merged)
+    return rects
+
+def merge_rects(rects, max_rects):
+    '''Merge rectangles until there are few enough of them.
+
+    Rectangles whose bounding rectangle covers nothing more than they
+    do (those that line up along a shared edge, or overlap in a band, or
+    contain one another) are always merged. After that, the pair whose
+    bounding rectangle adds the least area is merged, until no more than
+    max_rects are left. The result covers every point of the original
+    rectangles.
+
+        >>> merge_rects([(0, 0, 10, 10), (10, 0, 5, 10), (15, 10, 5, 5)], 4)
+        [(0, 0, 15, 10), (15, 10, 5, 5)]
+        >>> merge_rects([(0, 0, 10, 10), (20, 0, 10, 10), (90, 0, 5, 5)], 2)
+        [(0, 0, 30, 10), (90, 0, 5, 5)]
+
+    Keyword arguments:
+        rects -- A sequence of (x, y, width, height) rectangles.
+        max_rects -- The largest number of rectangles to return.
+    Returns:
+        A list of (x, y, width, height) rectangles.
+
+    '''
+    merged = _merge_free(rect for rect in rects
+                         if rect[2] > 0 and rect[3] > 0)
+    if len(merged) <= max(max_rects, 1):
+        return merged
+
+    # Merge the cheapest pair each time, keeping the costs of pairs in a
+    # heap. Only pairs near each other from left to right are costed,
+    # which keeps this fast for thousands of rectangles while still
+    # finding the cheap merges. A merged rectangle takes the place of
+    # the first of the pair, with a new version so that the old costs
+    # of both are known to be stale.
+    version = [0] * len(merged)
+    order = [(rect[0], n) for n, rect in enumerate(merged)]
+    def costs(n):
+        position = bisect_left(order, (merged[n][0], n))
+        for _, other in order[max(position - _NEIGHBOURS, 0):
+                              position + _NEIGHBOURS + 1]:
+            if other != n:
+                a, b = min(n, other), max(n, other)
+                yield (_added_area(merged[a], merged[b]), a, b,
+                       version[a], version[b])
+    heap = [entry for n in range(len(merged)) for entry in costs(n)]
+    heapify(heap)
+
+    while len(order) > max(max_rects, 1):
+        cost, i, j, ver_i, ver_j = heappop(heap)
+        if (merged[i] is None or merged[j] is None or
+                ver_i != version[i] or ver_j != version[j]):
+            # Stale entry; one of the pair has been merged since.
+            continue
+        order.remove((merged[i][0], i))
+        order.remove((merged[j][0], j))
+        merged[i] = _union(merged[i], merged[j])
+        merged[j] = None
+        version[i] += 1
+        insort(order, (merged[i][0], i))
+        for entry in costs(i):
+            heappush(heap, entry)
+    return [rect for rect in merged if rect is not None]
+
+def _transform_rect(rect, matrix):
+    '''Get the bounding rectangle of a transformed rectangle.'''
+    sx, shy, w0, shx, sy, w1, tx, ty, w2 = matrix
+    x, y, width, height = rect
+    xs, ys = [], []
+    for px, py in ((x, y), (x + width, y), (x, y + height),
+                   (x + width, y + height)):
+        w = w0 * px + w1 * py + w2
+        xs.append((sx * px + shx * py + tx) / w)
+        ys.append((shy * px + sy * py + ty) / w)
+    return (min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))
+
+class DamageTracker:
+    '''Collects damaged regions of a surface and redraws only them.
+
+    Each frame, report whatever has changed with add() or add_path() (for
+    something that has moved, report both where it was and where it is
+    now). Then draw the frame inside the frame() context manager, using
+    draw() or visible() to skip anything that misses the damage
+    entirely:
+
+        with tracker.frame():
+            for path in scene:
+                tracker.draw(path)
+
+    While the frame is being drawn, scissoring is limited to the damaged
+    rectangles, which have been cleared to the clear colour.
+
+    Between frames, scroll() moves what has already been drawn, so that
+    only the newly exposed strips are damaged.
+
+    Instance attributes:
+        width, height -- The size of the drawing surface, in pixels.
+        max_rects -- The most rectangles to merge the damage into. This
+            defaults to the context's maximum number of scissoring
+            rectangles.
+        rects -- The merged damage, as a list of (x, y, width, height)
+            rectangles in whole pixels. This is only up to date while
+            a frame is being drawn.
+
+    '''
+    def __init__(self, width, height, max_rects=None):
+        '''Initialise the tracker, with the whole surface damaged.
+
+        Keyword arguments:
+            width, height, max_rects -- As the instance attributes.
+
+        '''
+        self.width, self.height = width, height
+        self.max_rects = (Context().max_scissor_rects if max_rects is None
+                          else max_rects)
+        self._damage = [(0, 0, width, height)]
+        self.rects = []
+
+    def __bool__(self):
+        '''Check whether any damage has been reported.'''
+        return bool(self._damage)
+
+    def add(self, rect):
+        '''Report a damaged region of the surface.
+
+        Keyword arguments:
+            rect -- An (x, y, width, height) rectangle, in surface
+                coordinates. It need not be in whole pixels, nor lie
+                within the surface.
+
+        '''
+        x, y, width, height = rect
+        x0, y0 = max(int(floor(x)), 0), max(int(floor(y)), 0)
+        x1 = min(int(ceil(x + width)), self.width)
+        y1 = min(int(ceil(y + height)), self.height)
+        if x1 > x0 and y1 > y0:
+            self._damage.append((x0, y0, x1 - x0, y1 - y0))
+
+    def add_all(self):
+        '''Report the whole surface as damaged.'''
+        self._damage = [(0, 0, self.width, self.height)]
+
+    @staticmethod
+    def _surface_bounds(path, matrix, stroke_width):
+        '''Get the bounding box of a path on the surface.'''
+        if matrix is None:
+            matrix = Context().get_matrix(MatrixMode.PATH_USER_TO_SURFACE)
+        x, y, width, height = path.bounds()
+        if stroke_width:
+            half = stroke_width / 2
+            x, y = x - half, y - half
+            width, height = width + stroke_width, height + stroke_width
+        return _transform_rect((x, y, width, height),
+                               tuple(getattr(matrix, '_as_parameter_',
+                                             matrix)))
+
+    def add_path(self, path, matrix=None, stroke_width=0.0):
+        '''Report the area covered by a path as damaged.
+
+        The path's own bounding box is kept by the path, so this needs
+        no native call unless the path has changed.
+
+        Keyword arguments:
+            path -- The Path that has changed or moved.
+            matrix -- The Matrix (or nine matrix values, in the order
+                used by vgLoadMatrix()) with which the path is drawn.
+                If omitted, the current path-user-to-surface matrix is
+                used.
+            stroke_width -- The width of the path's stroke, if any. The
+                default is 0.0.
+
+        '''
+        self.add(self._surface_bounds(path, matrix, stroke_width))
+
+    def scroll(self, dx, dy, rect=None, max_fraction=0.5):
+        '''Scroll the contents of the surface, damaging only what is new.
+
+        The pixels already drawn are moved with vgCopyPixels(), so only
+        the strips that scroll into view need to be redrawn. If that is
+        not possible, the whole scrolled area is reported as damaged
+        instead, and it is all redrawn in the next frame.
+
+        This must not be called while a frame is being drawn, and the
+        caller must move the scrolled content by the same amount (for
+        instance, by translating its matrix).
+
+        Keyword arguments:
+            dx, dy -- The distance to scroll the contents by, in pixels.
+            rect -- The (x, y, width, height) area to scroll, in whole
+                pixels. If omitted, the whole surface is scrolled.
+            max_fraction -- The largest part of the width or height of
+                the area that may scroll in before it is simply redrawn
+                instead. The default is 0.5.
+        Returns:
+            True if the pixels were moved, or False if the whole area
+            has been damaged instead. That happens if the distance is
+            too large or not a whole number of pixels, or if any part of
+            the area was already damaged (and so would be moved stale).
+
+        '''
+        x, y, width, height = ((0, 0, self.width, self.height) if rect is None
+                               else rect)
+        if dx == dy == 0:
+            return True
+        if (dx != int(dx) or dy != int(dy) or
+                abs(dx) >= width * max_fraction or
+                abs(dy) >= height * max_fraction or
+                any(_overlap(damage, (x, y, width, height))
+                    for damage in self._damage)):
+            self.add((x, y, width, height))
+            return False
+
+        dx, dy = int(dx), int(dy)
+        native.vgCopyPixels(x + max(dx, 0), y + max(dy, 0),
+                            x - min(dx, 0), y - min(dy, 0),
+                            width - abs(dx), height - abs(dy))
+        # The strips that have scrolled into view.
+        if dx:
+            self.add((x if dx > 0 else x + width + dx, y, abs(dx), height))
+        if dy:
+            self.add((x, y if dy > 0 else y + height + dy, width, abs(dy)))
+        return True
+
+    def visible(self, rect):
+        '''Check whether a rectangle meets the damage of this frame.
+
+        Keyword arguments:
+            rect -- An (x, y, width, height) rectangle, in surface
+                coordinates.
+
+        '''
+        return any(_overlap(rect, damage) for damage in self.rects)
+
+    def draw(self, path, matrix=None, stroke_width=0.0, **kwargs):
+        '''Draw a path, unless it misses the damage of this frame.
+
+        Keyword arguments:
+            path, matrix, stroke_width -- As for add_path(). The matrix
+                is only used to check visibility; to draw with it, it
+                must also be made current.
+            Any others are passed on to the path's draw() method.
+        Returns:
+            True if the path was drawn, or False if it was skipped.
+
+        '''
+        if not self.visible(self._surface_bounds(path, matrix,
+                                                 stroke_width)):
+            return False
+        path.draw(**kwargs)
+        return True
+
+    def begin_frame(self, clear=True):
+        '''Limit drawing to the damaged rectangles.
+
+        Keyword arguments:
+            clear -- Whether to clear the damaged rectangles to the clear
+                colour. The default is True.
+        Returns:
+            The merged damaged rectangles, which are also kept as the
+            rects attribute.
+
+        '''
+        self.rects = merge_rects(self._damage, self.max_rects)
+        self._damage = []
+        ctx = Context()
+        ctx.scissor_rects = self.rects
+        ctx.scissoring = True
+        if clear:
+            for rect in self.rects:
+                native.vgClear(*rect)
+        return self.rects
+
+    def end_frame(self):
+        '''Allow drawing to the whole surface again.'''
+        Context().scissoring = False
+        self.rects = []
+
+    @contextmanager
+    def frame(self, clear=True):
+        '''Draw a frame, limited to the damaged rectangles.
+
+        This calls begin_frame() on entry, and end_frame() on exit.
+
+        Keyword arguments:
+            clear -- As for begin_frame().
+
+        '''
+        self.begin_frame(clear)
+        try:
+            yield self.rects
+        finally:
+            self.end_frame()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+
+'''Offscreen rendering in a pool of worker processes.
+
+Batch jobs, such as rendering thousands of thumbnails or map tiles, can
+use every core (or GPU) by rendering in several processes at once. Each
+worker process here owns its own context and offscreen surface, renders
+the scenes sent to it, and hands back the pixels through shared memory
+rather than by pickling them.
+
+'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+__all__ = ['EGLPbufferBackend', 'attach', 'Frame', 'Farm']
+
+# Standard library imports.
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+import os
+from queue import Queue
+
+class EGLPbufferBackend:
+    '''An EGL context rendering to a pbuffer surface.
+
+    This is the default backend of a Farm. Any other class (or function)
+    can be used instead, so long as it can be pickled, is called in each
+    worker with the width and height of the surface, and returns an
+    object with the same read_pixels() method as this one. In that way,
+    a software renderer (or a stand-in for testing) can take the place
+    of EGL.
+
+    Instance attributes:
+        context -- The EGLContext, current in the worker process.
+        surface -- The PbufferSurface it draws to.
+
+    '''
+    def __init__(self, width, height):
+        '''Create the context and surface, and make them current.'''
+        # Imported here, so that Pegl and OpenVG are only needed by
+        # processes that use this backend.
+        from .context.egl import EGLContext, PbufferSurface
+        from .render import read_pixels
+
+        self.context = EGLContext()
+        self.context.display.initialize()
+        self.surface = PbufferSurface(self.context.display,
+                                      self.context.config,
+                                      {'WIDTH': width, 'HEIGHT': height})
+        self.context.make_current(draw_surface=self.surface)
+        self._read_pixels = read_pixels
+
+    def read_pixels(self, width, height, into):
+        '''Read back the bottom-left of the surface as RGBA pixels.'''
+        self._read_pixels(0, 0, width, height, into=into)
+
+# The backend of a worker process, and the shared memory it has attached.
+_backend = None
+_attached = {}
+
+def attach(name):
+    '''Attach to a shared memory block created by another process.
+
+    Each block is attached only once per process, and stays attached
+    until the process ends, so the block returned must not be closed.
+
+    Keyword arguments:
+        name -- The name of the block.
+    Returns:
+        A multiprocessing.shared_memory.SharedMemory instance.
+
+    '''
+    try:
+        block = _attached[name]
+    except KeyError:
+        # Attaching never unlinks, so the block lives until the parent
+        # process unlinks it.
+        block = _attached[name] = shared_memory.SharedMemory(name)
+    return block
+
+def _start_worker(backend, width, height):
+    '''Set up a worker process.'''
+    global _backend
+    _backend = backend(width, height)
+
+def _render(slot, width, height, draw, args):
+    '''Render one scene in a worker process.'''
+    block = attach(slot)
+    draw(*args)
+    size = width * height * 4
+    _backend.read_pixels(width, height, block.buf[:size])
+    return os.getpid()
+
+class Frame:
+    '''The pixels of one rendered scene, held in shared memory.
+
+    The pixels stay valid until the frame is released, which makes its
+    shared memory available to another scene. Use the frame in a with
+    statement, or call release(), once finished with it.
+
+    Instance attributes:
+        width, height -- The size of the frame, in pixels.
+        pixels -- A memoryview of the RGBA pixels, four bytes to a
+            pixel, row by row from the bottom row up. None once the
+            frame has been released.
+        worker -- The process ID of the worker that rendered it.
+
+    '''
+    def __init__(self, width, height, pixels, worker, release):
+        self.width, self.height = width, height
+        self.pixels, self.worker = pixels, worker
+        self._release = release
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def tobytes(self):
+        '''Copy the pixels out of shared memory.'''
+        return self.pixels.tobytes()
+
+    def release(self):
+        '''Give up the frame's shared memory.'''
+        if self.pixels is not None:
+            self.pixels.release()
+            self.pixels = None
+            self._release()
+
+class Farm:
+    '''A pool of worker processes, each rendering with its own context.
+
+    Scenes are rendered by calling a drawing function in a worker, with
+    the current context drawing to a surface of a fixed size, and then
+    reading back the bottom-left corner of the surface. Both the drawing
+    function and its arguments must be picklable (so the function must
+    be defined at the top level of a module).
+
+    The pixels are returned in blocks of shared memory. There is a fixed
+    number of these, so at most that many frames can be rendered but not
+    yet released; submitting more waits until one is released.
+
+        with Farm(256, 256) as farm:
+            for frame in farm.map(draw_tile, tiles):
+                save(frame.pixels)
+
+    Instance attributes:
+        width, height -- The size of every worker's surface, and the
+            largest frame that can be rendered.
+        workers -- The number of worker processes.
+
+    '''
+    def __init__(self, width, height, workers=None, backend=EGLPbufferBackend,
+                 slots=None, mp_context=None):
+        '''Start the worker processes.
+
+        Keyword arguments:
+            width, height -- As the instance attributes.
+            workers -- As the instance attribute. If omitted or None, one
+                worker is started per CPU.
+            backend -- The picklable class or function to call in each
+                worker to set up its context (see EGLPbufferBackend). The
+                default is EGLPbufferBackend.
+            slots -- The number of shared memory blocks for frames. The
+                default is twice the number of workers.
+            mp_context -- An optional multiprocessing context, to choose
+                how the workers are started.
+
+        '''
+        self.width, self.height = width, height
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        slots = 2 * self.workers if slots is None else slots
+
+        self._blocks = [shared_memory.SharedMemory(create=True,
+                                                   size=width * height * 4)
+                        for _ in range(slots)]
+        self._free = Queue()
+        for slot in range(slots):
+            self._free.put(slot)
+        self._executor = ProcessPoolExecutor(self.workers,
+                                             mp_context=mp_context,
+                                             initializer=_start_worker,
+                                             initargs=(backend, width,
+                                                       height))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        '''Stop the workers and free the shared memory.
+
+        Any frames not yet released become invalid.
+
+        '''
+        self._executor.shutdown()
+        for block in self._blocks:
+            try:
+                block.close()
+            except BufferError:
+                # Frames still refer to it, but it goes once they do.
+                pass
+            block.unlink()
+        self._blocks = []
+
+    def submit(self, draw, *args, width=None, height=None):
+        '''Render a scene in the next free worker.
+
+        This waits for a free shared memory block, if there is none.
+
+        Keyword arguments:
+            draw -- The picklable function that draws the scene.
+            width, height -- The size of the frame to read back. The
+                default is the whole surface.
+            Any others are passed on to the drawing function.
+        Returns:
+            A concurrent.futures.Future of the Frame.
+
+        '''
+        width = self.width if width is None else width
+        height = self.height if height is None else height
+        if not (0 < width <= self.width and 0 < height <= self.height):
+            raise ValueError('frame size {}×{} does not fit the '
+                             'surface'.format(width, height))
+
+        slot = self._free.get()
+        block = self._blocks[slot]
+        result = Future()
+
+        def finished(future):
+            try:
+                worker = future.result()
+            except BaseException as exc:
+                self._free.put(slot)
+                result.set_exception(exc)
+            else:
+                result.set_result(Frame(width, height,
+                                        block.buf[:width * height * 4],
+                                        worker,
+                                        lambda: self._free.put(slot)))
+
+        try:
+            self._executor.submit(_render, block.name, width, height, draw,
+                                  args).add_done_callback(finished)
+        except BaseException:
+            self._free.put(slot)
+            raise
+        return result
+
+    def map(self, draw, scenes, width=None, height=None):
+        '''Render many scenes, streaming the frames back in order.
+
+        Each frame is released when the next one is taken, so it must be
+        used (or copied) before then.
+
+        Keyword arguments:
+            draw -- As for submit().
+            scenes -- An iterable of argument tuples for the drawing
+                function, one per scene.
+            width, height -- As for submit().
+        Yields:
+            The Frame of each scene.
+
+        '''
+        return self.stream((draw, args, width, height) for args in scenes)
+
+    def stream(self, jobs):
+        '''Render many scenes of any kind, streaming the frames back in order.
+
+        This is like map(), but each scene has its own drawing function
+        and frame size.
+
+        Keyword arguments:
+            jobs -- An iterable of 4-tuples of a drawing function, a tuple
+                of arguments for it, and the width and height of the
+                frame (either of which may be None, as for submit()).
+        Yields:
+            The Frame of each scene.
+
+        '''
+        pending = deque()
+        jobs = iter(jobs)
+        # Keep one block back for the frame being used.
+        in_flight = max(len(self._blocks) - 1, 1)
+        frame = None
+        try:
+            while True:
+                while len(pending) < in_flight:
+                    try:
+                        draw, args, width, height = next(jobs)
+                    except StopIteration:
+                        break
+                    pending.append(self.submit(draw, *args, width=width,
+                                               height=height))
+                if not pending:
+                    break
+                frame = pending.popleft().result()
+                yield frame
+                frame.release()
+        finally:
+            if frame is not None:
+                frame.release()
+            for future in pending:
+                try:
+                    future.result().release()
+                except BaseException:
+                    pass
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+
+'''Fitting of cubic Bézier curves to streams of points.
+
+Freehand input (from a pen or mouse) arrives as hundreds of closely
+spaced points per stroke. Drawn as a polyline, every one of those
+points becomes a path segment. This module fits a few cubic curves to
+them instead, using the least-squares method described by Philip J.
+Schneider in "An Algorithm for Automatically Fitting Digitized Curves"
+(Graphics Gems, 1990).
+
+'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+__all__ = ['Cubic', 'fit_cubics', 'cubics_to_data', 'StrokeFitter']
+
+# Standard library imports.
+from collections import namedtuple
+from math import hypot
+
+# Local imports.
+from .params import PathDatatypes, PathParams
+from .path import Path, PathSegments, SegmentCommand, convert_data
+
+# A fitted curve: its four control points, and the indices of the first and
+# last input points that it was fitted to.
+Cubic = namedtuple('Cubic', ('p0', 'ctrl0', 'ctrl1', 'p1', 'first', 'last'))
+
+# How many times to try improving a nearly good enough fit before splitting.
+MAX_ITERATIONS = 4
+
+def _sub(a, b):
+    return (a[0] - b[0], a[1] - b[1])
+
+def _add_scaled(a, v, k):
+    return (a[0] + v[0] * k, a[1] + v[1] * k)
+
+def _dot(a, b):
+    return a[0] * b[0] + a[1] * b[1]
+
+def _unit(v):
+    length = hypot(v[0], v[1])
+    return (v[0] / length, v[1] / length) if length else (0.0, 0.0)
+
+def _bezier(ctrl, t):
+    '''Evaluate a Bézier curve of any degree at t.'''
+    pts = list(ctrl)
+    for degree in range(len(pts) - 1, 0, -1):
+        pts = [(pts[i][0] + (pts[i + 1][0] - pts[i][0]) * t,
+                pts[i][1] + (pts[i + 1][1] - pts[i][1]) * t)
+               for i in range(degree)]
+    return pts[0]
+
+def _chord_params(points, first, last):
+    '''Parameterise points by cumulative chord length, from 0 to 1.'''
+    u = [0.0]
+    for n in range(first + 1, last + 1):
+        u.append(u[-1] + hypot(*_sub(points[n], points[n - 1])))
+    total = u[-1]
+    return [value / total for value in u]
+
+def _generate(points, first, last, u, tan0, tan1):
+    '''Fit one cubic by least squares, with fixed end tangents.'''
+    p0, p3 = points[first], points[last]
+    c00 = c01 = c11 = x0 = x1 = 0.0
+    for n, t in enumerate(u):
+        s = 1 - t
+        b0, b1, b2, b3 = s * s * s, 3 * t * s * s, 3 * t * t * s, t * t * t
+        a0 = (tan0[0] * b1, tan0[1] * b1)
+        a1 = (tan1[0] * b2, tan1[1] * b2)
+        c00 += _dot(a0, a0)
+        c01 += _dot(a0, a1)
+        c11 += _dot(a1, a1)
+        pt = points[first + n]
+        tmp = (pt[0] - p0[0] * (b0 + b1) - p3[0] * (b2 + b3),
+               pt[1] - p0[1] * (b0 + b1) - p3[1] * (b2 + b3))
+        x0 += _dot(a0, tmp)
+        x1 += _dot(a1, tmp)
+
+    det = c00 * c11 - c01 * c01
+    alpha0 = (x0 * c11 - x1 * c01) / det if det else 0.0
+    alpha1 = (c00 * x1 - c01 * x0) / det if det else 0.0
+
+    # Fall back on the Wu/Barsky heuristic if the result is degenerate.
+    seg_length = hypot(*_sub(p3, p0))
+    epsilon = 1e-6 * seg_length
+    if alpha0 < epsilon or alpha1 < epsilon:
+        alpha0 = alpha1 = seg_length / 3
+    return (p0, _add_scaled(p0, tan0, alpha0), _add_scaled(p3, tan1, alpha1),
+            p3)
+
+def _max_error(points, first, last, ctrl, u):
+    '''Find the input point furthest (squared) from the fitted curve.'''
+    worst, split = 0.0, (first + last) // 2
+    for n in range(first + 1, last):
+        dx, dy = _sub(_bezier(ctrl, u[n - first]), points[n])
+        dist = dx * dx + dy * dy
+        if dist >= worst:
+            worst, split = dist, n
+    return worst, split
+
+def _reparameterize(points, first, ctrl, u):
+    '''Improve the parameter of each point by Newton-Raphson iteration.'''
+    d1 = [(3 * (ctrl[i + 1][0] - ctrl[i][0]), 3 * (ctrl[i + 1][1] -
+                                                   ctrl[i][1]))
+          for i in range(3)]
+    d2 = [(2 * (d1[i + 1][0] - d1[i][0]), 2 * (d1[i + 1][1] - d1[i][1]))
+          for i in range(2)]
+    result = []
+    for n, t in enumerate(u):
+        diff = _sub(_bezier(ctrl, t), points[first + n])
+        q1, q2 = _bezier(d1, t), _bezier(d2, t)
+        denominator = _dot(q1, q1) + _dot(diff, q2)
+        result.append(t - _dot(diff, q1) / denominator if denominator else t)
+    return result
+
+def _dedupe(points):
+    '''Remove consecutive duplicate points.'''
+    result = []
+    for pt in points:
+        pt = (float(pt[0]), float(pt[1]))
+        if not result or pt != result[-1]:
+            result.append(pt)
+    return result
+
+def _fit(points, error, tan0=None, tan1=None):
+    '''Fit cubics to a list of distinct points.'''
+    error_sq = error * error
+    last_index = len(points) - 1
+    if tan0 is None:
+        tan0 = _unit(_sub(points[1], points[0]))
+    if tan1 is None:
+        tan1 = _unit(_sub(points[-2], points[-1]))
+
+    curves = []
+    # Work depth-first, left half first, so that curves come out in order.
+    stack = [(0, last_index, tan0, tan1)]
+    while stack:
+        first, last, t0, t1 = stack.pop()
+        p0, p3 = points[first], points[last]
+        if last - first == 1:
+            dist = hypot(*_sub(p3, p0)) / 3
+            curves.append(Cubic(p0, _add_scaled(p0, t0, dist),
+                                _add_scaled(p3, t1, dist), p3, first, last))
+            continue
+
+        u = _chord_params(points, first, last)
+        ctrl = _generate(points, first, last, u, t0, t1)
+        worst, split = _max_error(points, first, last, ctrl, u)
+        if worst >= error_sq and worst < 4 * error_sq:
+            for _ in range(MAX_ITERATIONS):
+                u = _reparameterize(points, first, ctrl, u)
+                ctrl = _generate(points, first, last, u, t0, t1)
+                worst, split = _max_error(points, first, last, ctrl, u)
+                if worst < error_sq:
+                    break
+        if worst < error_sq:
+            curves.append(Cubic(*ctrl, first=first, last=last))
+            continue
+
+        # Split at the worst point, with a common tangent either side.
+        centre = _unit(_sub(points[split - 1], points[split + 1]))
+        if centre == (0.0, 0.0):
+            centre = _unit(_sub(points[split - 1], points[split]))
+        stack.append((split, last, (-centre[0], -centre[1]), t1))
+        stack.append((first, split, t0, centre))
+    return curves
+
+def fit_cubics(points, error):
+    '''Fit cubic Bézier curves to a sequence of points.
+
+        >>> arc = [(x, (x * (10 - x)) / 5) for x in range(11)]
+        >>> [(c.p0, c.p1) for c in fit_cubics(arc, 0.5)]
+        [((0.0, 0.0), (10.0, 0.0))]
+
+    Keyword arguments:
+        points -- A sequence of (x, y) points.
+        error -- The greatest distance by which the curves may miss
+            any of the points.
+    Returns:
+        A list of Cubic named tuples, each joining smoothly onto the
+        one before. The first and last attributes of each are indices
+        into the points after consecutive duplicates are removed.
+
+    '''
+    points = _dedupe(points)
+    if len(points) < 2:
+        return []
+    return _fit(points, error)
+
+def cubics_to_data(cubics, datatype=PathParams.default('DATATYPE'),
+                   scale=PathParams.default('SCALE'),
+                   bias=PathParams.default('BIAS'), move=True):
+    '''Turn fitted curves into path segment data.
+
+    Keyword arguments:
+        cubics -- A sequence of Cubic named tuples, in user coordinates.
+        datatype, scale, bias -- The datatype, scale and bias of the
+            path that the data is destined for.
+        move -- Whether to begin with a MOVE_TO the start of the first
+            curve. The default is True.
+    Returns:
+        A 2-tuple of a list of segment commands and a list of the
+        coordinate data, ready to be passed to Path.append_data().
+
+    '''
+    commands, coords = [], []
+    if move and cubics:
+        commands.append(SegmentCommand(PathSegments.MOVE_TO))
+        coords.extend(cubics[0].p0)
+    for curve in cubics:
+        commands.append(SegmentCommand(PathSegments.CUBIC_TO))
+        coords.extend(curve.ctrl0 + curve.ctrl1 + curve.p1)
+    return commands, convert_data(coords, PathDatatypes.F, 1.0, 0.0,
+                                  datatype, scale, bias)
+
+class StrokeFitter:
+    '''Fits cubic curves to a stroke incrementally, as points arrive.
+
+    Only the tail of the stroke (the points after the last curve that
+    is settled) is refitted as each point arrives, and the curves are
+    written straight into a path: the last CUBIC_TO in the path holds
+    the tail curve, and is rewritten in place while the tail is still
+    changing. When part of the tail settles, it takes over that segment
+    and the new tail curve is appended after it.
+
+    Instance attributes:
+        error -- The greatest distance by which the curves may miss any
+            of the input points.
+        path -- The Path that the curves are written into. It needs the
+            MODIFY capability.
+        curves -- The settled Cubic named tuples, not including the
+            tail curve.
+
+    '''
+    def __init__(self, error=1.0, path=None):
+        '''Initialise the fitter.
+
+        Keyword arguments:
+            error -- As the instance attribute. The default is 1.0.
+            path -- An optional empty path to write the curves into. If
+                omitted, a new one is created with datatype F.
+
+        '''
+        self.error = error
+        self.path = (Path(datatype=PathDatatypes.F) if path is None else
+                     path)
+        self.curves = []
+        # The unsettled points, the tangent that the tail must start with
+        # to join smoothly onto the settled curves, the tail curve itself,
+        # and the index of its segment in the path.
+        self._tail, self._tangent = [], None
+        self._tail_curve = self._tail_segment = None
+
+    def __len__(self):
+        '''Get the number of curves, including the tail curve.'''
+        return len(self.curves) + (self._tail_curve is not None)
+
+    @property
+    def all_curves(self):
+        '''Get all curves fitted so far, including the tail curve.'''
+        return self.curves + ([] if self._tail_curve is None else
+                              [self._tail_curve])
+
+    def _data(self, curves):
+        '''Get the coordinate data of curves in the path's terms.'''
+        return cubics_to_data(curves, self.path.datatype, self.path.scale,
+                              self.path.bias, move=False)
+
+    def add_point(self, point):
+        '''Add one point to the stroke.'''
+        self.extend((point,))
+
+    def extend(self, points):
+        '''Add points to the stroke and refit its tail.
+
+        However many points are added, this results in at most one
+        vgModifyPathCoords() call (for the old tail curve) and one
+        vgAppendPathData() call (for any further curves).
+
+        Keyword arguments:
+            points -- A sequence of (x, y) points, in user coordinates.
+
+        '''
+        last = self._tail[-1:]
+        points = _dedupe(last + list(points))[len(last):]
+        if not points:
+            return
+        if not self._tail:
+            # The very first point: start the path there.
+            self.path.append_data(
+                [SegmentCommand(PathSegments.MOVE_TO)],
+                convert_data(points[0], PathDatatypes.F, 1.0, 0.0,
+                             self.path.datatype, self.path.scale,
+                             self.path.bias))
+        self._tail.extend(points)
+        if len(self._tail) < 2:
+            return
+
+        fitted = _fit(self._tail, self.error, tan0=self._tangent)
+        settled, tail = fitted[:-1], fitted[-1]
+
+        # The old tail curve's segment is rewritten with the first new curve,
+        # and the rest are appended after it. (Segment 0 is the MOVE_TO.)
+        first_segment = 1 if self._tail_segment is None else self._tail_segment
+        commands, data = self._data(fitted)
+        if self._tail_segment is not None:
+            self.path.modify_path(self._tail_segment, 1, data[:6])
+            commands, data = commands[1:], data[6:]
+        if commands:
+            self.path.append_data(commands, data)
+        self._tail_segment = first_segment + len(settled)
+
+        if settled:
+            # Keep only the tail's points, and make sure the refitted tail
+            # will always join smoothly onto the settled curves.
+            self.curves.extend(settled)
+            self._tail = self._tail[tail.first:]
+            tail = tail._replace(first=0, last=len(self._tail) - 1)
+            tangent = _unit(_sub(tail.ctrl0, tail.p0))
+            self._tangent = None if tangent == (0.0, 0.0) else tangent
+        self._tail_curve = tail
+
+    def clear(self):
+        '''Remove the whole stroke from the fitter and its path.'''
+        self.path.clear()
+        self.curves = []
+        self._tail, self._tangent = [], None
+        self._tail_curve = self._tail_segment = None
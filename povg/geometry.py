@@ -0,0 +1,749 @@
+#!/usr/bin/env python3
+
+'''Client-side path geometry.
+
+OpenVG keeps path data on the server side, and offers no way to read it
+back. The functions in this module work on the same segment commands
+and coordinate data that are handed to vgAppendPathData(), so that
+geometric queries (hit-testing, bounds, simplification and the like) can
+be answered in Python without any native calls.
+
+This module does not depend on the native OpenVG library.
+
+'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+__all__ = ['PathSegments', 'SegmentCommand', 'Subpath', 'coord_count',
+           'normalize', 'polylines', 'transform_polylines', 'bounds',
+           'winding_number', 'contains', 'near_stroke', 'intersects_rect',
+           'clip_polylines', 'significance', 'simplify_polylines']
+
+# Standard library imports.
+from collections import namedtuple
+from heapq import heapify, heappop, heappush
+from math import atan2, ceil, cos, hypot, inf, pi, radians, sin, sqrt, tan
+
+# Segment commands.
+PathSegments = namedtuple('PathSegments_tuple',
+                          ('CLOSE_PATH', 'MOVE_TO', 'LINE_TO', 'HLINE_TO',
+                           'VLINE_TO', 'QUAD_TO', 'CUBIC_TO', 'SQUAD_TO',
+                           'SCUBIC_TO', 'SCCWARC_TO', 'SCWARC_TO',
+                           'LCCWARC_TO', 'LCWARC_TO')
+                          )(*range(13))
+
+def SegmentCommand(segment_type, is_absolute=True):
+    '''Get the OpenVG numeric value for a segment command.
+
+    A segment command comprises the segment type number (from the
+    PathSegments named tuple), left-shifted one bit and with the low bit
+    set to 1 (if the segment coordinates are relative to the last path
+    position) or 0 (if they are absolute).
+
+    Keyword arguments:
+        segment_type -- The type of segment. A value from the
+            PathSegments named tuple, or a name of one of its members.
+        is_absolute -- Whether or not this command is using absolute
+            instead of relative coordinates. Defaults to true.
+
+    '''
+    # Is segment_type a name or a number?
+    try:
+        segment_type = int(segment_type)
+    except ValueError:
+        # It's a name. If it's an invalid name, the resulting AttributeError
+        # will be allowed to propagate upwards.
+        segment_type = getattr(PathSegments, segment_type)
+    return 2 * segment_type + (0 if is_absolute else 1)
+
+# The number of coordinates taken by each segment type, in PathSegments order.
+_coord_counts = (0, 2, 2, 1, 1, 4, 6, 2, 4, 5, 5, 5, 5)
+
+def coord_count(command):
+    '''Get the number of coordinates used by a segment command.
+
+        >>> coord_count(SegmentCommand(PathSegments.CUBIC_TO))
+        6
+        >>> coord_count(SegmentCommand('HLINE_TO', is_absolute=False))
+        1
+
+    '''
+    return _coord_counts[command >> 1]
+
+# A flattened subpath: a list of (x, y) points, and whether it was closed.
+Subpath = namedtuple('Subpath', ('points', 'closed'))
+
+def _arc_to_cubics(start, radii, rotation, end, is_large, is_ccw):
+    '''Convert an OpenVG elliptical arc into cubic Bézier curves.
+
+    The endpoint parameterisation used by OpenVG (and SVG) is converted
+    to a centre parameterisation, which is then approximated by one
+    cubic for every quarter-turn or part thereof.
+
+    Returns:
+        A list of (ctrl0, ctrl1, pos) triples. The list is empty if the
+        arc is degenerate (the two endpoints coincide), and contains a
+        single straight "curve" if either radius is zero.
+
+    '''
+    (x1, y1), (x2, y2) = start, end
+    if (x1, y1) == (x2, y2):
+        return []
+    rx, ry = abs(radii[0]), abs(radii[1])
+    if rx == 0 or ry == 0:
+        return [(start, end, end)]
+
+    phi = radians(rotation)
+    cos_phi, sin_phi = cos(phi), sin(phi)
+
+    # Transform the midpoint into the ellipse's own coordinate frame.
+    dx, dy = (x1 - x2) / 2, (y1 - y2) / 2
+    x1p = cos_phi * dx + sin_phi * dy
+    y1p = -sin_phi * dx + cos_phi * dy
+
+    # Scale the radii up if there is no ellipse large enough to fit.
+    scale = (x1p / rx) ** 2 + (y1p / ry) ** 2
+    if scale > 1:
+        rx, ry = rx * sqrt(scale), ry * sqrt(scale)
+
+    # Find the centre.
+    num = rx * rx * ry * ry - rx * rx * y1p * y1p - ry * ry * x1p * x1p
+    den = rx * rx * y1p * y1p + ry * ry * x1p * x1p
+    coef = sqrt(max(0.0, num / den)) if den else 0.0
+    if is_large == is_ccw:
+        coef = -coef
+    cxp, cyp = coef * rx * y1p / ry, -coef * ry * x1p / rx
+    cx = cos_phi * cxp - sin_phi * cyp + (x1 + x2) / 2
+    cy = sin_phi * cxp + cos_phi * cyp + (y1 + y2) / 2
+
+    # Find the start angle and the angle swept (positive is anticlockwise).
+    theta = atan2((y1p - cyp) / ry, (x1p - cxp) / rx)
+    sweep = atan2((-y1p - cyp) / ry, (-x1p - cxp) / rx) - theta
+    if is_ccw and sweep < 0:
+        sweep += 2 * pi
+    elif not is_ccw and sweep > 0:
+        sweep -= 2 * pi
+
+    # Approximate each piece of no more than a quarter-turn with a cubic.
+    pieces = max(1, int(ceil(abs(sweep) / (pi / 2) - 1e-9)))
+    step = sweep / pieces
+    k = 4 / 3 * tan(step / 4)
+
+    def to_user(ux, uy):
+        return (cx + rx * cos_phi * ux - ry * sin_phi * uy,
+                cy + rx * sin_phi * ux + ry * cos_phi * uy)
+
+    curves = []
+    for n in range(pieces):
+        a0, a1 = theta + n * step, theta + (n + 1) * step
+        c0, s0, c1, s1 = cos(a0), sin(a0), cos(a1), sin(a1)
+        curves.append((to_user(c0 - k * s0, s0 + k * c0),
+                       to_user(c1 + k * s1, s1 - k * c1),
+                       to_user(c1, s1)))
+    # Land exactly on the requested endpoint.
+    curves[-1] = curves[-1][:2] + (end,)
+    return curves
+
+def normalize(commands, data, scale=1.0, bias=0.0):
+    '''Reduce path segments to a small set of absolute segment types.
+
+    Relative coordinates are made absolute, horizontal and vertical
+    lines become ordinary lines, smooth curves have their implied
+    control points filled in, and elliptical arcs are approximated by
+    cubic curves. Coordinates are converted from the path's datatype to
+    user coordinates using its scale and bias.
+
+        >>> cmds = (SegmentCommand('MOVE_TO'), SegmentCommand('HLINE_TO',
+        ...         is_absolute=False), SegmentCommand('CLOSE_PATH'))
+        >>> list(normalize(cmds, (1, 2, 3)))
+        [(1, ((1.0, 2.0),)), (2, ((4.0, 2.0),)), (0, ())]
+
+    Keyword arguments:
+        commands -- A sequence of segment commands, as obtained from
+            SegmentCommand.
+        data -- A flat sequence of the coordinate data for all of the
+            segments.
+        scale, bias -- The scale and bias of the path that the data
+            belongs to. The defaults are 1.0 and 0.0 respectively.
+    Yields:
+        2-tuples of the segment type (CLOSE_PATH, MOVE_TO, LINE_TO,
+        QUAD_TO or CUBIC_TO from PathSegments) and a tuple of the
+        absolute (x, y) points for that segment, the last of which is
+        the segment's endpoint.
+
+    '''
+    start = current = (0.0, 0.0)
+    # The last control point of a preceding quadratic or cubic curve, for
+    # the benefit of smooth curves that follow.
+    last_quad = last_cubic = None
+    pos = 0
+    for command in commands:
+        segment_type, is_relative = command >> 1, command & 1
+        count = _coord_counts[segment_type]
+        coords = [c * scale + bias for c in data[pos:pos + count]]
+        if len(coords) != count:
+            raise ValueError('not enough coordinate data for segments')
+        pos += count
+        ox, oy = current if is_relative else (0.0, 0.0)
+        prev_quad, prev_cubic = last_quad, last_cubic
+        last_quad = last_cubic = None
+
+        if segment_type == PathSegments.CLOSE_PATH:
+            current = start
+            yield (PathSegments.CLOSE_PATH, ())
+        elif segment_type == PathSegments.MOVE_TO:
+            start = current = (coords[0] + ox, coords[1] + oy)
+            yield (PathSegments.MOVE_TO, (current,))
+        elif segment_type in (PathSegments.LINE_TO, PathSegments.HLINE_TO,
+                              PathSegments.VLINE_TO):
+            if segment_type == PathSegments.LINE_TO:
+                current = (coords[0] + ox, coords[1] + oy)
+            elif segment_type == PathSegments.HLINE_TO:
+                current = (coords[0] + ox, current[1])
+            else:
+                current = (current[0], coords[0] + oy)
+            yield (PathSegments.LINE_TO, (current,))
+        elif segment_type in (PathSegments.QUAD_TO, PathSegments.SQUAD_TO):
+            if segment_type == PathSegments.QUAD_TO:
+                ctrl = (coords[0] + ox, coords[1] + oy)
+                end = (coords[2] + ox, coords[3] + oy)
+            else:
+                ctrl = (current if prev_quad is None else
+                        (2 * current[0] - prev_quad[0],
+                         2 * current[1] - prev_quad[1]))
+                end = (coords[0] + ox, coords[1] + oy)
+            current, last_quad = end, ctrl
+            yield (PathSegments.QUAD_TO, (ctrl, end))
+        elif segment_type in (PathSegments.CUBIC_TO, PathSegments.SCUBIC_TO):
+            if segment_type == PathSegments.CUBIC_TO:
+                ctrl0 = (coords[0] + ox, coords[1] + oy)
+                rest = coords[2:]
+            else:
+                ctrl0 = (current if prev_cubic is None else
+                         (2 * current[0] - prev_cubic[0],
+                          2 * current[1] - prev_cubic[1]))
+                rest = coords
+            ctrl1 = (rest[0] + ox, rest[1] + oy)
+            end = (rest[2] + ox, rest[3] + oy)
+            current, last_cubic = end, ctrl1
+            yield (PathSegments.CUBIC_TO, (ctrl0, ctrl1, end))
+        else:
+            # One of the four elliptical arcs.
+            end = (coords[3] + ox, coords[4] + oy)
+            is_large = segment_type in (PathSegments.LCCWARC_TO,
+                                        PathSegments.LCWARC_TO)
+            is_ccw = segment_type in (PathSegments.SCCWARC_TO,
+                                      PathSegments.LCCWARC_TO)
+            for curve in _arc_to_cubics(current, coords[:2], coords[2], end,
+                                        is_large, is_ccw):
+                yield (PathSegments.CUBIC_TO, curve)
+            current = end
+
+def _curve_steps(points, degree, tolerance):
+    '''Get the number of line segments needed to flatten a curve.
+
+    This uses Wang's formula, which bounds the distance between a
+    Bézier curve and its evenly subdivided control polygon.
+
+    '''
+    second_diff = max(hypot(points[i][0] - 2 * points[i + 1][0] +
+                            points[i + 2][0],
+                            points[i][1] - 2 * points[i + 1][1] +
+                            points[i + 2][1])
+                      for i in range(len(points) - 2))
+    steps = sqrt(degree * (degree - 1) / 8 * second_diff / tolerance)
+    return max(1, int(ceil(steps)))
+
+def polylines(commands, data, scale=1.0, bias=0.0, tolerance=0.25):
+    '''Flatten path segments into polylines.
+
+    Each subpath of the path becomes one Subpath of straight lines. As
+    in OpenVG, a path begins at the origin, and a subpath that follows
+    a CLOSE_PATH without an intervening MOVE_TO begins at the start of
+    the subpath just closed.
+
+        >>> cmds = (SegmentCommand('MOVE_TO'), SegmentCommand('LINE_TO'),
+        ...         SegmentCommand('LINE_TO'), SegmentCommand('CLOSE_PATH'))
+        >>> polylines(cmds, (0, 0, 4, 0, 4, 3))
+        [Subpath(points=[(0.0, 0.0), (4.0, 0.0), (4.0, 3.0)], closed=True)]
+
+    Keyword arguments:
+        commands, data, scale, bias -- As for normalize().
+        tolerance -- The greatest distance, in user coordinates, by
+            which the flattened curves may depart from the true curves.
+            The default is 0.25.
+    Returns:
+        A list of Subpath named tuples. Subpaths consisting of a lone
+        MOVE_TO are omitted.
+
+    '''
+    result = []
+    points, start = None, (0.0, 0.0)
+
+    def finish(closed):
+        if points is not None and len(points) > 1:
+            result.append(Subpath(points, closed))
+
+    for segment_type, seg_points in normalize(commands, data, scale, bias):
+        if segment_type == PathSegments.MOVE_TO:
+            finish(False)
+            start = seg_points[0]
+            points = [start]
+            continue
+        elif segment_type == PathSegments.CLOSE_PATH:
+            finish(True)
+            points = None
+            continue
+
+        if points is None:
+            # Drawing without a preceding MOVE_TO.
+            points = [start]
+        if segment_type == PathSegments.LINE_TO:
+            points.append(seg_points[0])
+        else:
+            control = [points[-1]] + list(seg_points)
+            degree = len(control) - 1
+            steps = _curve_steps(control, degree, tolerance)
+            for n in range(1, steps):
+                t = n / steps
+                u = 1 - t
+                if degree == 2:
+                    coefs = (u * u, 2 * u * t, t * t)
+                else:
+                    coefs = (u * u * u, 3 * u * u * t, 3 * u * t * t,
+                             t * t * t)
+                points.append((sum(c * p[0] for c, p in zip(coefs, control)),
+                               sum(c * p[1] for c, p in zip(coefs, control))))
+            points.append(seg_points[-1])
+    finish(False)
+    return result
+
+def transform_polylines(subpaths, matrix):
+    '''Apply a transform matrix to flattened subpaths.
+
+    Keyword arguments:
+        subpaths -- A sequence of Subpath named tuples.
+        matrix -- The nine values of a 3×3 transform matrix, in the
+            order used by vgLoadMatrix() (sx, shy, w0, shx, sy, w1,
+            tx, ty, w2).
+    Returns:
+        A list of new Subpath named tuples.
+
+    '''
+    sx, shy, w0, shx, sy, w1, tx, ty, w2 = matrix
+    if (w0, w1, w2) == (0, 0, 1):
+        return [Subpath([(sx * x + shx * y + tx, shy * x + sy * y + ty)
+                         for x, y in sp.points], sp.closed)
+                for sp in subpaths]
+
+    def project(x, y):
+        w = w0 * x + w1 * y + w2
+        return ((sx * x + shx * y + tx) / w, (shy * x + sy * y + ty) / w)
+    return [Subpath([project(x, y) for x, y in sp.points], sp.closed)
+            for sp in subpaths]
+
+def bounds(subpaths):
+    '''Get the bounding box of flattened subpaths.
+
+    Returns:
+        An (x, y, width, height) 4-tuple, in the same form as returned
+        by Path.bounds(), or None if there are no points at all.
+
+    '''
+    xs = [x for sp in subpaths for x, _ in sp.points]
+    if not xs:
+        return None
+    ys = [y for sp in subpaths for _, y in sp.points]
+    min_x, min_y = min(xs), min(ys)
+    return (min_x, min_y, max(xs) - min_x, max(ys) - min_y)
+
+def winding_number(subpaths, point):
+    '''Get the winding number of flattened subpaths around a point.
+
+    All subpaths are treated as closed, as they are when OpenVG fills a
+    path. Anticlockwise windings count as positive.
+
+    '''
+    px, py = point
+    winding = 0
+    for sp in subpaths:
+        pts = sp.points
+        x0, y0 = pts[-1]
+        for x1, y1 in pts:
+            # Which side of the edge the point is on.
+            side = (x1 - x0) * (py - y0) - (px - x0) * (y1 - y0)
+            if y0 <= py:
+                if y1 > py and side > 0:
+                    winding += 1
+            elif y1 <= py and side < 0:
+                winding -= 1
+            x0, y0 = x1, y1
+    return winding
+
+def contains(subpaths, point, even_odd=False):
+    '''Test whether a point lies within the filled area of subpaths.
+
+        >>> square = [Subpath([(0, 0), (4, 0), (4, 4), (0, 4)], True)]
+        >>> contains(square, (2, 2)), contains(square, (5, 2))
+        (True, False)
+        >>> contains(square * 2, (2, 2)), contains(square * 2, (2, 2), True)
+        (True, False)
+
+    Keyword arguments:
+        subpaths -- A sequence of Subpath named tuples.
+        point -- The (x, y) coordinates of the point to test.
+        even_odd -- Whether to apply the even/odd fill rule. If False
+            (the default), the non-zero fill rule is used.
+
+    '''
+    winding = winding_number(subpaths, point)
+    return bool(winding % 2) if even_odd else winding != 0
+
+def _segments(subpath, closed=None):
+    '''Iterate over the line segments of a subpath.
+
+    The closing segment is included if the subpath is closed, or if the
+    closed argument is True.
+
+    '''
+    pts = subpath.points
+    if closed or subpath.closed:
+        yield pts[-1], pts[0]
+    for n in range(1, len(pts)):
+        yield pts[n - 1], pts[n]
+
+def _segment_distance_sq(point, a, b):
+    '''Get the squared distance from a point to a line segment.'''
+    (px, py), (ax, ay), (bx, by) = point, a, b
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq:
+        t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+        ax, ay = ax + t * dx, ay + t * dy
+    return (px - ax) ** 2 + (py - ay) ** 2
+
+def near_stroke(subpaths, point, radius):
+    '''Test whether a point lies within some distance of the path outline.
+
+    This approximates hit-testing against a stroke of width 2 × radius,
+    without regard to cap and join styles or dashing.
+
+    '''
+    limit = radius * radius
+    return any(_segment_distance_sq(point, a, b) <= limit
+               for sp in subpaths for a, b in _segments(sp))
+
+def _clip_segment(a, b, rect):
+    '''Clip a line segment to a rectangle.
+
+    This is Liang-Barsky parametric clipping, which stops as soon as the
+    segment is found to be entirely outside.
+
+    Returns:
+        A 2-tuple of the parameters (from 0 at a to 1 at b) at which the
+        segment enters and leaves the rectangle, or None if it misses.
+
+    '''
+    x, y, width, height = rect
+    (ax, ay), (bx, by) = a, b
+    dx, dy = bx - ax, by - ay
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-dx, ax - x), (dx, x + width - ax),
+                 (-dy, ay - y), (dy, y + height - ay)):
+        if p == 0:
+            if q < 0:
+                return None
+        else:
+            t = q / p
+            if p < 0:
+                if t > t1:
+                    return None
+                t0 = max(t0, t)
+            else:
+                if t < t0:
+                    return None
+                t1 = min(t1, t)
+    return t0, t1
+
+def intersects_rect(subpaths, rect, fill=True, even_odd=False, radius=0.0):
+    '''Test whether a rectangle touches a path.
+
+    Keyword arguments:
+        subpaths -- A sequence of Subpath named tuples.
+        rect -- An (x, y, width, height) 4-tuple.
+        fill -- Whether the filled area of the path counts, as well as
+            its outline. The default is True.
+        even_odd -- Whether to apply the even/odd fill rule when testing
+            the filled area. The default is False (non-zero).
+        radius -- An optional distance by which to grow the rectangle
+            when testing against the outline, such as half the stroke
+            width. The default is 0.0.
+
+    '''
+    x, y, width, height = rect
+    grown = (x - radius, y - radius, width + 2 * radius, height + 2 * radius)
+    for sp in subpaths:
+        for a, b in _segments(sp, closed=fill):
+            if _clip_segment(a, b, grown) is not None:
+                return True
+    # No edge enters the rectangle, so it is either wholly inside the fill
+    # or wholly outside it.
+    return fill and contains(subpaths, (x + width / 2, y + height / 2),
+                             even_odd)
+
+def _clip_ring(points, rect):
+    '''Clip a polygon to a rectangle, one edge at a time.
+
+    This is Sutherland-Hodgman clipping. The result may have edges lying
+    along the rectangle's boundary where parts of the polygon were cut
+    away, but its winding number is unchanged everywhere inside the
+    rectangle.
+
+    '''
+    x, y, width, height = rect
+    # Each edge is given as the axis it crosses, its position on that axis,
+    # and which side of it (+1 above, -1 below) is inside.
+    for axis, limit, side in ((0, x, 1), (0, x + width, -1),
+                              (1, y, 1), (1, y + height, -1)):
+        if not points:
+            break
+        result = []
+        prev = points[-1]
+        prev_in = (prev[axis] - limit) * side >= 0
+        for pt in points:
+            pt_in = (pt[axis] - limit) * side >= 0
+            if pt_in != prev_in:
+                t = (limit - prev[axis]) / (pt[axis] - prev[axis])
+                other = 1 - axis
+                crossing = [0.0, 0.0]
+                crossing[axis] = float(limit)
+                crossing[other] = prev[other] + (pt[other] - prev[other]) * t
+                crossing = tuple(crossing)
+                if not result or crossing != result[-1]:
+                    result.append(crossing)
+            if pt_in and (not result or pt != result[-1]):
+                result.append(pt)
+            prev, prev_in = pt, pt_in
+        points = result
+    return points
+
+def _clip_polyline(points, closed, rect):
+    '''Clip a polyline to a rectangle, splitting it where it leaves.'''
+    pieces, piece = [], None
+    pairs = list(zip(points, points[1:]))
+    if closed:
+        pairs.append((points[-1], points[0]))
+    for a, b in pairs:
+        span = _clip_segment(a, b, rect)
+        if span is None or span[0] >= span[1]:
+            # Missed the rectangle, or only touched a corner of it.
+            piece = None
+            continue
+        t0, t1 = span
+        start = a if t0 == 0 else (a[0] + (b[0] - a[0]) * t0,
+                                   a[1] + (b[1] - a[1]) * t0)
+        end = b if t1 == 1 else (a[0] + (b[0] - a[0]) * t1,
+                                 a[1] + (b[1] - a[1]) * t1)
+        if piece is None or t0 != 0:
+            piece = [start]
+            pieces.append(piece)
+        piece.append(end)
+        if t1 != 1:
+            piece = None
+
+    if closed and pieces:
+        if len(pieces) == 1 and len(pieces[0]) == len(points) + 1:
+            # Nothing was clipped away.
+            return [Subpath(list(points), True)]
+        if (len(pieces) > 1 and pieces[0][0] == points[0] and
+                pieces[-1][-1] == points[0]):
+            # The first piece carries on from the closing segment.
+            pieces[0] = pieces.pop() + pieces[0][1:]
+    return [Subpath(piece, False) for piece in pieces]
+
+def clip_polylines(subpaths, rect, fill=True):
+    '''Clip flattened subpaths to a rectangle.
+
+    Filled and stroked geometry need clipping differently. For a fill,
+    each subpath is clipped as a polygon, and stays closed; the winding
+    number of every point inside the rectangle is unchanged, so either
+    fill rule gives the same result there. For a stroke, each subpath is
+    cut into the pieces that lie inside the rectangle, which will have
+    caps drawn where they were cut: the rectangle should exceed the
+    visible area by enough to hide those, such as half the stroke width
+    (or the miter limit times that, for mitered joins).
+
+        >>> square = Subpath([(-5.0, -5.0), (5.0, -5.0), (5.0, 5.0),
+        ...                   (-5.0, 5.0)], True)
+        >>> clip_polylines([square], (0, 0, 10, 10))
+        ... # doctest: +NORMALIZE_WHITESPACE
+        [Subpath(points=[(0.0, 0.0), (5.0, 0.0), (5.0, 5.0), (0.0, 5.0)],
+                 closed=True)]
+        >>> clip_polylines([square], (0, 0, 10, 10), fill=False)
+        [Subpath(points=[(5.0, 0.0), (5.0, 5.0), (0.0, 5.0)], closed=False)]
+
+    Keyword arguments:
+        subpaths -- A sequence of Subpath named tuples.
+        rect -- An (x, y, width, height) 4-tuple.
+        fill -- Whether to clip for filling (the default) or stroking.
+    Returns:
+        A list of Subpath named tuples. Those lying wholly outside the
+        rectangle are left out.
+
+    '''
+    result = []
+    for sp in subpaths:
+        if fill:
+            points = _clip_ring(sp.points, rect)
+            if len(points) > 2:
+                result.append(Subpath(points, True))
+        else:
+            result.extend(_clip_polyline(sp.points, sp.closed, rect))
+    return result
+
+def _dp_significance(points):
+    '''Rank polyline vertices by Douglas-Peucker significance.
+
+    The significance of a vertex is the greatest tolerance at which the
+    Douglas-Peucker algorithm would keep it. That is its distance from
+    the chord it was split from, capped by the significance of the
+    vertex that made that chord, since the algorithm would never have
+    got that far otherwise.
+
+    '''
+    sig = [0.0] * len(points)
+    sig[0] = sig[-1] = inf
+    stack = [(0, len(points) - 1, inf)]
+    while stack:
+        first, last, limit = stack.pop()
+        if last - first < 2:
+            continue
+        a, b = points[first], points[last]
+        best, index = -1.0, first + 1
+        for n in range(first + 1, last):
+            dist = _segment_distance_sq(points[n], a, b)
+            if dist > best:
+                best, index = dist, n
+        best = min(sqrt(best), limit)
+        sig[index] = best
+        stack.append((first, index, best))
+        stack.append((index, last, best))
+    return sig
+
+def _vw_significance(points):
+    '''Rank polyline vertices by Visvalingam-Whyatt significance.
+
+    The significance of a vertex is the area of the triangle it forms
+    with its neighbours at the moment it would be eliminated, never less
+    than that of any vertex eliminated before it. This is returned as
+    the square root of the area, so that it can be compared against
+    tolerances in units of length.
+
+    '''
+    count = len(points)
+    sig = [0.0] * count
+    sig[0] = sig[-1] = inf
+    prev, nxt = list(range(-1, count - 1)), list(range(1, count + 1))
+    version = [0] * count
+
+    def area(n):
+        (ax, ay), (bx, by), (cx, cy) = (points[prev[n]], points[n],
+                                        points[nxt[n]])
+        return abs((bx - ax) * (cy - ay) - (cx - ax) * (by - ay)) / 2
+
+    heap = [(area(n), n, 0) for n in range(1, count - 1)]
+    heapify(heap)
+    floor_area = 0.0
+    while heap:
+        this_area, n, ver = heappop(heap)
+        if ver != version[n]:
+            # Stale entry; the vertex's area has been updated since.
+            continue
+        floor_area = max(floor_area, this_area)
+        sig[n] = sqrt(floor_area)
+        before, after = prev[n], nxt[n]
+        nxt[before], prev[after] = after, before
+        for neighbour in (before, after):
+            if 0 < neighbour < count - 1:
+                version[neighbour] += 1
+                heappush(heap, (area(neighbour), neighbour,
+                                version[neighbour]))
+    return sig
+
+def significance(subpath, method='douglas-peucker'):
+    '''Rank the vertices of a flattened subpath for simplification.
+
+    Computing this once allows a subpath to be simplified to any number
+    of tolerances at little extra cost: a vertex survives simplification
+    at a given tolerance if its significance is greater than the
+    tolerance. The endpoints of an open subpath always survive, as do at
+    least three vertices of a closed subpath (if it has that many).
+
+    Keyword arguments:
+        subpath -- A Subpath named tuple.
+        method -- The simplification algorithm: either
+            'douglas-peucker' (the default) or 'visvalingam'. For the
+            latter, the significance is the square root of the
+            effective area of each vertex.
+    Returns:
+        A list of the significance of each point in the subpath.
+
+    '''
+    try:
+        rank = {'douglas-peucker': _dp_significance,
+                'visvalingam': _vw_significance}[method]
+    except KeyError:
+        raise ValueError('unknown simplification method: '
+                         '{!r}'.format(method))
+
+    points = subpath.points
+    if not subpath.closed or len(points) < 3:
+        return rank(points)
+
+    # Work on the ring as a polyline that starts and ends on its first
+    # point, and make sure that it can't collapse below a triangle.
+    explicit_end = points[-1] == points[0]
+    sig = rank(points if explicit_end else points + [points[0]])
+    interior = sorted(range(1, len(sig) - 1), key=sig.__getitem__)
+    for n in interior[-2:]:
+        sig[n] = inf
+    return sig if explicit_end else sig[:-1]
+
+def simplify_polylines(subpaths, tolerances, method='douglas-peucker'):
+    '''Simplify flattened subpaths to one or more tolerances.
+
+        >>> zigzag = Subpath([(0, 0), (1, 0.1), (2, 0), (3, 2), (4, 0)],
+        ...                  False)
+        >>> for level in simplify_polylines([zigzag], (0.5, 5)):
+        ...     print(level[0].points)
+        [(0, 0), (2, 0), (3, 2), (4, 0)]
+        [(0, 0), (4, 0)]
+
+    Keyword arguments:
+        subpaths -- A sequence of Subpath named tuples.
+        tolerances -- A sequence of tolerances, in user coordinates.
+        method -- As for significance().
+    Returns:
+        A list containing, for each tolerance, a list of simplified
+        Subpath named tuples.
+
+    '''
+    ranked = [(sp, significance(sp, method)) for sp in subpaths]
+    return [[Subpath([pt for pt, s in zip(sp.points, sig) if s > tolerance],
+                     sp.closed)
+             for sp, sig in ranked]
+            for tolerance in tolerances]
@@ -5,7 +5,9 @@
 In OpenVG matrix operations, there is one "current" matrix on which all
 operations are performed. Matrices can be read out and loaded in at
 will, but only the last one loaded can be operated on. This module
-abstracts away that restriction into a Matrix class.
+abstracts away that restriction into a Matrix class, which does its
+arithmetic on the client side and only touches OpenVG when a matrix is
+explicitly loaded into, or read from, the current matrix.
 
 '''
 # Copyright © 2013 Tim Pederick.
@@ -26,47 +28,125 @@ abstracts away that restriction into a Matrix class.
 # along with Povg. If not, see <http://www.gnu.org/licenses/>.
 
 # Standard library imports.
+from array import array
 from ctypes import c_float
-from math import degrees
+from math import cos, radians, sin
 
 # Local imports.
 from . import flatten, unflatten
-from .native import (vgLoadIdentity, vgLoadMatrix, vgGetMatrix,
-                     vgMultMatrix, vgTranslate, vgScale, vgShear, vgRotate)
+from .native import vgLoadMatrix, vgGetMatrix, vgSeti, MATRIX_MODE
 
 # ctypes floating-point matrix type.
 matrix_type = (c_float * 9)
 
+def _f32(values):
+    '''Round values to single precision, as OpenVG stores them.'''
+    return tuple(array('f', values))
+
+def _angle(name, rad, deg):
+    '''Get an angle in radians from exactly one of radians or degrees.'''
+    if rad is None:
+        if deg is None:
+            raise TypeError('{} requires exactly 1 angle argument, '
+                            'got 0'.format(name))
+        return radians(deg)
+    elif deg is not None:
+        raise TypeError('{} requires exactly 1 angle argument, '
+                        'got 2'.format(name))
+    return rad
+
 class Matrix:
-    '''Represents a 3×3 transform matrix.'''
+    '''Represents a 3×3 transform matrix.
+
+    A point (x, y) is transformed to (x', y') as follows:
+
+        ⎡x'⎤   ⎡sx  shx tx⎤ ⎡x⎤
+        ⎢y'⎥ = ⎢shy sy  ty⎥ ⎢y⎥
+        ⎣w ⎦   ⎣w0  w1  w2⎦ ⎣1⎦
+
+    The rows attribute (and indexing) follow OpenVG's order of values,
+    so that each "row" is one column of the matrix as written above:
+    ((sx, shy, w0), (shx, sy, w1), (tx, ty, w2)). The same nine values
+    are given flat by the values property. All values are rounded to
+    single precision, exactly as OpenVG would store them, so a matrix
+    loaded into OpenVG and read back out again is unchanged.
+
+    Like OpenVG's own operations, each transform method right-multiplies
+    this matrix: the new transform is applied to points first.
+
+    Matrices compare equal when their values are equal. Since the
+    transform methods change a matrix in place, matrices are deliberately
+    unhashable; use the values property as a dictionary key instead.
+
+        >>> m = Matrix()
+        >>> m.translate(10, 20)
+        >>> m.scale(2, 4)
+        >>> m.transform_point((1, 1))
+        (12.0, 24.0)
+        >>> m.inverse().transform_point((12, 24))
+        (1.0, 1.0)
+
+    '''
     SIZE = 3
     def __init__(self, rows=None, from_current=False):
         '''Initialise this matrix.
 
         Keyword arguments:
             rows -- An optional 3-tuple of 3-tuples from which to
-                populate this matrix.
+                populate this matrix, in OpenVG's order (see the rows
+                attribute).
             from_current -- Whether or not to populate this matrix from
                 the current OpenVG matrix. Ignored if rows is not None.
                 If rows is omitted and from_current is False (the
-                default), the OpenVG matrix will be set to the identity
-                matrix, and that will be copied into the new matrix.
+                default), this will be the identity matrix.
 
         '''
         if rows is None:
-            if not from_current:
-                vgLoadIdentity()
-            self._from_current()
+            if from_current:
+                self._from_current()
+            else:
+                self._m = ((1.0, 0.0, 0.0), (0.0, 1.0, 0.0),
+                           (0.0, 0.0, 1.0))
         else:
-            self.rows = rows
-            assert (len(self.rows) == self.SIZE and
-                    all(len(row) == self.SIZE for row in self.rows))
+            self.rows = unflatten(_f32(flatten(rows, self.SIZE)), self.SIZE)
+            assert len(self.rows) == self.SIZE
+
+    # The matrix is kept as its mathematical rows (in _m), which is the
+    # transpose of the rows attribute.
+    @property
+    def rows(self):
+        '''Get the matrix values, in OpenVG's order, as three 3-tuples.'''
+        return tuple(zip(*self._m))
+
+    @rows.setter
+    def rows(self, rows):
+        self._m = tuple(zip(*rows))
+
+    @classmethod
+    def from_values(cls, values):
+        '''Create a matrix from nine values in OpenVG's order.
+
+        Keyword arguments:
+            values -- The nine matrix values in the order used by
+                vgLoadMatrix() (sx, shy, w0, shx, sy, w1, tx, ty, w2).
+
+        '''
+        if len(values) != cls.SIZE * cls.SIZE:
+            raise ValueError('expected 9 values, got {}'.format(len(values)))
+        return cls(unflatten(tuple(values), cls.SIZE))
 
     def __repr__(self):
         return 'Matrix({!r})'.format(self.rows)
 
+    def __eq__(self, other):
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        return self._m == other._m
+
+    __hash__ = None
+
     def __contains__(self, val):
-        return any(val in row for row in rows)
+        return any(val in row for row in self.rows)
 
     def __getitem__(self, key):
         return self.rows[key]
@@ -76,7 +156,7 @@ class Matrix:
             raise IndexError('index out of range: {}'.format(key))
         elif len(val) != self.SIZE:
             raise ValueError('replacement row must be 1×{}'.format(self.SIZE))
-        self.rows = tuple(tuple(val) if key == n else self.rows[n]
+        self.rows = tuple(_f32(val) if key == n else self.rows[n]
                           for n in range(self.SIZE))
         assert (len(self.rows) == self.SIZE and
                 all(len(row) == self.SIZE for row in self.rows))
@@ -90,37 +170,100 @@ class Matrix:
     def __mul__(self, mat):
         '''Right-multiply this matrix by another.
 
-        After this operation, the resultant matrix will be the current
-        OpenVG matrix.
-
         Keyword arguments:
             mat -- The other matrix in the multiplication operation.
 
         '''
-        self.make_current()
-        vgMultMatrix(mat._as_parameter_)
-        result = Matrix()
-        result._from_current()
+        result = Matrix(self.rows)
+        result._multiply(mat._m)
         return result
 
     def __imul__(self, mat):
         '''Right-multiply this matrix by another, in place.
 
-        After this operation, this matrix will be the current OpenVG
-        matrix.
-
         Keyword arguments:
             mat -- The other matrix in the multiplication operation.
 
         '''
-        self.make_current()
-        vgMultMatrix(mat._as_parameter_)
-        self._from_current()
+        self._multiply(mat._m)
+        return self
+
+    def _multiply(self, rows):
+        '''Right-multiply this matrix by the given mathematical rows.'''
+        cols = tuple(zip(*rows))
+        self._m = tuple(_f32(sum(a * b for a, b in zip(row, col))
+                             for col in cols)
+                        for row in self._m)
 
     @property
     def is_affine(self):
         '''Determine whether this matrix is affine or projective.'''
-        return self[self.SIZE - 1] == (0,) * (self.SIZE - 1) + (1,)
+        return self._m[self.SIZE - 1] == (0,) * (self.SIZE - 1) + (1,)
+
+    @property
+    def determinant(self):
+        '''Get the determinant of this matrix.'''
+        (a, b, c), (d, e, f), (g, h, i) = self._m
+        return a * (e * i - f * h) - b * (d * i - f * g) + c * (d * h - e * g)
+
+    def inverse(self):
+        '''Get the inverse of this matrix.
+
+        Raises:
+            ValueError -- If this matrix is singular, and so has no
+                inverse.
+
+        '''
+        det = self.determinant
+        if det == 0:
+            raise ValueError('matrix is singular')
+        (a, b, c), (d, e, f), (g, h, i) = self._m
+        inverse = Matrix()
+        inverse._m = tuple(_f32(row) for row in
+                           (((e * i - f * h) / det, (c * h - b * i) / det,
+                             (b * f - c * e) / det),
+                            ((f * g - d * i) / det, (a * i - c * g) / det,
+                             (c * d - a * f) / det),
+                            ((d * h - e * g) / det, (b * g - a * h) / det,
+                             (a * e - b * d) / det)))
+        return inverse
+
+    def transform_point(self, point):
+        '''Apply this matrix to a single point.
+
+        Keyword arguments:
+            point -- An (x, y) 2-tuple.
+        Returns:
+            The transformed (x, y) 2-tuple. If this matrix is
+            projective, the result is divided through by w.
+
+        '''
+        return self.transform_points((point,))[0]
+
+    def transform_points(self, points):
+        '''Apply this matrix to a sequence of points.
+
+        Keyword arguments:
+            points -- A sequence of (x, y) 2-tuples.
+        Returns:
+            A list of the transformed (x, y) 2-tuples.
+
+        '''
+        (sx, shx, tx), (shy, sy, ty), (w0, w1, w2) = self._m
+        if self.is_affine:
+            return [(sx * x + shx * y + tx, shy * x + sy * y + ty)
+                    for x, y in points]
+        result = []
+        for x, y in points:
+            w = w0 * x + w1 * y + w2
+            result.append(((sx * x + shx * y + tx) / w,
+                           (shy * x + sy * y + ty) / w))
+        return result
+
+    @property
+    def values(self):
+        '''Get the nine values of this matrix in OpenVG's order.'''
+        return flatten(self.rows, self.SIZE)
 
     @property
     def _as_parameter_(self):
@@ -132,56 +275,47 @@ class Matrix:
         before passing it to a foreign function.
 
         '''
-        return matrix_type(*flatten(self.rows, self.SIZE))
+        return matrix_type(*self.values)
 
     def _from_current(self):
         '''Update this matrix to match the current OpenVG matrix.'''
         m = matrix_type()
         vgGetMatrix(m)
-        self.rows = unflatten(m, self.SIZE)
+        self.rows = unflatten(tuple(m), self.SIZE)
         assert len(self.rows) == self.SIZE
 
-    def make_current(self):
-        '''Make this matrix the current OpenVG matrix.'''
+    def make_current(self, mode=None):
+        '''Make this matrix the current OpenVG matrix.
+
+        Nothing is sent to OpenVG if this matrix is already current.
+
+        Keyword arguments:
+            mode -- The matrix mode (from the MatrixMode named tuple in
+                povg.context) to load this matrix into. If omitted, the
+                current matrix mode is used.
+
+        '''
+        if mode is not None:
+            vgSeti(MATRIX_MODE, mode)
         vgLoadMatrix(self._as_parameter_)
 
     def rotate(self, rad=None, deg=None):
         '''Apply a rotation to this matrix.
 
-        After this operation, this matrix will be the current OpenVG
-        matrix.
-
         Keyword arguments:
             rad, deg -- The angle of rotation, in radians or degrees,
                 respectively. Exactly one of these arguments must be
                 supplied. If a positional argument is supplied, it will
                 be interpreted as radians.
-            
-        '''
-        # Unlike Python, OpenVG operates in degrees. If we're not given
-        # radians...
-        if rad is None:
-            # ...use the given degrees.
-            if deg is None:
-                raise TypeError('rotate expected 1 argument, got 0')
-        else:
-            # But if we are given radians...
-            if deg is not None:
-                raise TypeError('rotate expected 1 argument, got 2')
-            else:
-                # ...convert them to degrees.
-                deg = degrees(rad)
 
-        self.make_current()
-        vgRotate(deg)
-        self._from_current()
+        '''
+        angle = _angle('rotate', rad, deg)
+        c, s = cos(angle), sin(angle)
+        self._multiply(((c, -s, 0.0), (s, c, 0.0), (0.0, 0.0, 1.0)))
 
     def rotate_about(self, cx=0.0, cy=0.0, rad=None, deg=None):
         '''Apply a rotation to this matrix about a given point.
 
-        After this operation, this matrix will be the current OpenVG
-        matrix.
-
         Keyword arguments:
             cx, cy -- The x and y coordinates of the centre of rotation.
                 Either or both may be omitted and will default to 0.0.
@@ -189,71 +323,41 @@ class Matrix:
                 respectively. Exactly one of these arguments must be
                 supplied. If a positional argument is supplied, it will
                 be interpreted as radians.
-            
-        '''
-        # Unlike Python, OpenVG operates in degrees. If we're not given
-        # radians...
-        if rad is None:
-            # ...use the given degrees.
-            if deg is None:
-                raise TypeError('rotate_about requires exactly 1 angle '
-                                'argument, got 0')
-        else:
-            # But if we are given radians...
-            if deg is not None:
-                raise TypeError('rotate_about requires exactly 1 angle '
-                                'argument, got 2')
-            else:
-                # ...convert them to degrees.
-                deg = degrees(rad)
 
-        self.make_current()
-        vgTranslate(cx, cy)
-        vgRotate(deg)
-        vgTranslate(-cx, -cy)
-        self._from_current()
+        '''
+        angle = _angle('rotate_about', rad, deg)
+        c, s = cos(angle), sin(angle)
+        # Translate to the centre, rotate, and translate back, all at once.
+        self._multiply(((c, -s, cx - c * cx + s * cy),
+                        (s, c, cy - s * cx - c * cy),
+                        (0.0, 0.0, 1.0)))
 
     def scale(self, sx=1.0, sy=1.0):
         '''Apply a scaling operation to this matrix.
 
-        After this operation, this matrix will be the current OpenVG
-        matrix.
-
         Keyword arguments:
             sx, sy -- The scale factor to apply in the x and y
                 directions, respectively. Either or both may be omitted
                 and will default to 1.0.
         '''
-        self.make_current()
-        vgScale(sx, sy)
-        self._from_current()
+        self._multiply(((sx, 0.0, 0.0), (0.0, sy, 0.0), (0.0, 0.0, 1.0)))
 
     def shear(self, shx=1.0, shy=1.0):
         '''Apply a shear operation to this matrix.
 
-        After this operation, this matrix will be the current OpenVG
-        matrix.
-
         Keyword arguments:
             shx, shy -- The shear factor to apply in the x and y
                 directions, respectively. Either or both may be omitted
                 and will default to 1.0.
         '''
-        self.make_current()
-        vgShear(shx, shy)
-        self._from_current()
+        self._multiply(((1.0, shx, 0.0), (shy, 1.0, 0.0), (0.0, 0.0, 1.0)))
 
     def translate(self, tx=0.0, ty=0.0):
         '''Apply a translation to this matrix.
 
-        After this operation, this matrix will be the current OpenVG
-        matrix.
-
         Keyword arguments:
             tx, ty -- The number of units to translate in the x and y
                 directions, respectively. Either or both may be omitted
                 and will default to 0.0.
         '''
-        self.make_current()
-        vgTranslate(tx, ty)
-        self._from_current()
+        self._multiply(((1.0, 0.0, tx), (0.0, 1.0, ty), (0.0, 0.0, 1.0)))
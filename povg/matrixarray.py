@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+
+'''Arrays of OpenVG transform matrices, using NumPy.
+
+A scene with many thousands of nodes needs many thousands of matrices,
+and recomputing them one Matrix object at a time is slow. This module
+keeps them all in one contiguous buffer and works on them all at once.
+It requires NumPy.
+
+'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+__all__ = ['MatrixArray']
+
+# NumPy imports.
+import numpy as np
+
+# Local imports.
+from .matrix import Matrix, matrix_type
+
+# The size in bytes of one matrix in the buffer.
+_MATRIX_BYTES = 9 * np.dtype(np.float32).itemsize
+
+class MatrixArray:
+    '''A fixed number of 3×3 transform matrices in one buffer.
+
+    The matrices are held as single-precision floats, nine to a matrix,
+    in the order used by vgLoadMatrix(). Each one can therefore be handed
+    to OpenVG directly, without copying (see pointer()).
+
+    As with Matrix, operations are worked out in double precision and
+    the results rounded to single precision.
+
+    Instance attributes:
+        data -- The NumPy array of matrix values, with shape (N, 9).
+
+    '''
+    def __init__(self, count_or_values):
+        '''Initialise the array.
+
+        Keyword arguments:
+            count_or_values -- Either the number of matrices, which will
+                all start out as identity matrices, or anything NumPy
+                can turn into an array of shape (N, 9) holding matrix
+                values in the order used by vgLoadMatrix().
+
+        '''
+        if isinstance(count_or_values, int):
+            self.data = np.tile(np.eye(3, dtype=np.float32).reshape(9),
+                                (count_or_values, 1))
+        else:
+            self.data = np.array(count_or_values, dtype=np.float32,
+                                 order='C').reshape(-1, 9)
+
+    @classmethod
+    def from_rows(cls, rows):
+        '''Create an array from matrices given row by row.
+
+        Keyword arguments:
+            rows -- An array of shape (N, 3, 3), where each matrix is
+                given by its mathematical rows (as for the rows
+                attribute of this class).
+
+        '''
+        rows = np.asarray(rows, dtype=np.float64)
+        return cls(rows.transpose(0, 2, 1).reshape(-1, 9))
+
+    @classmethod
+    def from_matrices(cls, matrices):
+        '''Create an array from a sequence of Matrix objects.'''
+        return cls([m.values for m in matrices])
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        '''Get one matrix as a Matrix object.'''
+        return Matrix.from_values(self.data[key].tolist())
+
+    def __setitem__(self, key, val):
+        '''Replace one matrix with a Matrix object.'''
+        self.data[key] = val.values
+
+    def __repr__(self):
+        return 'MatrixArray({!r})'.format(self.data.tolist())
+
+    @property
+    def rows(self):
+        '''Get all matrices as an (N, 3, 3) array of mathematical rows.
+
+        Each matrix is laid out as written in the Matrix docstring, which
+        is the transpose of Matrix.rows (that follows OpenVG's order).
+        This is a view of the buffer, not a copy.
+
+        '''
+        return self.data.reshape(-1, 3, 3).transpose(0, 2, 1)
+
+    def _from_product(self, rows):
+        '''Get a new array from double-precision rows.'''
+        return MatrixArray(rows.transpose(0, 2, 1).reshape(-1, 9))
+
+    def pointer(self, index):
+        '''Get one matrix in a form that can be passed to vgLoadMatrix().
+
+        The result shares memory with this array, so no values are
+        copied, and it stays valid for as long as this array does.
+
+        Keyword arguments:
+            index -- The index of the matrix.
+
+        '''
+        if not -len(self) <= index < len(self):
+            raise IndexError('index out of range: {}'.format(index))
+        return matrix_type.from_buffer(self.data, (index % len(self)) *
+                                       _MATRIX_BYTES)
+
+    def compose(self, other):
+        '''Right-multiply every matrix in this array by another.
+
+        Keyword arguments:
+            other -- Either a MatrixArray of the same length, to
+                multiply matrices pairwise, or a single Matrix to
+                multiply every matrix by.
+        Returns:
+            A new MatrixArray of the products.
+
+        '''
+        if isinstance(other, Matrix):
+            right = np.array(other.values,
+                             dtype=np.float64).reshape(3, 3).T
+        else:
+            right = other.rows.astype(np.float64)
+        return self._from_product(np.matmul(self.rows.astype(np.float64),
+                                            right))
+
+    def inverse(self):
+        '''Invert every matrix in this array.
+
+        Raises:
+            ValueError -- If any of the matrices is singular.
+        Returns:
+            A new MatrixArray of the inverses.
+
+        '''
+        try:
+            return self._from_product(np.linalg.inv(
+                self.rows.astype(np.float64)))
+        except np.linalg.LinAlgError:
+            raise ValueError('matrix is singular') from None
+
+    def transform_points(self, points):
+        '''Apply every matrix in this array to a set of points.
+
+        Keyword arguments:
+            points -- An array of shape (M, 2), to apply every matrix to
+                the same M points, or of shape (N, M, 2), to apply each
+                matrix to its own M points.
+        Returns:
+            An array of shape (N, M, 2) of transformed points. Points
+            transformed by projective matrices are divided through by
+            their w.
+
+        '''
+        points = np.asarray(points, dtype=np.float64)
+        ones = np.ones(points.shape[:-1] + (1,))
+        homogeneous = np.concatenate((points, ones), axis=-1)
+        if homogeneous.ndim == 2:
+            homogeneous = homogeneous[np.newaxis]
+        # Row vectors times the transposed matrices.
+        result = np.matmul(homogeneous, self.data.reshape(-1, 3, 3).astype(
+            np.float64))
+        return result[..., :2] / result[..., 2:]
+
+    def propagate(self, parents):
+        '''Combine local transforms down a hierarchy.
+
+        Each matrix in this array is taken to be a transform relative to
+        its parent's. The result gives each node's transform relative to
+        the root of its tree. This takes one batched multiplication per
+        level of the hierarchy, rather than one per node.
+
+        Keyword arguments:
+            parents -- A sequence of the index of each node's parent in
+                this array, or -1 for nodes with no parent.
+        Raises:
+            ValueError -- If the parents do not form a hierarchy.
+        Returns:
+            A new MatrixArray of the combined transforms.
+
+        '''
+        parents = np.asarray(parents, dtype=np.intp)
+        if parents.shape != (len(self),):
+            raise ValueError('expected {} parent indices, '
+                             'got {}'.format(len(self), len(parents)))
+
+        # Work out the depth of every node, all at once.
+        depth = np.zeros(len(self), dtype=np.intp)
+        ancestors = parents.copy()
+        for _ in range(len(self) + 1):
+            has_ancestor = ancestors >= 0
+            if not has_ancestor.any():
+                break
+            depth[has_ancestor] += 1
+            ancestors[has_ancestor] = parents[ancestors[has_ancestor]]
+        else:
+            raise ValueError('parent indices contain a cycle')
+
+        local = self.rows.astype(np.float64)
+        world = local.copy()
+        for level in range(1, depth.max(initial=0) + 1):
+            nodes = np.flatnonzero(depth == level)
+            world[nodes] = np.matmul(world[parents[nodes]], local[nodes])
+        return self._from_product(world)
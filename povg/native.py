@@ -42,6 +42,10 @@ __all__ = ['vgFlush', 'vgFinish', 'vgSetf', 'vgSeti', 'vgSetfv', 'vgSetiv',
            'vgColorMatrix', 'vgConvolve', 'vgSeparableConvolve',
            'vgGaussianBlur', 'vgLookup', 'vgLookupSingle', 'vgHardwareQuery',
            'vgGetString',
+           # Client-side state tracking.
+           'StateRecord', 'current_state', 'set_state', 'set_tracking',
+           'invalidate_state',
+           'defer_matrix', 'flush_matrices', 'cached_param',
            # Native types reusable in extension modules.
            'c_ibool', 'c_enum', 'c_bitfield', 'c_handle', 'c_float2',
            'c_ubyte_p', 'c_short_p', 'c_int_p', 'c_uint_p', 'c_float_p',
@@ -52,10 +56,12 @@ __all__ = ['vgFlush', 'vgFinish', 'vgSetf', 'vgSeti', 'vgSetfv', 'vgSetiv',
 import ctypes
 from ctypes import (POINTER, c_byte, c_ubyte, c_short, c_int, c_uint,
                     c_float, c_char_p, c_void_p)
+from math import cos, radians, sin
 import sys
+from threading import get_ident, local
 
 # Local imports.
-from . import OpenVGError, error_codes
+from . import ContextThreadError, OpenVGError, error_codes
 
 # Native library import.
 libname = 'libOpenVG'
@@ -114,6 +120,50 @@ def error_check(fn):
         return result
     return wrapped_fn
 
+def modifies_path(fn):
+    '''Tell a path object that a function has changed its data natively.
+
+    Path objects keep client-side copies of their data, and their own
+    methods keep those up to date by passing the bare handle. When a
+    Path object itself is passed as the destination (first argument) of
+    a wrapped function, its _changed_natively() method is called, so
+    that it drops whatever it can no longer trust.
+
+    Keyword arguments:
+        fn -- The function to wrap.
+
+    '''
+    def wrapped_fn(path, *args, **kwargs):
+        result = fn(path, *args, **kwargs)
+        changed = getattr(path, '_changed_natively', None)
+        if changed is not None:
+            changed()
+        return result
+    return wrapped_fn
+
+def client_transform(native_fn):
+    '''Work out a relative matrix operation on the client side.
+
+    The decorated function takes the arguments of a relative matrix
+    operation and returns the nine values (in the order used by
+    vgLoadMatrix()) of the matrix it right-multiplies by. While matrix
+    tracking is on (see StateRecord), that matrix is composed with the
+    current one on the client side, and reaches OpenVG as (at most) one
+    vgLoadMatrix() or vgMultMatrix() call when the matrix is next
+    needed. Otherwise, the native function is called instead.
+
+    Keyword arguments:
+        native_fn -- The native function to call when not tracking.
+
+    '''
+    def decorator(fn):
+        def wrapped_fn(*args):
+            if not current_state().tracking:
+                return _untracked(native_fn, *args)
+            _compose(fn(*args))
+        return wrapped_fn
+    return decorator
+
 # Set argument and return types, and wrap with error checking. Functions are
 # listed by their order in the OpenVG 1.1 specification, with section numbers.
 # All(?) functions may cause an OutOfMemoryError, so these aren't listed here.
@@ -254,7 +304,13 @@ vgGetParameteriv = error_check(vg.vgGetParameteriv)
 vg.vgLoadIdentity.argtypes = ()
 vg.vgLoadIdentity.restype = None
 # TODO: Remove error_check? The spec indicates no errors for this function.
-vgLoadIdentity = error_check(vg.vgLoadIdentity)
+_checked_vgLoadIdentity = error_check(vg.vgLoadIdentity)
+
+def vgLoadIdentity():
+    if not current_state().tracking:
+        return _untracked(_checked_vgLoadIdentity)
+    # Deferred, since a relative operation very often follows.
+    defer_matrix(_matrix_mode(), IDENTITY_MATRIX)
 
 # void vgLoadMatrix(const VGfloat * m)
 vg.vgLoadMatrix.argtypes = (c_float_p,)
@@ -272,31 +328,48 @@ vgGetMatrix = error_check(vg.vgGetMatrix)
 vg.vgMultMatrix.argtypes = (c_float_p,)
 vg.vgMultMatrix.restype = None
 # Errors: IllegalArgumentError
-vgMultMatrix = error_check(vg.vgMultMatrix)
+_checked_vgMultMatrix = error_check(vg.vgMultMatrix)
+
+@client_transform(_checked_vgMultMatrix)
+def vgMultMatrix(m):
+    return m[:9]
 
 # void vgTranslate(VGfloat tx, VGfloat ty)
 vg.vgTranslate.argtypes = (c_float, c_float)
 vg.vgTranslate.restype = None
 # TODO: Remove error_check? The spec indicates no errors for this function.
-vgTranslate = error_check(vg.vgTranslate)
+@client_transform(error_check(vg.vgTranslate))
+def vgTranslate(tx, ty):
+    tx, ty = c_float(_value(tx)).value, c_float(_value(ty)).value
+    return (1.0, 0.0, 0.0, 0.0, 1.0, 0.0, tx, ty, 1.0)
 
 # void vgScale(VGfloat sx, VGfloat sy)
 vg.vgScale.argtypes = (c_float, c_float)
 vg.vgScale.restype = None
 # TODO: Remove error_check? The spec indicates no errors for this function.
-vgScale = error_check(vg.vgScale)
+@client_transform(error_check(vg.vgScale))
+def vgScale(sx, sy):
+    sx, sy = c_float(_value(sx)).value, c_float(_value(sy)).value
+    return (sx, 0.0, 0.0, 0.0, sy, 0.0, 0.0, 0.0, 1.0)
 
 # void vgShear(VGfloat shx, VGfloat shy)
 vg.vgShear.argtypes = (c_float, c_float)
 vg.vgShear.restype = None
 # TODO: Remove error_check? The spec indicates no errors for this function.
-vgShear = error_check(vg.vgShear)
+@client_transform(error_check(vg.vgShear))
+def vgShear(shx, shy):
+    shx, shy = c_float(_value(shx)).value, c_float(_value(shy)).value
+    return (1.0, shy, 0.0, shx, 1.0, 0.0, 0.0, 0.0, 1.0)
 
 # void vgRotate(VGfloat angle)
 vg.vgRotate.argtypes = (c_float,)
 vg.vgRotate.restype = None
 # TODO: Remove error_check? The spec indicates no errors for this function.
-vgRotate = error_check(vg.vgRotate)
+@client_transform(error_check(vg.vgRotate))
+def vgRotate(angle):
+    angle = radians(c_float(_value(angle)).value)
+    c, s = cos(angle), sin(angle)
+    return (c, s, 0.0, -s, c, 0.0, 0.0, 0.0, 1.0)
 
 ################ 7.2 ################
 
@@ -363,7 +436,7 @@ vgCreatePath = error_check(vg.vgCreatePath)
 vg.vgClearPath.argtypes = (c_handle, c_bitfield)
 vg.vgClearPath.restype = None
 # Errors: BadHandleError
-vgClearPath = error_check(vg.vgClearPath)
+vgClearPath = modifies_path(error_check(vg.vgClearPath))
 
 # void vgDestroyPath(VGPath path)
 vg.vgDestroyPath.argtypes = (c_handle,)
@@ -391,7 +464,7 @@ vgRemovePathCapabilities = error_check(vg.vgRemovePathCapabilities)
 vg.vgAppendPath.argtypes = (c_handle, c_handle)
 vg.vgAppendPath.restype = None
 # Errors: BadHandleError, PathCapabilityError
-vgAppendPath = error_check(vg.vgAppendPath)
+vgAppendPath = modifies_path(error_check(vg.vgAppendPath))
 
 ############### 8.6.6 ###############
 
@@ -400,7 +473,7 @@ vgAppendPath = error_check(vg.vgAppendPath)
 vg.vgAppendPathData.argtypes = (c_handle, c_int, c_ubyte_p, c_void_p)
 vg.vgAppendPathData.restype = None
 # Errors: BadHandleError, PathCapabilityError, IllegalArgumentError
-vgAppendPathData = error_check(vg.vgAppendPathData)
+vgAppendPathData = modifies_path(error_check(vg.vgAppendPathData))
 
 ############### 8.6.7 ###############
 
@@ -409,7 +482,7 @@ vgAppendPathData = error_check(vg.vgAppendPathData)
 vg.vgModifyPathCoords.argtypes = (c_handle, c_int, c_int, c_void_p)
 vg.vgModifyPathCoords.restype = None
 # Errors: BadHandleError, PathCapabilityError, IllegalArgumentError
-vgModifyPathCoords = error_check(vg.vgModifyPathCoords)
+vgModifyPathCoords = modifies_path(error_check(vg.vgModifyPathCoords))
 
 ############### 8.6.8 ###############
 
@@ -417,7 +490,7 @@ vgModifyPathCoords = error_check(vg.vgModifyPathCoords)
 vg.vgTransformPath.argtypes = (c_handle, c_handle)
 vg.vgTransformPath.restype = None
 # Errors: BadHandleError, PathCapabilityError
-vgTransformPath = error_check(vg.vgTransformPath)
+vgTransformPath = modifies_path(error_check(vg.vgTransformPath))
 
 ############### 8.6.9 ###############
 
@@ -426,7 +499,7 @@ vgTransformPath = error_check(vg.vgTransformPath)
 vg.vgInterpolatePath.argtypes = (c_handle, c_handle, c_handle, c_float)
 vg.vgInterpolatePath.restype = c_ibool
 # Errors: BadHandleError, PathCapabilityError
-vgInterpolatePath = error_check(vg.vgInterpolatePath)
+vgInterpolatePath = modifies_path(error_check(vg.vgInterpolatePath))
 
 ############### 8.6.10 ##############
 
@@ -780,3 +853,508 @@ vg.vgGetString.restype = c_char_p
 # the other hand, it should probably raise IllegalArgumentError if the argument
 # is not a valid enumeration value.
 vgGetString = error_check(vg.vgGetString)
+
+######### Client-side state #########
+
+# Context state that the functions above may be able to avoid setting or
+# reading back, because the client side already knows its value.
+MATRIX_MODE = 0x1100
+MATRIX_MODES = range(0x1400, 0x1405)
+IMAGE_USER_TO_SURFACE = 0x1401
+IDENTITY_MATRIX = (1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0)
+# The implementation limits, which never change for a given context.
+READ_ONLY_PARAMS = range(0x1160, 0x116B)
+# Parameters that OpenVG may adjust when they are set (by clamping values,
+# or dropping excess ones), so that they are only known once read back:
+# SCISSOR_RECTS, STROKE_DASH_PATTERN, TILE_FILL_COLOR, CLEAR_COLOR and
+# COLOR_TRANSFORM_VALUES.
+ADJUSTED_PARAMS = frozenset((0x1106, 0x1114, 0x1120, 0x1121, 0x1171))
+SCISSOR_RECTS, STROKE_DASH_PATTERN = 0x1106, 0x1114
+STROKE_PARAMS = range(0x1110, 0x1117)
+MAX_SCISSOR_RECTS, MAX_DASH_COUNT = 0x1160, 0x1161
+
+class StateRecord:
+    '''A client-side record of the state of one OpenVG context.
+
+    The state-setting functions in this module keep the record of the
+    current context up to date, and skip any call that would set state
+    to the value it already has. Anything not recorded is simply passed
+    through to OpenVG.
+
+    Matrices may be deferred with defer_matrix() until something is
+    drawn, and while the matrix mode and matrices are tracked, setting
+    the matrix mode is deferred until a matrix function actually needs
+    it, so the record distinguishes between the state that OpenVG has
+    and the state it will have.
+
+    Instance attributes:
+        tracking -- Whether or not to record the matrix mode and the
+            matrices. This is off by default. When on, selecting the
+            mode OpenVG already has, or loading the matrix it already
+            has, is skipped, and the relative matrix operations are
+            worked out on the client side. All changes of context must
+            then go through set_state() (as EGLContext.make_current()
+            does), and all changes to matrices through this module (or
+            be followed by invalidate_state()).
+        matrix_mode -- The matrix mode selected, or None if not known.
+            Only kept while tracking.
+        native_mode -- The matrix mode that OpenVG actually has, or None
+            if not known. Only kept while tracking.
+        matrices -- A dict mapping matrix modes to the nine values of
+            the matrix that OpenVG has in that mode (in the order used
+            by vgLoadMatrix()). Modes whose matrix is not known are
+            absent. Only kept while tracking.
+        pending -- A dict mapping matrix modes to the nine values of
+            matrices deferred until the next drawing operation.
+        products -- A dict mapping matrix modes to the nine values of
+            a matrix that the (unknown) matrix in that mode is to be
+            multiplied by before the next drawing operation.
+        stacks -- A dict mapping matrix modes to lists of saved
+            matrices, for use by the Context matrix stack methods.
+        shadowing -- Whether or not to record context parameters. This
+            is off by default. When on, parameters are recorded as they
+            are set or read, later reads are answered from the record,
+            and setting a parameter to the value it already has is
+            skipped. All changes to parameters must then go through this
+            module (or be followed by invalidate_state()).
+        params -- A dict mapping context parameter types to 2-tuples of
+            whether the value is a float, and the value itself (a
+            tuple, for vector parameters). Only kept while shadowing.
+        limits -- A dict like params, for the read-only implementation
+            limits. These are always recorded.
+        sizes -- A dict mapping context parameter types to the vector
+            sizes last read for them. Only kept while shadowing.
+        stroke_style -- The stroke.StrokeStyle most recently applied,
+            or None if any stroke parameter has been set since.
+        profile -- The profile.Profile of the context, or None if it has
+            not been probed or installed yet.
+        thread -- The identifier of the thread in which the context is
+            current, or None if it is not known to be current in any.
+
+    '''
+    def __init__(self):
+        '''Initialise a record in which nothing is known.'''
+        self.pending, self.products, self.stacks = {}, {}, {}
+        self.shadowing, self.limits, self.profile = False, {}, None
+        self.tracking, self.thread = False, None
+        self.invalidate()
+
+    def invalidate(self):
+        '''Forget everything recorded about the state of OpenVG.
+
+        Deferred matrices and products, and matrix stacks, are not
+        forgotten, since they are not yet part of OpenVG's state. Nor
+        are the tracking and shadowing settings.
+
+        '''
+        self.matrix_mode = self.native_mode = None
+        self.matrices, self.params, self.sizes = {}, {}, {}
+        self.stroke_style = None
+
+    def matrix(self, mode):
+        '''Get the matrix that will be in effect in a given mode.
+
+        Returns:
+            The nine matrix values, or None if they are not known.
+
+        '''
+        values = self.pending.get(mode)
+        return self.matrices.get(mode) if values is None else values
+
+# OpenVG contexts are current per thread, so each thread has its own record.
+_current = local()
+
+def current_state():
+    '''Get the state record of the current context of this thread.'''
+    try:
+        return _current.record
+    except AttributeError:
+        _current.record = StateRecord()
+        return _current.record
+
+def set_state(record=None):
+    '''Switch this thread to the state record of another context.
+
+    This must be called whenever a different context is made current.
+    The record is then bound to this thread, and the one it replaces is
+    released, until the next such switch.
+
+    Keyword arguments:
+        record -- The StateRecord of the newly current context. If
+            omitted or None, a new record is started, in which nothing
+            is known.
+    Raises:
+        ContextThreadError -- If the record is bound to another thread.
+    Returns:
+        The state record now in use.
+
+    '''
+    thread = get_ident()
+    if record is None:
+        record = StateRecord()
+    elif record.thread not in (None, thread):
+        raise ContextThreadError('context is current in another thread '
+                                 '(ID {})'.format(record.thread))
+    previous = getattr(_current, 'record', None)
+    if previous is not None and previous is not record:
+        previous.thread = None
+    record.thread = thread
+    _current.record = record
+    return record
+
+def set_tracking(tracking):
+    '''Switch matrix tracking on or off for the current context.
+
+    See StateRecord for what tracking does. Switching it off forgets the
+    recorded matrix mode and matrices.
+
+    Keyword arguments:
+        tracking -- Whether or not to track the matrix mode and matrices.
+
+    '''
+    state = current_state()
+    if state.tracking and not tracking and state.matrix_mode is not None:
+        # Selecting the mode may have been left to the matrix functions.
+        _select_mode(state.matrix_mode)
+    state.tracking = bool(tracking)
+    state.matrix_mode = state.native_mode = None
+    state.matrices = {}
+
+def invalidate_state():
+    '''Forget the recorded state of the current context.
+
+    This must be called after changing context state without going
+    through this module's functions, such as through the library object
+    (vg) directly.
+
+    '''
+    current_state().invalidate()
+
+def _value(arg):
+    '''Get the Python value of an argument that may be a ctypes instance.'''
+    return getattr(arg, 'value', arg)
+
+def _normalize_matrix(mode, values):
+    '''Get matrix values as OpenVG will hold them in a given mode.'''
+    values = tuple(c_float(value).value for value in values)
+    if mode != IMAGE_USER_TO_SURFACE:
+        # Only image transforms may be projective; OpenVG ignores the last
+        # row of all others.
+        values = values[:2] + (0.0,) + values[3:5] + (0.0,) + values[6:8] + (
+            1.0,)
+    return values
+
+(_checked_vgSetf, _checked_vgSeti, _checked_vgSetfv, _checked_vgSetiv,
+ _checked_vgGetf, _checked_vgGeti, _checked_vgGetVectorSize, _checked_vgGetfv,
+ _checked_vgGetiv, _checked_vgLoadMatrix, _checked_vgGetMatrix) = (
+     vgSetf, vgSeti, vgSetfv, vgSetiv, vgGetf, vgGeti, vgGetVectorSize,
+     vgGetfv, vgGetiv, vgLoadMatrix, vgGetMatrix)
+
+def _matrix_mode():
+    '''Get the selected matrix mode, asking OpenVG only if not known.'''
+    state = current_state()
+    if not state.tracking:
+        return _checked_vgGeti(MATRIX_MODE)
+    if state.matrix_mode is None:
+        state.matrix_mode = state.native_mode = _checked_vgGeti(MATRIX_MODE)
+    return state.matrix_mode
+
+def _select_mode(mode):
+    '''Make OpenVG's matrix mode match the one selected.'''
+    state = current_state()
+    if state.native_mode != mode:
+        _checked_vgSeti(MATRIX_MODE, mode)
+        state.native_mode = mode
+
+def defer_matrix(mode, values):
+    '''Set a matrix to be loaded before the next drawing operation.
+
+    Keyword arguments:
+        mode -- The matrix mode in which to load the matrix.
+        values -- The nine matrix values, in the order used by
+            vgLoadMatrix().
+
+    '''
+    state = current_state()
+    values = _normalize_matrix(mode, values)
+    state.products.pop(mode, None)
+    if state.matrices.get(mode) == values:
+        state.pending.pop(mode, None)
+    else:
+        state.pending[mode] = values
+
+def _multiply(a, b):
+    '''Multiply two matrices given in the order used by vgLoadMatrix().'''
+    return tuple(sum(a[k * 3 + row] * b[col * 3 + k] for k in range(3))
+                 for col in range(3) for row in range(3))
+
+def _compose(values):
+    '''Right-multiply the current matrix, on the client side.
+
+    If the current matrix is known, the product is deferred like any
+    other matrix. If not, the multiplier is built up until it can be
+    passed to vgMultMatrix() in one go.
+
+    '''
+    state = current_state()
+    mode = _matrix_mode()
+    values = _normalize_matrix(mode, values)
+    current = state.matrix(mode)
+    if current is None:
+        state.products[mode] = _multiply(
+            state.products.get(mode, IDENTITY_MATRIX), values)
+    else:
+        defer_matrix(mode, _multiply(current, values))
+
+def flush_matrices():
+    '''Send any deferred matrices and products to OpenVG.
+
+    This is called by the drawing functions in this module, and there is
+    usually no need to call it otherwise.
+
+    '''
+    state = current_state()
+    if not state.tracking:
+        # Find out the mode for now, to put it back afterwards.
+        state.matrix_mode = state.native_mode = _checked_vgGeti(MATRIX_MODE)
+    for mode, values in state.pending.items():
+        _select_mode(mode)
+        _checked_vgLoadMatrix((c_float * 9)(*values))
+        state.matrices[mode] = values
+    for mode, values in state.products.items():
+        _select_mode(mode)
+        _checked_vgMultMatrix((c_float * 9)(*values))
+    state.pending.clear()
+    state.products.clear()
+    if not state.tracking:
+        _select_mode(state.matrix_mode)
+        state.matrix_mode = state.native_mode = None
+        state.matrices = {}
+
+def _untracked(fn, *args):
+    '''Call a native matrix function, once deferred matrices are loaded.'''
+    state = current_state()
+    if state.pending or state.products:
+        flush_matrices()
+    return fn(*args)
+
+def cached_param(param_type, vector=False, floats=False):
+    '''Get the recorded value of a context parameter.
+
+    Keyword arguments:
+        param_type -- The parameter type.
+        vector -- Whether a vector value is wanted. The default is
+            False.
+        floats -- Whether floating-point values are wanted. The default
+            is False. Integer values are converted to floats, but not
+            vice versa.
+    Returns:
+        The value (a tuple, if vector is True), or None if it is not
+        recorded in the form wanted.
+
+    '''
+    state = current_state()
+    param_type = _value(param_type)
+    entry = state.limits.get(param_type)
+    if entry is None:
+        entry = state.params.get(param_type)
+        if entry is None:
+            return None
+    is_float, value = entry
+    if isinstance(value, tuple) != vector or (is_float and not floats):
+        return None
+    if is_float is None and floats:
+        # Read as an integer, so possibly rounded.
+        return None
+    if floats and not is_float:
+        return tuple(map(float, value)) if vector else float(value)
+    return value
+
+def _remember(param_type, is_float, value):
+    '''Record a parameter value read from OpenVG, if it is to be kept.
+
+    A value read as an integer may have been rounded from a float, so
+    it is recorded with None in place of is_float, and only answers
+    later integer reads. It never replaces a recorded value, and a value
+    read as a float replaces only such a one.
+
+    '''
+    state = current_state()
+    if param_type in READ_ONLY_PARAMS:
+        record = state.limits
+    elif state.shadowing:
+        record = state.params
+    else:
+        return
+    entry = record.get(param_type)
+    if entry is None or (is_float and entry[0] is None):
+        record[param_type] = (True if is_float else None, value)
+
+def _kept(param_type, value):
+    '''Check whether OpenVG is sure to keep a parameter value as set.
+
+    The limit that decides this is read (just once) if not yet known.
+
+    '''
+    if param_type == STROKE_DASH_PATTERN:
+        # Dash patterns are only cut short if too long or of odd length.
+        return len(value) % 2 == 0 and len(value) <= vgGeti(MAX_DASH_COUNT)
+    elif param_type == SCISSOR_RECTS:
+        # Likewise for scissor rectangles, which are also dropped if empty.
+        return (len(value) % 4 == 0 and
+                len(value) <= 4 * vgGeti(MAX_SCISSOR_RECTS) and
+                all(value[n] > 0 and value[n + 1] > 0
+                    for n in range(2, len(value), 4)))
+    return False
+
+def _shadowed_set(fn, is_float, vector):
+    '''Wrap a parameter setter to skip redundant calls when shadowing.'''
+    convert = (lambda v: c_float(v).value) if is_float else int
+    def wrapped_fn(param_type, *args):
+        state = current_state()
+        param_type = _value(param_type)
+        if param_type == MATRIX_MODE:
+            state.matrix_mode = state.native_mode = None
+        elif param_type in STROKE_PARAMS:
+            state.stroke_style = None
+        state.sizes.pop(param_type, None)
+        if not state.shadowing or param_type == MATRIX_MODE:
+            return fn(param_type, *args)
+
+        if vector:
+            count, values = args
+            value = tuple(convert(_value(v)) for v in values[:_value(count)])
+        else:
+            value = convert(_value(args[0]))
+        if state.params.get(param_type) == (is_float, value):
+            return
+        fn(param_type, *args)
+        if param_type in ADJUSTED_PARAMS and not _kept(param_type, value):
+            state.params.pop(param_type, None)
+        else:
+            state.params[param_type] = (is_float, value)
+    return wrapped_fn
+
+_shadowed_vgSeti = _shadowed_set(_checked_vgSeti, False, False)
+vgSetf = _shadowed_set(_checked_vgSetf, True, False)
+vgSetiv = _shadowed_set(_checked_vgSetiv, False, True)
+vgSetfv = _shadowed_set(_checked_vgSetfv, True, True)
+
+def vgSeti(param_type, value):
+    state = current_state()
+    if _value(param_type) != MATRIX_MODE or not state.tracking:
+        return _shadowed_vgSeti(param_type, value)
+    value = _value(value)
+    if value in MATRIX_MODES:
+        # Only matrix functions depend on the matrix mode, so leave it to
+        # them to switch modes.
+        state.matrix_mode = value
+    else:
+        # Let OpenVG raise the error.
+        _checked_vgSeti(param_type, value)
+
+def vgGeti(param_type):
+    param_type = _value(param_type)
+    if param_type == MATRIX_MODE:
+        return _matrix_mode()
+    value = cached_param(param_type)
+    if value is None:
+        value = _checked_vgGeti(param_type)
+        _remember(param_type, False, value)
+    return value
+
+def vgGetf(param_type):
+    param_type = _value(param_type)
+    value = cached_param(param_type, floats=True)
+    if value is None:
+        value = _checked_vgGetf(param_type)
+        _remember(param_type, True, value)
+    return value
+
+def _known_size(state, param_type):
+    '''Get the recorded vector size of a parameter, or None.'''
+    entry = state.params.get(param_type, state.limits.get(param_type))
+    if entry is None:
+        return state.sizes.get(param_type)
+    value = entry[1]
+    return len(value) if isinstance(value, tuple) else 1
+
+def vgGetVectorSize(param_type):
+    state = current_state()
+    param_type = _value(param_type)
+    size = _known_size(state, param_type)
+    if size is None:
+        size = _checked_vgGetVectorSize(param_type)
+        if state.shadowing:
+            state.sizes[param_type] = size
+    return size
+
+def _shadowed_getv(fn, is_float):
+    '''Wrap a vector parameter getter to answer from the record.'''
+    def wrapped_fn(param_type, count, values):
+        state = current_state()
+        param_type = _value(param_type)
+        count = _value(count)
+        known = cached_param(param_type, vector=True, floats=is_float)
+        if known is not None and count <= len(known):
+            for n in range(count):
+                values[n] = known[n]
+            return
+        fn(param_type, count, values)
+        if state.shadowing:
+            # The size was usually just asked for, to size the array.
+            size = _known_size(state, param_type)
+            if size is None:
+                size = _checked_vgGetVectorSize(param_type)
+            if count == size:
+                # The whole vector was read, so it is now known.
+                _remember(param_type, is_float, tuple(values[:count]))
+    return wrapped_fn
+
+vgGetiv = _shadowed_getv(_checked_vgGetiv, False)
+vgGetfv = _shadowed_getv(_checked_vgGetfv, True)
+
+def vgLoadMatrix(m):
+    state = current_state()
+    if not state.tracking:
+        return _untracked(_checked_vgLoadMatrix, m)
+    mode = _matrix_mode()
+    state.pending.pop(mode, None)
+    state.products.pop(mode, None)
+    values = _normalize_matrix(mode, m[:9])
+    if state.matrices.get(mode) != values:
+        _select_mode(mode)
+        _checked_vgLoadMatrix(m)
+        state.matrices[mode] = values
+
+def vgGetMatrix(m):
+    state = current_state()
+    if not state.tracking:
+        return _untracked(_checked_vgGetMatrix, m)
+    mode = _matrix_mode()
+    values = state.matrix(mode)
+    if values is None:
+        _select_mode(mode)
+        product = state.products.pop(mode, None)
+        if product is not None:
+            _checked_vgMultMatrix((c_float * 9)(*product))
+        _checked_vgGetMatrix(m)
+        state.matrices[mode] = tuple(m[:9])
+    else:
+        for n, value in enumerate(values):
+            m[n] = value
+
+def _uses_matrices(fn):
+    '''Wrap a function so that deferred matrices are loaded first.'''
+    def wrapped_fn(*args):
+        state = current_state()
+        if state.pending or state.products:
+            flush_matrices()
+        return fn(*args)
+    return wrapped_fn
+
+(vgRenderToMask, vgTransformPath, vgPathTransformedBounds, vgDrawPath,
+ vgDrawImage, vgDrawGlyph, vgDrawGlyphs) = (
+    _uses_matrices(fn) for fn in (vgRenderToMask, vgTransformPath,
+                                  vgPathTransformedBounds, vgDrawPath,
+                                  vgDrawImage, vgDrawGlyph, vgDrawGlyphs))
@@ -18,49 +18,250 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 # Standard library imports.
-from collections import namedtuple
 from contextlib import contextmanager
 from ctypes import c_float, c_ubyte, c_int8, c_int16, c_int32
 from itertools import chain
 
 # Local imports.
-from . import native, OpenVGError
+from . import geometry, native, OpenVGError
+from .geometry import PathSegments, SegmentCommand
 from .native import to_array
 from .params import (PathFormats, PathDatatypes, PathCapabilities, PathParams,
                      param_convert, native_getter)
 from .paint import PaintModes, kwargs_to_modes
+from .profile import current_profile
 
-# Segment commands.
-PathSegments = namedtuple('PathSegments_tuple',
-                          ('CLOSE_PATH', 'MOVE_TO', 'LINE_TO', 'HLINE_TO',
-                           'VLINE_TO', 'QUAD_TO', 'CUBIC_TO', 'SQUAD_TO',
-                           'SCUBIC_TO', 'SCCWARC_TO', 'SCWARC_TO',
-                           'LCCWARC_TO', 'LCWARC_TO')
-                          )(*range(13))
+# Path parameters that are fixed when the path is created.
+_fixed_params = frozenset((PathParams.FORMAT, PathParams.DATATYPE,
+                           PathParams.SCALE, PathParams.BIAS))
 
-def SegmentCommand(segment_type, is_absolute=True):
-    '''Get the OpenVG numeric value for a segment command.
+# The ctypes types of the path datatypes, for building native arrays of raw
+# coordinate data (see also data_array()).
+c_datatypes = {PathDatatypes.S_8: c_int8,
+                PathDatatypes.S_16: c_int16,
+                PathDatatypes.S_32: c_int32,
+                PathDatatypes.F: c_float}
 
-    A segment command comprises the segment type number (from the
-    PathSegments named tuple), left-shifted one bit and with the low bit
-    set to 1 (if the segment coordinates are relative to the last path
-    position) or 0 (if they are absolute).
+# The ranges of the integer path datatypes.
+_datatype_ranges = {PathDatatypes.S_8: (-2 ** 7, 2 ** 7 - 1),
+                    PathDatatypes.S_16: (-2 ** 15, 2 ** 15 - 1),
+                    PathDatatypes.S_32: (-2 ** 31, 2 ** 31 - 1)}
+
+def convert_data(data, datatype, scale, bias, to_datatype, to_scale,
+                 to_bias):
+    '''Convert path coordinate data between datatypes, scales and biases.
+
+    Integer results are rounded to the nearest value and clamped to the
+    range of the datatype.
 
     Keyword arguments:
-        segment_type -- The type of segment. A value from the
-            PathSegments named tuple, or a name of one of its members.
-        is_absolute -- Whether or not this command is using absolute
-            instead of relative coordinates. Defaults to true.
+        data -- A sequence of raw coordinate values.
+        datatype, scale, bias -- The datatype, scale and bias of the
+            path the data comes from.
+        to_datatype, to_scale, to_bias -- The datatype, scale and bias
+            of the path the data is destined for.
+    Returns:
+        A list of the converted raw coordinate values.
+
+    '''
+    if (datatype, scale, bias) == (to_datatype, to_scale, to_bias):
+        return list(data)
+    user = (value * scale + bias for value in data)
+    if to_datatype == PathDatatypes.F:
+        return [(value - to_bias) / to_scale for value in user]
+    low, high = _datatype_ranges[to_datatype]
+    return [min(high, max(low, int(round((value - to_bias) / to_scale))))
+            for value in user]
+
+def data_array(data, datatype):
+    '''Get raw coordinate values as a native array of a path datatype.
+
+    Values are rounded (rather than truncated) and clamped to fit an
+    integer datatype.
+
+    Keyword arguments:
+        data -- A sequence of raw coordinate values.
+        datatype -- A value from the PathDatatypes named tuple.
+    Returns:
+        A ctypes array of the type in c_datatypes for that datatype.
+
+    '''
+    data = tuple(data)
+    if datatype != PathDatatypes.F:
+        low, high = _datatype_ranges[datatype]
+        data = tuple(min(high, max(low, int(round(value)))) for value in data)
+    return to_array(c_datatypes[datatype], data)
+
+def path_data(path_or_data, datatype, scale, bias):
+    '''Get the segment data, datatype, scale and bias of a path or data.
+
+    This lets functions accept either a Path object, or a 2-tuple of
+    segment commands and coordinate data.
+
+    Keyword arguments:
+        path_or_data -- A Path whose segment data is known (see
+            Path.segment_data()), or a 2-tuple of segment commands and
+            raw coordinate data.
+        datatype, scale, bias -- The datatype, scale and bias of the
+            data. These are ignored for a Path, which has its own;
+            otherwise, any that are None take their defaults.
+    Returns:
+        A 5-tuple of the segment commands, raw coordinate data,
+        datatype, scale and bias.
+
+    '''
+    try:
+        commands, data = path_or_data.segment_data()
+    except AttributeError:
+        commands, data = path_or_data
+        return (commands, data,
+                PathParams.default('DATATYPE') if datatype is None
+                else datatype,
+                PathParams.default('SCALE') if scale is None else scale,
+                PathParams.default('BIAS') if bias is None else bias)
+    else:
+        return (commands, data, path_or_data.datatype, path_or_data.scale,
+                path_or_data.bias)
+
+def polylines_to_data(subpaths, datatype=PathParams.default('DATATYPE'),
+                      scale=PathParams.default('SCALE'),
+                      bias=PathParams.default('BIAS'), clip_rect=None,
+                      fill=True):
+    '''Turn flattened subpaths back into segment data.
+
+    Keyword arguments:
+        subpaths -- A sequence of geometry.Subpath named tuples, in user
+            coordinates.
+        datatype, scale, bias -- The datatype, scale and bias of the
+            path that the data is destined for.
+        clip_rect -- An optional (x, y, width, height) rectangle, in
+            user coordinates, to clip the subpaths to first (see
+            geometry.clip_polylines()). Clipping happens before the
+            data is quantized, so that far-off geometry cannot overflow
+            an integer datatype.
+        fill -- Whether to clip for filling (the default) or stroking.
+    Returns:
+        A 2-tuple of a list of segment commands (MOVE_TO, LINE_TO and
+        CLOSE_PATH only) and a list of the coordinate data, ready to be
+        passed to Path.append_data().
+
+    '''
+    move, line, close = (SegmentCommand(PathSegments.MOVE_TO),
+                         SegmentCommand(PathSegments.LINE_TO),
+                         SegmentCommand(PathSegments.CLOSE_PATH))
+    if clip_rect is not None:
+        subpaths = geometry.clip_polylines(subpaths, clip_rect, fill)
+    commands, coords = [], []
+    for sp in subpaths:
+        if not sp.points:
+            continue
+        commands.append(move)
+        commands.extend([line] * (len(sp.points) - 1))
+        if sp.closed:
+            commands.append(close)
+        for x, y in sp.points:
+            coords.append(x)
+            coords.append(y)
+    return commands, convert_data(coords, PathDatatypes.F, 1.0, 0.0,
+                                  datatype, scale, bias)
+
+def simplify(path_or_data, tolerance, method='douglas-peucker',
+             datatype=None, scale=None, bias=None, clip_rect=None,
+             fill=True):
+    '''Simplify path data for drawing at a lower level of detail.
+
+    Curves are flattened, and then vertices are removed from every
+    subpath for as long as the result stays within the given tolerance
+    of the original. Closed subpaths stay closed, and never collapse
+    below a triangle.
+
+    Since the vertices of every subpath are ranked only once, passing a
+    sequence of tolerances precomputes several levels of detail for not
+    much more than the cost of one.
+
+    Keyword arguments:
+        path_or_data -- The path to simplify. This may be a Path object
+            (which must be keeping its segment data), or a 2-tuple of
+            the segment commands and the coordinate data.
+        tolerance -- The greatest distance, in user coordinates, by
+            which the result may depart from the original path. This
+            may also be a sequence of tolerances.
+        method -- The simplification algorithm: either
+            'douglas-peucker' (the default) or 'visvalingam'. For the
+            latter, the tolerance is the square root of the smallest
+            triangle area that will be kept.
+        datatype, scale, bias -- The datatype, scale and bias of the
+            data, if it is not a Path object. The defaults are those of
+            a new Path.
+        clip_rect, fill -- As for polylines_to_data(). The result is
+            clipped after simplifying, so that the same clipped edges
+            are produced at every level of detail.
+    Returns:
+        A 2-tuple of the simplified segment commands and coordinate
+        data, in the same datatype, scale and bias as the original, and
+        suitable for passing to Path.append_data(). If a sequence of
+        tolerances was given, a list of such 2-tuples is returned, one
+        for each tolerance.
 
     '''
-    # Is segment_type a name or a number?
     try:
-        segment_type = int(segment_type)
-    except ValueError:
-        # It's a name. If it's an invalid name, the resulting AttributeError
-        # will be allowed to propagate upwards.
-        segment_type = getattr(PathSegments, segment_type)
-    return 2 * segment_type + (0 if is_absolute else 1)
+        tolerances = tuple(tolerance)
+    except TypeError:
+        tolerances = None
+    commands, data, datatype, scale, bias = path_data(path_or_data,
+                                                      datatype, scale, bias)
+
+    # Flatten curves to well within the finest tolerance requested.
+    finest = min(tolerances or (tolerance,))
+    subpaths = geometry.polylines(commands, data, scale, bias,
+                                  finest / 2 if finest > 0 else 0.25)
+    levels = [polylines_to_data(level, datatype, scale, bias, clip_rect, fill)
+              for level in geometry.simplify_polylines(
+                  subpaths, tolerances or (tolerance,), method)]
+    return levels if tolerances is not None else levels[0]
+
+def clip(path_or_data, rect, fill=True, margin=0.0, tolerance=0.25,
+         datatype=None, scale=None, bias=None, to_datatype=None,
+         to_scale=None, to_bias=None):
+    '''Clip path data to a viewport before uploading it.
+
+    Curves are flattened, and the result is clipped to the viewport (see
+    geometry.clip_polylines()), so that only the visible portion of a
+    large path need be uploaded to OpenVG.
+
+    Keyword arguments:
+        path_or_data -- The path to clip. This may be a Path object
+            (which must be keeping its segment data), or a 2-tuple of
+            the segment commands and the coordinate data.
+        rect -- The viewport, as an (x, y, width, height) rectangle in
+            user coordinates.
+        fill -- Whether to clip for filling (the default) or stroking.
+        margin -- A distance by which to expand the viewport on every
+            side. When clipping for stroking, this should be at least
+            half the stroke width, so that the caps at the cut ends are
+            not visible. The default is 0.0.
+        tolerance -- The precision with which curves are flattened, in
+            user coordinates. The default is 0.25.
+        datatype, scale, bias -- The datatype, scale and bias of the
+            data, if it is not a Path object. The defaults are those of
+            a new Path.
+        to_datatype, to_scale, to_bias -- The datatype, scale and bias
+            of the path that the result is destined for. The defaults
+            are those of the original.
+    Returns:
+        A 2-tuple of the clipped segment commands and coordinate data,
+        suitable for passing to Path.append_data().
+
+    '''
+    commands, data, datatype, scale, bias = path_data(path_or_data,
+                                                      datatype, scale, bias)
+    x, y, width, height = rect
+    rect = (x - margin, y - margin, width + 2 * margin, height + 2 * margin)
+    return polylines_to_data(
+        geometry.polylines(commands, data, scale, bias, tolerance),
+        datatype if to_datatype is None else to_datatype,
+        scale if to_scale is None else to_scale,
+        bias if to_bias is None else to_bias, rect, fill)
 
 # The centrepiece of the module, the big massive Path class itself.
 class Path:
@@ -79,7 +280,11 @@ class Path:
             (not coordinate pairs) that describe them.
         capabilities -- The bitmask describing the operations that may
             be performed on this path.
-        phandle -- The foreign object handle for this path.
+        phandle -- The foreign object handle for this path. Since
+            native functions given only this handle can change the path
+            data unseen, getting it forgets the cached bounds and the
+            client-side copy of the segment data. Pass the Path object
+            itself to native functions instead, wherever possible.
 
     '''
     def __init__(self, path_format=PathParams.default('FORMAT'),
@@ -87,7 +292,8 @@ class Path:
                  scale=PathParams.default('SCALE'),
                  bias=PathParams.default('BIAS'),
                  segment_capacity_hint=0, coord_capacity_hint=0,
-                 capabilities=PathCapabilities(ALL=1)):
+                 capabilities=PathCapabilities(ALL=1), keep_data=False,
+                 fastest=False):
         '''Initialise the OpenVG path.
 
         Keyword arguments:
@@ -97,41 +303,82 @@ class Path:
                 for the number of segments and coordinates that this path
                 should be expected to hold.
             capabilities -- As the instance attribute.
+            keep_data -- Whether or not to keep a client-side copy of
+                the segment data appended to this path, so that it can
+                be queried without native calls (see segment_data()), as
+                for hit-testing with pick.PickIndex. The default is
+                False.
+            fastest -- Whether to treat the datatype as a preference
+                only, and use the nearest hardware-accelerated datatype
+                that holds its coordinates exactly instead, if it is not
+                accelerated (see Profile.fastest_datatype()). The
+                default is False.
 
         '''
+        if fastest:
+            datatype = current_profile().fastest_datatype(datatype)
+
         # Set up state for the segment-queuing context manager.
         self._queuing = False
         self._queued_commands, self._queued_data = [], []
 
+        # Set up the client-side copy of the segment data. None means that
+        # the data is not known (or not being kept).
+        self.keep_data = keep_data
+        self._commands, self._data = ([], []) if keep_data else (None, None)
+
+        # Cache for parameters that can't change after creation, and for
+        # the bounding box, which only changes along with the path data.
+        self._fixed_params = {}
+        self._bounds = None
+
         # Store initial settings that can't be queried from OpenVG.
         self.segment_capacity_hint = segment_capacity_hint
         self.coord_capacity_hint = coord_capacity_hint
 
         # Create the OpenVG native object.
-        self.phandle = native.vgCreatePath(path_format, datatype, scale, bias,
-                                           segment_capacity_hint,
-                                           coord_capacity_hint, capabilities)
+        self._phandle = native.vgCreatePath(path_format, datatype, scale,
+                                            bias, segment_capacity_hint,
+                                            coord_capacity_hint, capabilities)
 
         # Check for problems that didn't raise exceptions.
-        if self.phandle == native.INVALID_HANDLE:
+        if self._phandle == native.INVALID_HANDLE:
             raise OpenVGError('path creation unexpectedly failed')
 
     def __del__(self):
         '''Call the native OpenVG cleanup function.'''
         native.vgDestroyPath(self)
 
+    def _changed_natively(self):
+        '''Forget what is known of the path data, since it has changed.
+
+        This is called by the native functions that change path data,
+        when they are passed this object rather than its bare handle.
+
+        '''
+        self._bounds = None
+        if self._commands is not None:
+            self._commands = self._data = None
+
     def __iadd__(self, path):
         '''Use in-place addition to append another path to this one.'''
         self.append(path)
+        return self
 
     def __len__(self):
         '''Get the length of this path, being its number of segments.'''
         return self.num_segments
 
+    @property
+    def phandle(self):
+        '''Get the bare handle, forgetting what is known of the data.'''
+        self._changed_natively()
+        return self._phandle
+
     @property
     def _as_parameter_(self):
         '''Get the path reference for use by foreign functions.'''
-        return self.phandle
+        return self._phandle
 
     def _get_param(self, param):
         '''Get the value of a path parameter.
@@ -144,10 +391,20 @@ class Path:
             param -- The identifier of the parameter requested.
 
         '''
+        # The parameters set at path creation never change, so they only
+        # need to be fetched once.
+        try:
+            return self._fixed_params[param]
+        except KeyError:
+            pass
+
         # If param is not a known parameter type, PathParams.details[param]
         # will raise a KeyError, which we allow to propagate upwards.
         get_fn = native_getter(PathParams.details[param])
-        return param_convert(param, get_fn(self, param), PathParams)
+        value = param_convert(param, get_fn(self, param), PathParams)
+        if param in _fixed_params:
+            self._fixed_params[param] = value
+        return value
 
     @property
     def path_format(self):
@@ -189,6 +446,43 @@ class Path:
         '''Get the current capabilities reported by OpenVG.'''
         return PathCapabilities(native.vgGetPathCapabilities(self))
 
+    def segment_data(self):
+        '''Get the client-side copy of this path's segment data.
+
+        The data is in the same form as is passed to vgAppendPathData():
+        raw coordinate values in this path's datatype, before scale and
+        bias are applied.
+
+        Returns:
+            A 2-tuple of the segment commands and the coordinate data,
+            each as a tuple.
+        Raises:
+            ValueError -- If the segment data is not known, because it
+                is not being kept (see the keep_data argument when
+                creating the path) or because this path was modified by
+                a native operation that cannot be followed in Python,
+                such as transform() or a VGU function, or because its
+                bare handle, phandle, was got.
+
+        '''
+        if self._commands is None:
+            raise ValueError('segment data for this path is not known')
+        return tuple(self._commands), tuple(self._data)
+
+    def polylines(self, tolerance=0.25):
+        '''Flatten this path into polylines, without any native calls.
+
+        Keyword arguments:
+            tolerance -- The greatest distance by which the polylines
+                may depart from the true curves. The default is 0.25.
+        Returns:
+            A list of geometry.Subpath named tuples, in user coordinates.
+
+        '''
+        commands, data = self.segment_data()
+        return geometry.polylines(commands, data, self.scale, self.bias,
+                                  tolerance)
+
     def _append_data(self, commands, data):
         '''Add new segment data to this path.
 
@@ -202,14 +496,17 @@ class Path:
                 commands.
 
         '''
-        c_data_type = {PathDatatypes.S_8: c_int8,
-                       PathDatatypes.S_16: c_int16,
-                       PathDatatypes.S_32: c_int32,
-                       PathDatatypes.F: c_float}[self.datatype]
         arr_commands = to_array(c_ubyte, commands)
-        data_commands = to_array(c_data_type, data)
-        native.vgAppendPathData(self, len(commands), arr_commands,
+        data_commands = data_array(data, self.datatype)
+        native.vgAppendPathData(self._phandle, len(commands), arr_commands,
                                 data_commands)
+        self._bounds = None
+
+        # Keep the client-side copy up to date, with the values converted
+        # exactly as the native array converted them.
+        if self._commands is not None:
+            self._commands.extend(commands)
+            self._data.extend(data_commands)
 
     def _add_segment(self, command, data):
         '''Prepare to add a new segment to this path.
@@ -232,13 +529,49 @@ class Path:
         else:
             self._append_data((command,), data)
 
+    def append_data(self, commands, data):
+        '''Append raw segment data to this path.
+
+        This is the bulk counterpart of the methods that add individual
+        segments, taking data in the same form as vgAppendPathData():
+        the coordinates must already be in this path's datatype, scale
+        and bias. Like those methods, it respects queuing mode.
+
+        Keyword arguments:
+            commands -- A sequence of segment commands, as obtained from
+                SegmentCommand.
+            data -- A flat sequence of the coordinate data for all of the
+                commands.
+
+        '''
+        if self._queuing:
+            self._queued_commands.extend(commands)
+            self._queued_data.extend(data)
+        elif commands:
+            self._append_data(commands, data)
+
     def append(self, path):
         '''Append all path segments from another path to this one.
 
         This is identical to using in-place addition on this path.
 
         '''
-        native.vgAppendPath(path, self)
+        native.vgAppendPath(self._phandle, path)
+        self._bounds = None
+
+        # Update the client-side copy, converting the other path's data to
+        # the datatype, scale and bias of this one.
+        if self._commands is not None:
+            try:
+                commands, data = path.segment_data()
+            except ValueError:
+                self._commands = self._data = None
+            else:
+                self._commands.extend(commands)
+                self._data.extend(convert_data(data, path.datatype,
+                                               path.scale, path.bias,
+                                               self.datatype, self.scale,
+                                               self.bias))
 
     def clear(self, capabilities=None):
         '''Clear all data from this path.
@@ -253,8 +586,12 @@ class Path:
                 (as amended by remove_capabilities()) is reused.
 
         '''
-        native.vgClearPath(self, capabilities if capabilities is not None else
+        native.vgClearPath(self._phandle,
+                           capabilities if capabilities is not None else
                            self.capabilities)
+        self._bounds = None
+        if self.keep_data:
+            self._commands, self._data = [], []
 
     def remove_capabilities(self, *args, **kwargs):
         '''Remove the specified capabilities from this path.
@@ -290,6 +627,7 @@ class Path:
         dest = to_path or Path(self.path_format, self.datatype, self.scale,
                                self.bias, self.segment_capacity_hint,
                                self.coord_capacity_hint, self.capabilities)
+        # Passing dest itself tells it that its data is no longer known.
         native.vgTransformPath(dest, self)
         if to_path is None:
             return dest
@@ -492,7 +830,17 @@ class Path:
     def modify_path(self, start, length, data):
         '''Modify existing path data for one or more segments.'''
         # TODO: This can surely be made more Pythonic and accessible?
-        native.vgModifyPath(self, start, length, data)
+        arr_data = data_array(data, self.datatype)
+        native.vgModifyPathCoords(self._phandle, start, length, arr_data)
+        self._bounds = None
+
+        # Overwrite the same coordinates in the client-side copy.
+        if self._commands is not None:
+            first = sum(geometry.coord_count(command)
+                        for command in self._commands[:start])
+            count = sum(geometry.coord_count(command)
+                        for command in self._commands[start:start + length])
+            self._data[first:first + count] = arr_data[:count]
 
     def interpolate(self, end, amount, to_path=None):
         '''Get an interpolation between this path and another.
@@ -558,7 +906,24 @@ class Path:
                 (tx.contents.value, ty.contents.value))
 
     def bounds(self, apply_transform=False):
-        '''Get the bounding box of this path.'''
+        '''Get the bounding box of this path.
+
+        The untransformed bounding box is kept until the path data next
+        changes (through this object's methods, or a native or VGU
+        function passed this object) or its bare handle is got, so
+        asking for it again needs no native call.
+
+        Keyword arguments:
+            apply_transform -- Whether to get the bounding box in surface
+                coordinates, transformed by the current path-user-to-
+                surface matrix. The default is False.
+        Returns:
+            An (x, y, width, height) 4-tuple.
+
+        '''
+        if not apply_transform and self._bounds is not None:
+            return self._bounds
+
         # Get pointers to hold the results.
         x, y, width, height = (native.make_float_p(), native.make_float_p(),
                                native.make_float_p(), native.make_float_p())
@@ -568,8 +933,11 @@ class Path:
          native.vgPathBounds)(self, x, y, width, height)
 
         # Dereference the pointers.
-        return (x.contents.value, y.contents.value,
-                width.contents.value, height.contents.value)
+        box = (x.contents.value, y.contents.value,
+               width.contents.value, height.contents.value)
+        if not apply_transform:
+            self._bounds = box
+        return box
 
     def draw(self, **kwargs):
         '''Draw the path.'''
@@ -588,3 +956,123 @@ class Path:
             return # TODO: Error?
         # Do it!
         native.vgRenderToMask(self, mode, mask_op)
+
+
+class RollingPath:
+    '''A polyline that keeps only its most recent points.
+
+    OpenVG paths can only grow, so a rolling window of points cannot be
+    kept in a single path without recreating it. Instead, this keeps a
+    small ring of paths, each holding a chunk of consecutive points.
+    New points go on the end of the newest chunk; once it is full, the
+    oldest chunk is cleared and reused as the newest. The cost of adding
+    points is therefore proportional to the number of points added, not
+    to the size of the window.
+
+    Each chunk begins where the one before it ended, so the chunks draw
+    as one continuous polyline, though strokes are not joined across the
+    boundaries between chunks.
+
+    Instance attributes:
+        window -- The minimum number of most recent points that are
+            kept. Older points are also kept until the chunk holding
+            them is retired, so up to chunk_size times the number of
+            chunks may be held.
+        chunk_size -- The number of points held by each chunk.
+        paths -- The ring of Path objects, oldest first.
+
+    '''
+    def __init__(self, window, chunks=4, datatype=PathDatatypes.F,
+                 scale=PathParams.default('SCALE'),
+                 bias=PathParams.default('BIAS'),
+                 capabilities=PathCapabilities(ALL=1)):
+        '''Initialise the rolling path.
+
+        Keyword arguments:
+            window -- As the instance attribute.
+            chunks -- The number of paths in the ring, which is also the
+                greatest number of vgDrawPath() calls needed to draw it.
+                It must be at least 2. The default is 4.
+            datatype, scale, bias, capabilities -- As for Path. The
+                default datatype is F (floating-point).
+
+        '''
+        if chunks < 2:
+            raise ValueError('a rolling path needs at least 2 chunks')
+        self.window = window
+        # Whenever the oldest chunk is retired, the rest must still hold at
+        # least a full window of points.
+        self.chunk_size = max(1, -(-window // (chunks - 1)))
+        self._capabilities = capabilities
+        self.paths = [Path(datatype=datatype, scale=scale, bias=bias,
+                           segment_capacity_hint=self.chunk_size,
+                           coord_capacity_hint=2 * self.chunk_size,
+                           capabilities=capabilities, keep_data=False)
+                      for _ in range(chunks)]
+        # The number of points in each chunk, and the last point added.
+        self._counts = [0] * chunks
+        self._newest = 0
+        self._last = None
+
+    def __len__(self):
+        '''Get the number of points currently held.'''
+        return sum(self._counts)
+
+    def append(self, point):
+        '''Add one point to the end of the polyline.'''
+        self.extend((point,))
+
+    def extend(self, points):
+        '''Add points to the end of the polyline.
+
+        Keyword arguments:
+            points -- A sequence of (x, y) points, already in this path's
+                datatype, scale and bias.
+
+        '''
+        move, line = (SegmentCommand(PathSegments.MOVE_TO),
+                      SegmentCommand(PathSegments.LINE_TO))
+        points = list(points)
+        pos = 0
+        while pos < len(points):
+            count = self._counts[self._newest]
+            if count == self.chunk_size:
+                # The newest chunk is full, so retire the oldest one.
+                self._newest = (self._newest + 1) % len(self.paths)
+                self.paths[self._newest].clear(self._capabilities)
+                self._counts[self._newest] = count = 0
+
+            batch = points[pos:pos + self.chunk_size - count]
+            commands = [line] * len(batch)
+            if count == 0:
+                # Start the chunk where the last one left off.
+                if self._last is None:
+                    commands[0] = move
+                else:
+                    commands.insert(0, move)
+                    batch.insert(0, self._last)
+            self.paths[self._newest].append_data(
+                commands, [coord for point in batch for coord in point])
+            self._counts[self._newest] = count + len(batch) - (
+                1 if count == 0 and self._last is not None else 0)
+            self._last = batch[-1]
+            pos += self.chunk_size - count
+
+    def clear(self):
+        '''Remove all points.'''
+        for path in self.paths:
+            path.clear(self._capabilities)
+        self._counts = [0] * len(self.paths)
+        self._newest, self._last = 0, None
+
+    def draw(self, **kwargs):
+        '''Draw the polyline, with one vgDrawPath() call per chunk in use.
+
+        Keyword arguments are as for Path.draw(); a rolling path would
+        usually be drawn with stroke=True.
+
+        '''
+        num = len(self.paths)
+        for n in range(self._newest + 1, self._newest + num + 1):
+            if self._counts[n % num]:
+                self.paths[n % num].draw(**kwargs)
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+
+'''Hit-testing ("picking") of paths at points and rectangles.
+
+OpenVG itself offers no way to ask which path lies under a given point.
+This module answers that question on the client side: path bounds are
+kept in a uniform grid, so that a query only considers the few paths
+near the point in question, and those candidates are then tested
+exactly against their flattened geometry.
+
+'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+__all__ = ['PickIndex']
+
+# Standard library imports.
+from collections import namedtuple
+from itertools import count
+from math import floor, sqrt
+
+# Local imports.
+from . import geometry
+from .context import FillRule
+
+# Everything the index knows about one path.
+_Entry = namedtuple('_Entry', ('path', 'matrix', 'fill_rule', 'fill',
+                               'stroke_width', 'tolerance', 'subpaths',
+                               'bounds', 'z', 'cells', 'user_subpaths',
+                               'inverse', 'radius'))
+
+def _stretch(values):
+    '''Get the most that an affine matrix stretches any distance by.'''
+    sx, shy, _, shx, sy, _, _, _, _ = values
+    total = sx * sx + shx * shx + shy * shy + sy * sy
+    det = sx * sy - shx * shy
+    return sqrt((total + sqrt(max(total * total - 4 * det * det, 0.0))) / 2)
+
+def _affine_inverse(values):
+    '''Get a function that undoes an affine matrix, if there is one.'''
+    sx, shy, w0, shx, sy, w1, tx, ty, w2 = values
+    det = sx * sy - shx * shy
+    if (w0, w1, w2) != (0, 0, 1) or det == 0:
+        return None
+    def inverse(point):
+        x, y = point[0] - tx, point[1] - ty
+        return ((sy * x - shx * y) / det, (sx * y - shy * x) / det)
+    return inverse
+
+class PickIndex:
+    '''A spatial index for hit-testing many paths.
+
+    Each path is added under a key of the caller's choosing, and queries
+    return those keys. Paths added later are considered to be drawn on
+    top of those added earlier, so queries report the topmost path
+    first.
+
+    Instance attributes:
+        cell_size -- The width and height of each grid cell, in user
+            coordinates. For best results this should be comparable to
+            the size of a typical path.
+        max_cells -- The largest number of grid cells a path may cover
+            before it is instead kept in a short list of large paths
+            that every query checks.
+
+    '''
+    def __init__(self, cell_size=64.0, max_cells=1024):
+        '''Initialise an empty index.
+
+        Keyword arguments:
+            cell_size, max_cells -- As the instance attributes.
+
+        '''
+        self.cell_size = float(cell_size)
+        self.max_cells = max_cells
+        self._entries = {}
+        self._cells = {}
+        self._large = set()
+        self._z = count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def _cell_range(self, rect):
+        '''Get the range of grid cells covered by a rectangle.'''
+        x, y, width, height = rect
+        size = self.cell_size
+        return (int(floor(x / size)), int(floor(y / size)),
+                int(floor((x + width) / size)),
+                int(floor((y + height) / size)))
+
+    def _index(self, key, entry):
+        '''Put an entry into the grid.'''
+        if entry.bounds is None:
+            cells = ()
+        else:
+            i0, j0, i1, j1 = self._cell_range(entry.bounds)
+            if (i1 - i0 + 1) * (j1 - j0 + 1) > self.max_cells:
+                self._large.add(key)
+                cells = None
+            else:
+                cells = tuple((i, j) for i in range(i0, i1 + 1)
+                              for j in range(j0, j1 + 1))
+                for cell in cells:
+                    self._cells.setdefault(cell, set()).add(key)
+        self._entries[key] = entry._replace(cells=cells)
+
+    def _unindex(self, key):
+        '''Take an entry out of the grid.'''
+        entry = self._entries.pop(key)
+        if entry.cells is None:
+            self._large.discard(key)
+        else:
+            for cell in entry.cells:
+                keys = self._cells[cell]
+                keys.discard(key)
+                if not keys:
+                    del self._cells[cell]
+        return entry
+
+    def add(self, key, path, matrix=None, fill_rule=FillRule.NON_ZERO,
+            fill=True, stroke_width=None, tolerance=0.25):
+        '''Add a path to the index, on top of all others.
+
+        If the key is already in the index, the path it refers to is
+        replaced, and the new path is placed on top.
+
+        Keyword arguments:
+            key -- The hashable value to report when this path is hit.
+            path -- The path to add. This may be a Path object (which
+                must be keeping its segment data; see the keep_data
+                argument of Path), or a 2-tuple of the segment commands
+                and the coordinate data.
+            matrix -- An optional transform to apply to the path. This
+                may be a Matrix object, or the nine matrix values in the
+                order used by vgLoadMatrix(). If omitted, the path is
+                indexed in its own user coordinates.
+            fill_rule -- The fill rule used when the path is filled. A
+                value from the FillRule named tuple; the default is
+                NON_ZERO.
+            fill -- Whether or not the path's filled area can be hit.
+                The default is True.
+            stroke_width -- The width of the stroke drawn around the
+                path, if any, in user coordinates (as OpenVG strokes it).
+                Points within half this distance of the outline will hit
+                the path, whether or not it is filled. This may also be
+                used to allow some tolerance around the edges of filled
+                shapes. Where the matrix stretches some directions more
+                than others, rectangle queries (and path bounds) use the
+                greatest stretch, and so may report a hit slightly
+                outside the stroke; point queries are exact.
+            tolerance -- The precision with which curves are flattened,
+                in user coordinates. The default is 0.25.
+
+        '''
+        if key in self._entries:
+            self._unindex(key)
+        self._index(key, self._make_entry(path, matrix, fill_rule, fill,
+                                          stroke_width, tolerance,
+                                          next(self._z)))
+
+    def update(self, key, **kwargs):
+        '''Update a path that is already in the index.
+
+        The path keeps its place in the drawing order. This is the way
+        to tell the index that a path has moved (pass a new matrix) or
+        changed shape (pass the path again, or a new one).
+
+        Keyword arguments:
+            key -- The key of the path to update.
+            Any of the keyword arguments accepted by add(). Those that
+            are not given keep their previous values.
+
+        '''
+        entry = self._unindex(key)
+        settings = {name: kwargs.get(name, getattr(entry, name))
+                    for name in ('path', 'matrix', 'fill_rule', 'fill',
+                                 'stroke_width', 'tolerance')}
+        self._index(key, self._make_entry(z=entry.z, **settings))
+
+    def remove(self, key):
+        '''Remove a path from the index.'''
+        self._unindex(key)
+
+    def clear(self):
+        '''Remove all paths from the index.'''
+        self._entries.clear()
+        self._cells.clear()
+        self._large.clear()
+
+    @staticmethod
+    def _make_entry(path, matrix, fill_rule, fill, stroke_width, tolerance,
+                    z):
+        '''Flatten a path and work out its bounds.'''
+        try:
+            subpaths = path.polylines(tolerance)
+        except AttributeError:
+            commands, data = path
+            subpaths = geometry.polylines(commands, data,
+                                          tolerance=tolerance)
+        user_subpaths, inverse = subpaths, None
+        radius = (stroke_width or 0.0) / 2
+        if matrix is not None:
+            values = tuple(getattr(matrix, '_as_parameter_', matrix))
+            subpaths = geometry.transform_polylines(subpaths, values)
+            # The stroke is drawn in user coordinates, so point tests undo
+            # an affine matrix, and everything else scales the stroke by
+            # the matrix's greatest stretch.
+            inverse = _affine_inverse(values)
+            if inverse is not None:
+                radius *= _stretch(values)
+
+        box = geometry.bounds(subpaths)
+        if box is not None and radius:
+            box = (box[0] - radius, box[1] - radius,
+                   box[2] + 2 * radius, box[3] + 2 * radius)
+        return _Entry(path, matrix, fill_rule, fill, stroke_width, tolerance,
+                      subpaths, box, z, (), user_subpaths, inverse, radius)
+
+    def _candidates(self, rect):
+        '''Get the entries whose bounds meet a rectangle, topmost first.'''
+        x, y, width, height = rect
+        i0, j0, i1, j1 = self._cell_range(rect)
+        keys = set(self._large)
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(self._cells):
+            # A large query is quicker to answer from the occupied cells.
+            for (i, j), cell_keys in self._cells.items():
+                if i0 <= i <= i1 and j0 <= j <= j1:
+                    keys.update(cell_keys)
+        else:
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    keys.update(self._cells.get((i, j), ()))
+
+        entries = []
+        for key in keys:
+            entry = self._entries[key]
+            bx, by, bwidth, bheight = entry.bounds
+            if (bx <= x + width and x <= bx + bwidth and
+                by <= y + height and y <= by + bheight):
+                entries.append((entry.z, key, entry))
+        entries.sort(key=lambda item: item[0], reverse=True)
+        return [(key, entry) for _, key, entry in entries]
+
+    @staticmethod
+    def _hits_point(entry, point):
+        '''Test a point exactly against one entry.'''
+        if entry.fill and geometry.contains(
+                entry.subpaths, point,
+                even_odd=(entry.fill_rule == FillRule.EVEN_ODD)):
+            return True
+        if not entry.stroke_width:
+            return False
+        if entry.inverse is not None:
+            return geometry.near_stroke(entry.user_subpaths,
+                                        entry.inverse(point),
+                                        entry.stroke_width / 2)
+        return geometry.near_stroke(entry.subpaths, point, entry.radius)
+
+    def pick(self, point):
+        '''Find the topmost path at a given point.
+
+        Keyword arguments:
+            point -- The (x, y) coordinates to test.
+        Returns:
+            The key of the topmost path that is hit, or None if no path
+            is hit.
+
+        '''
+        x, y = point
+        for key, entry in self._candidates((x, y, 0, 0)):
+            if self._hits_point(entry, point):
+                return key
+        return None
+
+    def pick_all(self, point):
+        '''Find all paths at a given point.
+
+        Keyword arguments:
+            point -- The (x, y) coordinates to test.
+        Returns:
+            A list of the keys of all paths that are hit, topmost first.
+
+        '''
+        x, y = point
+        return [key for key, entry in self._candidates((x, y, 0, 0))
+                if self._hits_point(entry, point)]
+
+    def pick_rect(self, rect):
+        '''Find all paths that touch a rectangle.
+
+        Keyword arguments:
+            rect -- An (x, y, width, height) 4-tuple.
+        Returns:
+            A list of the keys of all paths that are hit, topmost first.
+
+        '''
+        return [key for key, entry in self._candidates(rect)
+                if geometry.intersects_rect(
+                    entry.subpaths, rect, fill=entry.fill,
+                    even_odd=(entry.fill_rule == FillRule.EVEN_ODD),
+                    radius=entry.radius)]
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+
+'''Capability profiles of OpenVG implementations.
+
+Everything that OpenVG reports about what it can do, from its limits to
+which formats it accelerates, is fixed for a given implementation. This
+module gathers all of it into one record, which can be kept instead of
+asking again, and even saved so that a later run need not ask at all.
+
+'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+__all__ = ['HardwareQueryType', 'HardwareQueryResult', 'StringID',
+           'Profile', 'current_profile']
+
+# Standard library imports.
+from collections import namedtuple
+import json
+
+# Local imports.
+from . import native
+from .params import ImageFormats, PathDatatypes
+
+# Hardware query types and results.
+HardwareQueryType = namedtuple('HardwareQueryType_tuple',
+                               ('IMAGE_FORMAT_QUERY', 'PATH_DATATYPE_QUERY')
+                               )(0x2100, 0x2101)
+HardwareQueryResult = namedtuple('HardwareQueryResult_tuple',
+                                 ('ACCELERATED', 'UNACCELERATED')
+                                 )(0x2200, 0x2201)
+
+# Implementation description strings.
+StringID = namedtuple('StringID_tuple',
+                      ('VENDOR', 'RENDERER', 'VERSION', 'EXTENSIONS')
+                      )(0x2300, 0x2301, 0x2302, 0x2303)
+
+# The read-only implementation limits, with their parameter types and
+# whether they are floating-point values.
+_limits = (('max_scissor_rects', 0x1160, False),
+           ('max_dash_count', 0x1161, False),
+           ('max_kernel_size', 0x1162, False),
+           ('max_separable_kernel_size', 0x1163, False),
+           ('max_color_ramp_stops', 0x1164, False),
+           ('max_image_width', 0x1165, False),
+           ('max_image_height', 0x1166, False),
+           ('max_image_pixels', 0x1167, False),
+           ('max_image_bytes', 0x1168, False),
+           ('max_float', 0x1169, True),
+           ('max_gaussian_std_deviation', 0x116A, True))
+
+# The datatypes that hold every value of each datatype exactly, nearest
+# first. A float's 24-bit significand holds any 8- or 16-bit integer, but
+# not every 32-bit one.
+_exact_datatypes = {PathDatatypes.S_8: (PathDatatypes.S_16, PathDatatypes.S_32,
+                                        PathDatatypes.F),
+                    PathDatatypes.S_16: (PathDatatypes.S_32, PathDatatypes.F),
+                    PathDatatypes.S_32: (),
+                    PathDatatypes.F: ()}
+
+def _get_string(string_id):
+    '''Get one of the implementation description strings.'''
+    value = native.vgGetString(string_id)
+    return '' if value is None else value.decode('latin-1')
+
+def _format_key(image_format):
+    '''Describe what a substitute for an image format must share with it.
+
+    Returns:
+        A 4-tuple of the colour space of the format, whether or not it
+        is premultiplied, and its channels and their bit depths (each
+        in any order, since the depths are given in RGBA order even for
+        formats that order their channels differently).
+
+    '''
+    name = ImageFormats._fields[ImageFormats.index(image_format)]
+    parts = name.split('_')
+    space, channels = ((parts[0][0], parts[0][1:])
+                       if parts[0][0] in 'sl' else ('', parts[0]))
+    return (space, parts[-1] == 'PRE', ''.join(sorted(channels)),
+            ''.join(sorted(parts[1])))
+
+def _accelerated(query_type, settings):
+    '''Get the settings that OpenVG reports as hardware-accelerated.'''
+    return tuple(setting for setting in settings
+                 if native.vgHardwareQuery(query_type, setting) ==
+                 HardwareQueryResult.ACCELERATED)
+
+class Profile(namedtuple('Profile_base',
+                         tuple(name for name, _, _ in _limits) +
+                         ('vendor', 'renderer', 'version', 'extensions',
+                          'accelerated_datatypes', 'accelerated_formats'))):
+    '''The capabilities of an OpenVG implementation.
+
+    Profiles are normally got from Context.profile(), which probes the
+    implementation only once per context. They can also be saved with
+    to_json() and restored with from_json(), and a restored profile made
+    current with install(), so that a warm start need not probe at all.
+
+    Instance attributes:
+        max_scissor_rects, max_dash_count, max_kernel_size,
+            max_separable_kernel_size, max_color_ramp_stops,
+            max_image_width, max_image_height, max_image_pixels,
+            max_image_bytes, max_float, max_gaussian_std_deviation --
+            The read-only implementation limits, as for the Context
+            attributes of the same names.
+        vendor, renderer, version -- The strings describing the
+            implementation.
+        extensions -- A tuple of the names of the extensions supported.
+        accelerated_datatypes -- A tuple of the values from the
+            PathDatatypes named tuple for which path operations are
+            hardware-accelerated.
+        accelerated_formats -- A tuple of the values from the
+            ImageFormats named tuple for which image operations are
+            hardware-accelerated.
+
+    '''
+    __slots__ = ()
+
+    @classmethod
+    def probe(cls):
+        '''Ask the current context for its capabilities.'''
+        limits = [(native.vgGetf if is_float else native.vgGeti)(param_type)
+                  for _, param_type, is_float in _limits]
+        return cls(*limits,
+                   vendor=_get_string(StringID.VENDOR),
+                   renderer=_get_string(StringID.RENDERER),
+                   version=_get_string(StringID.VERSION),
+                   extensions=tuple(_get_string(StringID.EXTENSIONS).split()),
+                   accelerated_datatypes=_accelerated(
+                       HardwareQueryType.PATH_DATATYPE_QUERY, PathDatatypes),
+                   accelerated_formats=_accelerated(
+                       HardwareQueryType.IMAGE_FORMAT_QUERY, ImageFormats))
+
+    @classmethod
+    def from_dict(cls, values):
+        '''Restore a profile from the output of to_dict().'''
+        return cls(**{name: (tuple(value) if isinstance(value, list) else
+                             value)
+                      for name, value in values.items()})
+
+    def to_dict(self):
+        '''Get the profile as a dict of JSON-compatible values.'''
+        return dict(self._asdict())
+
+    @classmethod
+    def from_json(cls, text):
+        '''Restore a profile from the output of to_json().'''
+        return cls.from_dict(json.loads(text))
+
+    def to_json(self):
+        '''Get the profile as a JSON string.'''
+        return json.dumps(self.to_dict(), sort_keys=True)
+
+    def install(self):
+        '''Make this the profile of the current context.
+
+        The limits are recorded as if they had been read from OpenVG, so
+        that reading them through Povg needs no native call. The profile
+        must have been probed from the same implementation.
+
+        '''
+        record = native.current_state()
+        for name, param_type, is_float in _limits:
+            value = getattr(self, name)
+            record.limits[param_type] = (is_float,
+                                         float(value) if is_float else
+                                         int(value))
+        record.profile = self
+
+    def fastest_datatype(self, datatype):
+        '''Choose the hardware-accelerated datatype nearest to another.
+
+        Only a datatype that holds every coordinate of the requested one
+        exactly (with the same scale and bias) is chosen: a wider integer
+        type for an integer one, or floats for 8- and 16-bit integers.
+        Nothing can stand in for 32-bit integers or floats, since
+        floats would round the largest integers, and integers would
+        round any fractions.
+
+        Keyword arguments:
+            datatype -- A value from the PathDatatypes named tuple.
+        Returns:
+            The nearest accelerated datatype that holds the requested one
+            exactly, or the requested datatype itself if it is
+            accelerated or there is none.
+
+        '''
+        if datatype in self.accelerated_datatypes:
+            return datatype
+        for substitute in _exact_datatypes[datatype]:
+            if substitute in self.accelerated_datatypes:
+                return substitute
+        return datatype
+
+    def fastest_format(self, image_format):
+        '''Choose the hardware-accelerated image format nearest to another.
+
+        Only a format that differs in nothing but the order of its
+        channels is chosen: it must have the same channels, at the same
+        bit depths, in the same colour space, and be premultiplied if
+        and only if the requested one is. OpenVG can then convert pixel
+        data to it without loss when it is uploaded, just by reordering
+        channels. Converting between the sRGB and linear colour spaces,
+        or to or from premultiplied alpha, would round colour values,
+        so no such format is chosen.
+
+        Keyword arguments:
+            image_format -- A value from the ImageFormats named tuple.
+        Returns:
+            The format itself, if it is accelerated or has no accelerated
+            equivalent; otherwise, the accelerated equivalent with the
+            lowest value.
+
+        '''
+        if image_format in self.accelerated_formats:
+            return image_format
+        key = _format_key(image_format)
+        return min((fmt for fmt in self.accelerated_formats
+                    if _format_key(fmt) == key), default=image_format)
+
+def current_profile():
+    '''Get the Profile of the current context, probing only if needed.'''
+    record = native.current_state()
+    if record.profile is None:
+        record.profile = Profile.probe()
+    return record.profile
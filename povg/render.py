@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+
+'''Rendering from many threads through one render thread.
+
+An OpenVG context may only be used by the thread in which it is current.
+This module provides a thread that owns a context and carries out work
+on behalf of any other thread: producers submit commands (any callable),
+which are queued in batches, and get back futures for their results.
+Those futures can also be awaited from asyncio coroutines, so that an
+event loop need never block on rendering.
+
+'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+__all__ = ['read_pixels', 'renderer_for', 'renderer_of', 'running_renderers',
+           'RenderThread', 'frame_loop']
+
+# Standard library imports.
+import asyncio
+from concurrent.futures import Future
+from contextlib import contextmanager
+from ctypes import c_ubyte
+from queue import Empty, SimpleQueue
+import threading
+
+# Local imports.
+from . import native
+from .params import ImageFormats
+
+def read_pixels(x, y, width, height, image_format=ImageFormats.sRGBA_8888,
+                into=None):
+    '''Read back pixels from the drawing surface.
+
+    Keyword arguments:
+        x, y, width, height -- The region of the surface to read.
+        image_format -- The format to read the pixels in, from the
+            ImageFormats named tuple. It must have 32 bits per pixel.
+            The default is sRGBA_8888.
+        into -- An optional writable buffer of at least width × height
+            × 4 bytes to read the pixels into. If omitted, a new
+            bytearray is created.
+    Returns:
+        The buffer holding the pixels, row by row from the bottom row
+        up (as OpenVG numbers them).
+
+    '''
+    stride = width * 4
+    if into is None:
+        into = bytearray(stride * height)
+    data = (c_ubyte * (stride * height)).from_buffer(into)
+    native.vgReadPixels(data, stride, image_format, x, y, width, height)
+    return into
+
+# The running render threads, by thread identifier.
+_renderers = {}
+
+def renderer_for(thread):
+    '''Get the RenderThread with a given thread identifier, if any.
+
+    Keyword arguments:
+        thread -- The identifier of a thread, as from
+            threading.get_ident().
+    Returns:
+        The RenderThread, or None if that thread is not a running
+        RenderThread.
+
+    '''
+    return _renderers.get(thread)
+
+def renderer_of(context):
+    '''Get the running RenderThread that owns a given context, if any.
+
+    Keyword arguments:
+        context -- The context, as returned by the setup function of the
+            RenderThread.
+    Returns:
+        The RenderThread, or None if no running RenderThread has that
+        context.
+
+    '''
+    for renderer in running_renderers():
+        if renderer.context is context:
+            return renderer
+    return None
+
+def running_renderers():
+    '''Get a tuple of all running RenderThreads.'''
+    return tuple(_renderers.values())
+
+class RenderThread(threading.Thread):
+    '''A thread that owns an OpenVG context and renders for others.
+
+    Commands are run in the order submitted, in the render thread. Each
+    call to submit() queues its command straight away, unless it is made
+    inside a batch() block, in which case all commands of the block are
+    queued together when it ends. The render thread takes every batch
+    waiting in the queue each time it wakes, so the cost of passing
+    commands between threads is paid per batch rather than per command.
+
+        with RenderThread(setup) as renderer:
+            with renderer.batch():
+                renderer.submit(path.append_data, commands, data)
+                renderer.submit(path.draw, fill=True)
+                pixels = renderer.submit(read_pixels, 0, 0, 64, 64)
+            use(pixels.result())
+
+    Instance attributes:
+        context -- Whatever the setup function returned, once the thread
+            has started; normally the context it made current.
+
+    '''
+    def __init__(self, setup=None, teardown=None, name='povg-render'):
+        '''Initialise the thread, without starting it.
+
+        Keyword arguments:
+            setup -- An optional function to call, with no arguments, in
+                the render thread before any command is run. It should
+                create a context and make it current (for instance, an
+                EGLContext from povg.context.egl) and return it. If
+                omitted, whatever context is current in the render
+                thread is used.
+            teardown -- An optional function to call in the render
+                thread after the last command, with the value returned
+                by setup. Then, if that value has an unbind() method
+                (as EGLContext does), it is called too.
+            name -- The name of the thread.
+
+        '''
+        super().__init__(name=name, daemon=True)
+        self._setup, self._teardown = setup, teardown
+        self._queue = SimpleQueue()
+        self._local = threading.local()
+        self._ready = threading.Event()
+        # Guards the stopping flag, so that nothing is queued after the
+        # sentinel that stops the thread.
+        self._lock = threading.Lock()
+        self._stopping = False
+        self._error = None
+        self.context = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        '''Start the thread, and wait until its setup is done.
+
+        Raises:
+            Whatever the setup function raised, if it failed.
+
+        '''
+        super().start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    def stop(self, wait=True):
+        '''Stop the thread once every command already queued has run.
+
+        Keyword arguments:
+            wait -- Whether to wait for the thread to finish. The default
+                is True.
+
+        '''
+        with self._lock:
+            if not self._stopping:
+                self._stopping = True
+                self._queue.put(None)
+        if wait and threading.current_thread() is not self:
+            self.join()
+
+    def submit(self, fn, *args, **kwargs):
+        '''Submit a command to be run in the render thread.
+
+        Commands submitted from the render thread itself (such as by
+        other commands) are run at once.
+
+        Keyword arguments:
+            fn -- The function to call.
+            Any others are passed on to that function.
+        Raises:
+            RuntimeError -- If the thread has been stopped.
+        Returns:
+            A concurrent.futures.Future of the result of the call.
+
+        '''
+        if self._stopping:
+            raise RuntimeError('render thread is stopped')
+        future = Future()
+        command = (future, fn, args, kwargs)
+        if threading.current_thread() is self:
+            self._run(command)
+            return future
+
+        pending = getattr(self._local, 'pending', None)
+        if pending is None:
+            self._enqueue((command,))
+        else:
+            pending.append(command)
+        return future
+
+    def _enqueue(self, batch):
+        '''Queue a batch of commands, or cancel them if stopping.'''
+        with self._lock:
+            if not self._stopping:
+                self._queue.put(batch)
+                return
+        for future, _, _, _ in batch:
+            future.cancel()
+
+    def call(self, fn, *args, **kwargs):
+        '''Run a command in the render thread and wait for its result.
+
+        Inside a batch() block, this queues the commands submitted so far
+        in the block, along with this one, rather than waiting for the
+        block to end.
+
+        Raises:
+            RuntimeError -- If the thread has been stopped.
+            concurrent.futures.CancelledError -- If the thread is stopped
+                before the command could be queued.
+
+        '''
+        future = self.submit(fn, *args, **kwargs)
+        pending = getattr(self._local, 'pending', None)
+        if pending:
+            self._enqueue(tuple(pending))
+            del pending[:]
+        return future.result()
+
+    async def run_async(self, fn, *args, **kwargs):
+        '''Run a command in the render thread, and await its result.
+
+        The calling coroutine is suspended, but its event loop is not
+        blocked, while the command waits its turn and runs.
+
+        '''
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    @contextmanager
+    def batch(self):
+        '''Queue all commands submitted in a with statement together.
+
+        Batches may be nested, in which case the commands are queued when
+        the outermost one ends. Commands are still queued if the block
+        raises an exception; cancel their futures to stop them running.
+
+        '''
+        if getattr(self._local, 'pending', None) is not None:
+            yield
+            return
+        self._local.pending = []
+        try:
+            yield
+        finally:
+            commands, self._local.pending = self._local.pending, None
+            if commands:
+                self._enqueue(tuple(commands))
+
+    @staticmethod
+    def _run(command):
+        '''Run one command, and settle its future.'''
+        future, fn, args, kwargs = command
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as exc:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+
+    def run(self):
+        '''Set up the context, then run commands until stopped.'''
+        try:
+            if self._setup is not None:
+                self.context = self._setup()
+        except BaseException as exc:
+            self._error, self._stopping = exc, True
+            self._ready.set()
+            return
+        _renderers[self.ident] = self
+        self._ready.set()
+
+        try:
+            running = True
+            while running:
+                batches = [self._queue.get()]
+                # Take everything else already waiting, in one go.
+                try:
+                    while True:
+                        batches.append(self._queue.get_nowait())
+                except Empty:
+                    pass
+                for n, batch in enumerate(batches):
+                    if batch is None:
+                        running = False
+                        # Nothing is queued after the sentinel, but cancel
+                        # anything taken with it, to be sure.
+                        for later in batches[n + 1:]:
+                            for future, _, _, _ in later or ():
+                                future.cancel()
+                        break
+                    for command in batch:
+                        self._run(command)
+        finally:
+            del _renderers[self.ident]
+            # Anything queued in a race with stop() will never run.
+            try:
+                while True:
+                    for future, _, _, _ in self._queue.get_nowait() or ():
+                        future.cancel()
+            except Empty:
+                pass
+            try:
+                if self._teardown is not None:
+                    self._teardown(self.context)
+            finally:
+                # Free the context for other threads, since this one is
+                # about to end (and its identifier may be reused).
+                unbind = getattr(self.context, 'unbind', None)
+                if unbind is not None:
+                    unbind()
+
+async def frame_loop(renderer, draw_frame, rate=None, frames=None):
+    '''Render frames one after another, without blocking the event loop.
+
+    Each frame is one command in the render thread, so drawing and
+    presenting it (by swapping buffers, say) cost one round trip between
+    threads. The event loop is free to serve other coroutines while each
+    frame renders and between frames.
+
+    Keyword arguments:
+        renderer -- The RenderThread to render in.
+        draw_frame -- The function to call in the render thread for each
+            frame, with the frame number (counting from 0). It should
+            draw and present the frame, and may return False to end the
+            loop.
+        rate -- The most frames to render per second. If omitted or
+            None, frames are rendered as fast as possible.
+        frames -- The number of frames to render. If omitted or None,
+            the loop only ends when draw_frame returns False (or the
+            awaiting task is cancelled).
+    Returns:
+        The number of frames rendered.
+
+    '''
+    loop = asyncio.get_running_loop()
+    interval = None if rate is None else 1 / rate
+    next_time = loop.time()
+    count = 0
+    while frames is None or count < frames:
+        result = await renderer.run_async(draw_frame, count)
+        count += 1
+        if result is False:
+            break
+        if interval is None:
+            # Still give other coroutines a turn.
+            await asyncio.sleep(0)
+        else:
+            next_time = max(next_time + interval, loop.time())
+            await asyncio.sleep(next_time - loop.time())
+    return count
@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+
+'''A local render server, backed by a pool of worker processes.
+
+Rather than load Povg and set up a context for every job, applications
+can send scenes to a long-running server, which keeps a warm Farm of
+worker processes and answers each scene with its pixels. Run it with:
+
+    python -m povg.server /tmp/povg.sock --size 512x512 --workers 4
+
+Scenes are sent over a Unix socket in a compact binary form (see the
+Scene class), and replies carry the time each request spent waiting and
+rendering. Requests larger than a set limit are refused. A bounded
+number of requests may be in progress at once; beyond that, the server
+either stops reading from clients until there is room (so that they are
+held back by their own socket buffers), or turns requests away as busy.
+
+Every message, in either direction, is a header followed by a payload.
+A request header holds the magic bytes b'PVG1', the request type (from
+the RequestTypes named tuple), the width and height of the frame, and
+the length of the payload (the scene). A reply header holds the magic
+bytes, the status (from the ReplyStatus named tuple), the width and
+height, the length of the payload, and the microseconds the request
+waited and rendered for. The payload of a reply is the RGBA pixels, row
+by row from the bottom row up; or the error message; or, for statistics,
+a JSON object.
+
+'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+__all__ = ['RequestTypes', 'ReplyStatus', 'SceneOps', 'Scene', 'Reply',
+           'LatencyMetrics', 'RenderServer', 'request', 'main']
+
+# Standard library imports.
+import argparse
+import asyncio
+from collections import deque, namedtuple
+import json
+import os
+import socket
+import struct
+import sys
+
+# Local imports.
+from .farm import EGLPbufferBackend, Farm
+
+MAGIC = b'PVG1'
+_request_header = struct.Struct('<4sBxHHI')
+_reply_header = struct.Struct('<4sBxHHIII')
+
+RequestTypes = namedtuple('RequestTypes_tuple',
+                          ('RENDER', 'STATS'))(0, 1)
+ReplyStatus = namedtuple('ReplyStatus_tuple',
+                         ('OK', 'ERROR', 'BUSY'))(0, 1, 2)
+
+# Scene operations, and the fixed-size arguments that follow each one.
+SceneOps = namedtuple('SceneOps_tuple',
+                      ('CLEAR', 'FILL', 'STROKE', 'MATRIX', 'PATH')
+                      )(1, 2, 3, 4, 5)
+_op_args = {SceneOps.CLEAR: struct.Struct('<I'),
+            SceneOps.FILL: struct.Struct('<I'),
+            SceneOps.STROKE: struct.Struct('<If'),
+            SceneOps.MATRIX: struct.Struct('<6f'),
+            SceneOps.PATH: struct.Struct('<BII')}
+
+Reply = namedtuple('Reply', ('status', 'width', 'height', 'payload',
+                             'wait_us', 'render_us'))
+
+def _rgba(color):
+    '''Pack an (R, G, B, A) colour, each from 0 to 255, into an integer.'''
+    r, g, b, a = (min(255, max(0, int(value))) for value in color)
+    return (r << 24) | (g << 16) | (b << 8) | a
+
+class Scene:
+    '''A batch of drawing commands, in the server's binary form.
+
+    Each operation is one byte (from the SceneOps named tuple) followed
+    by its arguments, all little-endian:
+
+        CLEAR -- The clear colour, as a 32-bit RGBA integer. The whole
+            frame is cleared to it.
+        FILL -- The fill colour, as a 32-bit RGBA integer.
+        STROKE -- The stroke colour, as a 32-bit RGBA integer, and the
+            stroke width, as a 32-bit float.
+        MATRIX -- Six 32-bit floats (sx, shy, shx, sy, tx, ty), loaded
+            as the path-user-to-surface matrix.
+        PATH -- The paint modes to draw with (a bitmask of values from
+            the PaintModes named tuple), as a byte; the numbers of
+            segments and of coordinates, as 32-bit integers; the segment
+            commands, one byte each; and the coordinates, as 32-bit
+            floats.
+
+    Every scene starts from the same state, whatever the worker drew
+    before: a frame cleared to transparent black, opaque black fill and
+    stroke paints, the default stroke parameters (with a width of 1.0),
+    and the identity matrix.
+
+    Calls can be chained:
+
+        >>> scene = (Scene().clear((255, 255, 255, 255))
+        ...          .fill((255, 0, 0, 255)).path((2, 4, 0), (0, 0, 9, 9)))
+        >>> len(scene.tobytes())
+        39
+
+    '''
+    def __init__(self):
+        self._data = bytearray()
+
+    def _op(self, op, *args):
+        self._data.append(op)
+        self._data += _op_args[op].pack(*args)
+        return self
+
+    def clear(self, color):
+        '''Clear the frame to an (R, G, B, A) colour.'''
+        return self._op(SceneOps.CLEAR, _rgba(color))
+
+    def fill(self, color):
+        '''Set the fill colour.'''
+        return self._op(SceneOps.FILL, _rgba(color))
+
+    def stroke(self, color, width=1.0):
+        '''Set the stroke colour and width.'''
+        return self._op(SceneOps.STROKE, _rgba(color), width)
+
+    def matrix(self, sx=1.0, shy=0.0, shx=0.0, sy=1.0, tx=0.0, ty=0.0):
+        '''Load an affine path-user-to-surface matrix.'''
+        return self._op(SceneOps.MATRIX, sx, shy, shx, sy, tx, ty)
+
+    def path(self, commands, coords, fill=True, stroke=False):
+        '''Draw a path.
+
+        Keyword arguments:
+            commands -- The segment commands of the path.
+            coords -- The coordinates of the path.
+            fill, stroke -- Whether to fill and stroke the path. The
+                default is to fill it only.
+
+        '''
+        modes = (2 if fill else 0) | (1 if stroke else 0)
+        self._op(SceneOps.PATH, modes, len(commands), len(coords))
+        self._data += bytes(commands)
+        self._data += struct.pack('<{}f'.format(len(coords)), *coords)
+        return self
+
+    def tobytes(self):
+        '''Get the scene, ready to send.'''
+        return bytes(self._data)
+
+# The scratch objects of a worker process, reused for every scene.
+_scratch = {}
+
+def draw_scene(scene, width, height):
+    '''Draw a scene, in the binary form of Scene, in the current context.
+
+    This is the drawing function that the server runs in its workers.
+
+    Keyword arguments:
+        scene -- A bytes-like object holding the scene.
+        width, height -- The size of the frame.
+    Raises:
+        ValueError -- If the scene is malformed.
+
+    '''
+    # Imported here, so that only processes that draw need OpenVG.
+    from ctypes import c_float, c_ubyte
+    from . import native
+    from .context import Context, MatrixMode
+    from .matrix import Matrix
+    from .paint import Paint
+    from .path import Path
+    from .stroke import StrokeStyle
+
+    if not _scratch:
+        _scratch.update(path=Path(keep_data=False), fill=Paint(),
+                        stroke=Paint(), stroke_style=StrokeStyle())
+    path, ctx = _scratch['path'], Context()
+
+    # Undo whatever the last scene drawn in this worker changed.
+    for name, set_paint in (('fill', Paint.set_fill),
+                            ('stroke', Paint.set_stroke)):
+        _scratch[name].color = 0x000000FF
+        set_paint(_scratch[name])
+    _scratch['stroke_style'].apply()
+    ctx.load_matrix(Matrix(), MatrixMode.PATH_USER_TO_SURFACE)
+    ctx.clear_color = (0.0, 0.0, 0.0, 0.0)
+    native.vgClear(0, 0, width, height)
+
+    scene = memoryview(scene).cast('B')
+    offset = 0
+    while offset < len(scene):
+        op = scene[offset]
+        try:
+            args = _op_args[op].unpack_from(scene, offset + 1)
+        except (KeyError, struct.error):
+            raise ValueError('malformed scene at byte {}'.format(offset))
+        offset += 1 + _op_args[op].size
+
+        if op == SceneOps.CLEAR:
+            ctx.clear_color = tuple(((args[0] >> shift) & 0xFF) / 255
+                                    for shift in (24, 16, 8, 0))
+            native.vgClear(0, 0, width, height)
+        elif op == SceneOps.FILL:
+            _scratch['fill'].color = args[0]
+        elif op == SceneOps.STROKE:
+            _scratch['stroke'].color = args[0]
+            ctx.stroke_line_width = args[1]
+        elif op == SceneOps.MATRIX:
+            sx, shy, shx, sy, tx, ty = args
+            ctx.load_matrix(Matrix.from_values((sx, shy, 0.0, shx, sy, 0.0,
+                                                tx, ty, 1.0)),
+                            MatrixMode.PATH_USER_TO_SURFACE)
+        else:
+            modes, num_segments, num_coords = args
+            end = offset + num_segments + 4 * num_coords
+            if end > len(scene):
+                raise ValueError('malformed scene at byte {}'.format(offset))
+            path.clear()
+            native.vgAppendPathData(
+                path, num_segments,
+                (c_ubyte * num_segments).from_buffer_copy(scene, offset),
+                (c_float * num_coords).from_buffer_copy(
+                    scene, offset + num_segments))
+            if modes:
+                native.vgDrawPath(path, modes)
+            offset = end
+
+class LatencyMetrics:
+    '''Counts of requests, and their latencies over a recent window.
+
+    Three latencies are kept for each rendered request: how long it
+    waited for room in the queue, how long it took from then until its
+    pixels were ready (including any wait for a free worker), and how
+    long it took in all, until the reply was sent.
+
+    Instance attributes:
+        requests -- The number of frames rendered and sent.
+        errors -- The number that failed.
+        rejected -- The number turned away as busy.
+
+    '''
+    def __init__(self, window=1024):
+        '''Initialise the metrics.
+
+        Keyword arguments:
+            window -- The number of recent requests whose latencies are
+                kept. The default is 1024.
+
+        '''
+        self.requests = self.errors = self.rejected = 0
+        self._latencies = {name: deque(maxlen=window)
+                           for name in ('wait', 'render', 'total')}
+
+    def record(self, wait, render, total):
+        '''Record the latencies of one request, in seconds.'''
+        self.requests += 1
+        for name, value in (('wait', wait), ('render', render),
+                            ('total', total)):
+            self._latencies[name].append(value)
+
+    def summary(self):
+        '''Summarise the metrics, as a dict of JSON-compatible values.
+
+        Latencies are given in milliseconds, as the mean, median, 95th
+        percentile and maximum of each kind.
+
+        '''
+        result = {'requests': self.requests, 'errors': self.errors,
+                  'rejected': self.rejected}
+        for name, values in self._latencies.items():
+            values = sorted(values)
+            if not values:
+                continue
+            result[name + '_ms'] = {
+                'mean': 1000 * sum(values) / len(values),
+                'p50': 1000 * values[len(values) // 2],
+                'p95': 1000 * values[min(len(values) - 1,
+                                         int(len(values) * 0.95))],
+                'max': 1000 * values[-1]}
+        return result
+
+class RenderServer:
+    '''Serves rendering requests over a Unix socket.
+
+    Instance attributes:
+        socket_path -- The path of the Unix socket.
+        farm -- The Farm whose workers render the scenes.
+        queue_size -- The most requests that may be in progress at once.
+        reject -- Whether to answer requests beyond queue_size as busy,
+            rather than wait for room.
+        max_request -- The largest payload, in bytes, that a request may
+            have. Larger requests are answered with an error, and the
+            connection closed, without reading the payload.
+        metrics -- The server's LatencyMetrics.
+
+    '''
+    def __init__(self, socket_path, width, height, workers=None,
+                 queue_size=None, reject=False, max_request=16 * 2 ** 20,
+                 backend=EGLPbufferBackend, mp_context=None):
+        '''Start the worker processes, but not yet the server.
+
+        Keyword arguments:
+            socket_path, queue_size, reject, max_request -- As the
+                instance attributes. The default queue size is twice the
+                number of workers, and the default largest request is
+                16 MiB.
+            width, height -- The size of the workers' surfaces, and the
+                largest frame that may be requested.
+            workers, backend, mp_context -- As for Farm.
+
+        '''
+        self.socket_path, self.reject = socket_path, reject
+        self.max_request = max_request
+        workers = (os.cpu_count() or 1) if workers is None else workers
+        self.queue_size = 2 * workers if queue_size is None else queue_size
+        # One shared memory block per request in progress, so that
+        # submitting to the farm never blocks the event loop.
+        self.farm = Farm(width, height, workers, backend,
+                         slots=self.queue_size, mp_context=mp_context)
+        self.metrics = LatencyMetrics()
+        self._room = None
+        self._server = None
+        self._clients = set()
+
+    async def start(self):
+        '''Start listening on the socket.'''
+        self._room = asyncio.Semaphore(self.queue_size)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._connected,
+                                                       self.socket_path)
+
+    async def serve_forever(self):
+        '''Start the server, if need be, and serve until cancelled.'''
+        if self._server is None:
+            await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        '''Stop listening, drop every client, and stop the workers.'''
+        for task in self._clients:
+            task.cancel()
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+        self.farm.close()
+
+    def _connected(self, reader, writer):
+        '''Start serving a new client, in a task that close() can cancel.'''
+        task = asyncio.ensure_future(self._serve(reader, writer))
+        self._clients.add(task)
+        task.add_done_callback(self._clients.discard)
+
+    async def _serve(self, reader, writer):
+        '''Answer the requests of one client, one at a time.'''
+        # Let drain() wait until every byte is sent, so that frames are
+        # not released while the transport still refers to them.
+        writer.transport.set_write_buffer_limits(0)
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(_request_header.size)
+                except asyncio.IncompleteReadError:
+                    break
+                magic, kind, width, height, length = \
+                    _request_header.unpack(header)
+                if magic != MAGIC:
+                    break
+                if length > self.max_request:
+                    self.metrics.errors += 1
+                    await self._reply(writer, ReplyStatus.ERROR, width,
+                                      height, 'request of {} bytes is larger '
+                                      'than the limit of {}'.format(
+                                          length, self.max_request).encode())
+                    break
+                payload = await reader.readexactly(length)
+                if kind == RequestTypes.STATS:
+                    await self._reply(writer, ReplyStatus.OK, 0, 0,
+                                      json.dumps(self.metrics.summary()
+                                                 ).encode())
+                else:
+                    await self._render(writer, width, height, payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            # The client has gone.
+            pass
+        finally:
+            writer.close()
+
+    async def _reply(self, writer, status, width, height, payload,
+                     wait=0.0, render=0.0):
+        '''Send one reply.'''
+        writer.write(_reply_header.pack(MAGIC, status, width, height,
+                                        len(payload), int(wait * 1e6),
+                                        int(render * 1e6)))
+        writer.write(payload)
+        await writer.drain()
+
+    async def _render(self, writer, width, height, scene):
+        '''Render one scene, and send back its pixels.'''
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        if self.reject and self._room.locked():
+            self.metrics.rejected += 1
+            await self._reply(writer, ReplyStatus.BUSY, width, height, b'')
+            return
+
+        async with self._room:
+            queued = loop.time()
+            try:
+                frame = await asyncio.wrap_future(
+                    self.farm.submit(draw_scene, scene, width, height,
+                                     width=width, height=height))
+            except Exception as exc:
+                self.metrics.errors += 1
+                await self._reply(writer, ReplyStatus.ERROR, width, height,
+                                  str(exc).encode(), queued - start,
+                                  loop.time() - queued)
+                return
+            with frame:
+                rendered = loop.time()
+                await self._reply(writer, ReplyStatus.OK, width, height,
+                                  frame.pixels, queued - start,
+                                  rendered - queued)
+        self.metrics.record(queued - start, rendered - queued,
+                            loop.time() - start)
+
+def _recv_exactly(sock, size):
+    '''Receive a given number of bytes from a socket.'''
+    data = bytearray(size)
+    view, received = memoryview(data), 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if not count:
+            raise ConnectionError('server closed the connection')
+        received += count
+    return data
+
+def request(sock, scene=b'', width=0, height=0, kind=RequestTypes.RENDER):
+    '''Send a request to a render server, and wait for the reply.
+
+    Keyword arguments:
+        sock -- A connected socket, or the path of the server's socket
+            (in which case a new connection is made for this request).
+        scene -- The Scene to render, or its bytes.
+        width, height -- The size of the frame to render.
+        kind -- A value from the RequestTypes named tuple. The default
+            is RENDER.
+    Returns:
+        A Reply named tuple.
+
+    '''
+    if isinstance(sock, (str, bytes, os.PathLike)):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.connect(sock)
+            return request(conn, scene, width, height, kind)
+    if isinstance(scene, Scene):
+        scene = scene.tobytes()
+    sock.sendall(_request_header.pack(MAGIC, kind, width, height,
+                                      len(scene)))
+    sock.sendall(scene)
+    magic, status, width, height, length, wait, render = \
+        _reply_header.unpack(_recv_exactly(sock, _reply_header.size))
+    if magic != MAGIC:
+        raise ValueError('not a reply from a render server')
+    return Reply(status, width, height, _recv_exactly(sock, length), wait,
+                 render)
+
+def _size(text):
+    '''Parse a WIDTHxHEIGHT argument.'''
+    width, _, height = text.lower().partition('x')
+    return int(width), int(height or width)
+
+def main(argv=None):
+    '''Run the render server from the command line.'''
+    parser = argparse.ArgumentParser(prog='python -m povg.server',
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument('socket', help='path of the Unix socket to listen on')
+    parser.add_argument('--size', type=_size, default=(1024, 1024),
+                        metavar='WxH',
+                        help='largest frame size (default: 1024x1024)')
+    parser.add_argument('--workers', type=int,
+                        help='number of worker processes (default: one per '
+                        'CPU)')
+    parser.add_argument('--queue', type=int,
+                        help='most requests in progress at once (default: '
+                        'twice the number of workers)')
+    parser.add_argument('--reject', action='store_true',
+                        help='answer requests beyond the queue as busy, '
+                        'instead of waiting for room')
+    parser.add_argument('--max-request', type=int, default=16 * 2 ** 20,
+                        metavar='BYTES',
+                        help='largest scene accepted, in bytes (default: '
+                        '16 MiB)')
+    args = parser.parse_args(argv)
+
+    server = RenderServer(args.socket, *args.size, workers=args.workers,
+                          queue_size=args.queue, reject=args.reject,
+                          max_request=args.max_request)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
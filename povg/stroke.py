@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+'''Stroke styles for OpenVG paths.
+
+A stroke is described by seven context parameters. This module bundles
+them into a single object that can be prepared once and then made
+current as often as needed, at the cost of only those parameters that
+differ from the stroke style already in effect.
+
+'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+__all__ = ['StrokeStyle']
+
+# Standard library imports.
+from collections import namedtuple
+from ctypes import c_float
+
+# Local imports.
+from . import native
+from .context import CapStyle, Context, JoinStyle, _params
+
+class StrokeStyle(namedtuple('StrokeStyle_base',
+                             ('width', 'cap', 'join', 'miter_limit',
+                              'dash_pattern', 'dash_phase',
+                              'dash_phase_reset'))):
+    '''An immutable set of stroke parameters.
+
+    The defaults are those of a new OpenVG context. The dash pattern is
+    checked just once, when the style is created (including by
+    _replace()), and converted to a native array the first time the
+    style is applied.
+
+    Instance attributes:
+        width -- The stroke width.
+        cap -- The end cap style, from the CapStyle named tuple.
+        join -- The line join style, from the JoinStyle named tuple.
+        miter_limit -- The miter length limit.
+        dash_pattern -- A tuple of alternating "on" and "off" dash
+            lengths. An empty tuple (the default) disables dashing.
+        dash_phase -- The offset into the dash pattern at which to
+            begin.
+        dash_phase_reset -- Whether or not the dash pattern restarts at
+            each subpath.
+
+    '''
+    # The context parameters for all but the dash pattern.
+    _param_names = {'width': 'STROKE_LINE_WIDTH',
+                    'cap': 'STROKE_CAP_STYLE',
+                    'join': 'STROKE_JOIN_STYLE',
+                    'miter_limit': 'STROKE_MITER_LIMIT',
+                    'dash_phase': 'STROKE_DASH_PHASE',
+                    'dash_phase_reset': 'STROKE_DASH_PHASE_RESET'}
+
+    def __new__(cls, width=1.0, cap=CapStyle.BUTT, join=JoinStyle.MITER,
+                miter_limit=4.0, dash_pattern=(), dash_phase=0.0,
+                dash_phase_reset=False, max_dash_count=None):
+        '''Create the style.
+
+        Keyword arguments:
+            width, cap, join, miter_limit, dash_pattern, dash_phase,
+                dash_phase_reset -- As the instance attributes.
+            max_dash_count -- The maximum dash pattern length to allow.
+                If omitted, the limit of the current context is used.
+        Raises:
+            ValueError -- If the dash pattern is of odd length, is
+                longer than the limit, or has negative lengths in it.
+
+        '''
+        dash_pattern = tuple(c_float(length).value for length in dash_pattern)
+        if len(dash_pattern) % 2:
+            raise ValueError('dash pattern must be of even length')
+        if any(length < 0 for length in dash_pattern):
+            raise ValueError('dash lengths must not be negative')
+        if dash_pattern:
+            if max_dash_count is None:
+                max_dash_count = Context().max_dash_count
+            if len(dash_pattern) > max_dash_count:
+                raise ValueError('dash pattern longer than the maximum of '
+                                 '{}'.format(max_dash_count))
+
+        return super().__new__(cls, c_float(width).value, cap, join,
+                               c_float(miter_limit).value, dash_pattern,
+                               c_float(dash_phase).value,
+                               bool(dash_phase_reset))
+
+    @classmethod
+    def _make(cls, iterable):
+        '''Create a style from a sequence of its parameters.'''
+        return cls(*iterable)
+
+    def _replace(self, **kwargs):
+        '''Create a copy of this style with some parameters changed.
+
+        The new parameters are checked as when creating a style, and a
+        max_dash_count argument may likewise be given.
+
+        '''
+        values = self._asdict()
+        values.update(kwargs)
+        return type(self)(**values)
+
+    def _set(self, name):
+        '''Set one parameter of this style on the current context.'''
+        if name == 'dash_pattern':
+            array = self.__dict__.get('_dash_array')
+            if array is None:
+                array = (c_float * len(self.dash_pattern))(*self.dash_pattern)
+                self._dash_array = array
+            native.vgSetfv(_params['STROKE_DASH_PATTERN'],
+                           len(self.dash_pattern), array)
+        elif name in ('width', 'miter_limit', 'dash_phase'):
+            native.vgSetf(_params[self._param_names[name]],
+                          getattr(self, name))
+        else:
+            native.vgSeti(_params[self._param_names[name]],
+                          int(getattr(self, name)))
+
+    def apply(self):
+        '''Make this the stroke style of the current context.
+
+        Only the parameters that differ from the stroke style last
+        applied are set. If any stroke parameter has been set some other
+        way since then, all of them are set.
+
+        '''
+        record = native.current_state()
+        last = record.stroke_style
+        if last == self:
+            return
+        for name, value in zip(self._fields, self):
+            if last is None or getattr(last, name) != value:
+                self._set(name)
+        # Setting the parameters forgets the last style, so record it now.
+        record.stroke_style = self
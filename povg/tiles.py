@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+
+'''Rendering images larger than a surface, one tile at a time.
+
+Posters and print exports may be far larger than any surface or image
+OpenVG allows. This module splits such an image into tiles that fit,
+renders each one with the scene shifted so that the tile lies at the
+surface origin, and passes the tiles on (or writes them into place in a
+file) as they are finished. The whole image is never held in memory.
+
+'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+__all__ = ['Tile', 'tile_grid', 'TiledRenderer']
+
+# Standard library imports.
+from collections import namedtuple
+import mmap
+
+Tile = namedtuple('Tile', ('x', 'y', 'width', 'height'))
+
+def tile_grid(width, height, tile_width, tile_height):
+    '''Split an image into tiles of at most a given size.
+
+    The tiles are in rows, from the bottom row up (as OpenVG numbers
+    them), and from left to right within each row.
+
+        >>> tile_grid(5, 3, 2, 2)  # doctest: +NORMALIZE_WHITESPACE
+        [Tile(x=0, y=0, width=2, height=2), Tile(x=2, y=0, width=2, height=2),
+         Tile(x=4, y=0, width=1, height=2), Tile(x=0, y=2, width=2, height=1),
+         Tile(x=2, y=2, width=2, height=1), Tile(x=4, y=2, width=1, height=1)]
+
+    Keyword arguments:
+        width, height -- The size of the image, in pixels.
+        tile_width, tile_height -- The largest size of a tile.
+    Returns:
+        A list of Tile named tuples.
+
+    '''
+    return [Tile(x, y, min(tile_width, width - x),
+                 min(tile_height, height - y))
+            for y in range(0, height, tile_height)
+            for x in range(0, width, tile_width)]
+
+def _draw_tile(draw, args, x, y, width, height, clear_color):
+    '''Draw one tile of a scene in the current context.
+
+    The matrices and settings changed for the tile are restored
+    afterwards, so the context is left as it was found.
+
+    '''
+    # Imported here, so that only processes that draw need OpenVG.
+    from . import native
+    from .context import Context, MatrixMode, StateBlock
+    from .matrix import Matrix
+
+    ctx = Context()
+    shift = Matrix()
+    shift.translate(tx=-x, ty=-y)
+    modes = (MatrixMode.PATH_USER_TO_SURFACE,
+             MatrixMode.IMAGE_USER_TO_SURFACE,
+             MatrixMode.GLYPH_USER_TO_SURFACE)
+    for mode in modes:
+        ctx.push_matrix(mode)
+    try:
+        for mode in modes:
+            ctx.load_matrix(shift, mode)
+        with ctx.state(StateBlock(scissoring=True,
+                                  scissor_rects=((0, 0, width, height),),
+                                  clear_color=clear_color)):
+            if clear_color is not None:
+                native.vgClear(0, 0, width, height)
+            draw(*args)
+    finally:
+        for mode in modes:
+            ctx.pop_matrix(mode)
+
+class TiledRenderer:
+    '''Renders an image of any size in tiles.
+
+    Each tile is drawn by calling a drawing function with the user-to-
+    surface matrices (for paths, images and glyphs) translated so that
+    the tile lies at the surface origin, and with scissoring limited to
+    the tile. The drawing function must therefore build on those
+    matrices (with Context.mult_matrix() or Context.transform(), say)
+    rather than replace them.
+
+    Tiles are rendered in parallel by a farm.Farm of worker processes,
+    if one is given, or else one after another in the current context.
+
+    Instance attributes:
+        width, height -- The size of the whole image, in pixels.
+        tile_width, tile_height -- The largest size of a tile.
+        farm -- The farm.Farm to render tiles in, or None.
+
+    '''
+    def __init__(self, width, height, tile_width=None, tile_height=None,
+                 farm=None):
+        '''Initialise the renderer.
+
+        Keyword arguments:
+            width, height, farm -- As the instance attributes.
+            tile_width, tile_height -- As the instance attributes. With
+                a farm, the defaults are the size of its surfaces.
+                Without one, they must be given, and be no larger than
+                the surface of the current context.
+        Raises:
+            ValueError -- If the tile size is not given and there is
+                no farm, or if it is larger than the farm surfaces.
+
+        '''
+        self.width, self.height, self.farm = width, height, farm
+        if tile_width is None or tile_height is None:
+            if farm is None:
+                raise ValueError('the tile size must be given when there '
+                                 'is no farm')
+            tile_width = tile_width or farm.width
+            tile_height = tile_height or farm.height
+        if farm is not None and (tile_width > farm.width or
+                                 tile_height > farm.height):
+            raise ValueError('tiles are larger than the farm surfaces')
+        self.tile_width, self.tile_height = tile_width, tile_height
+
+    @property
+    def tiles(self):
+        '''The tiles of the image, as from tile_grid().'''
+        return tile_grid(self.width, self.height, self.tile_width,
+                         self.tile_height)
+
+    def render(self, draw, *args, clear_color=(0.0, 0.0, 0.0, 0.0)):
+        '''Render the image, streaming each tile as it is finished.
+
+        Keyword arguments:
+            draw -- The function that draws the scene. With a farm, it
+                must be picklable (and so defined at the top level of a
+                module).
+            clear_color -- The (R, G, B, A) colour to clear each tile to
+                first, or None to not clear tiles. The default is
+                transparent black.
+            Any others are passed on to the drawing function, and must
+            also be picklable if there is a farm.
+        Yields:
+            2-tuples of a Tile and a buffer of its RGBA pixels, row by
+            row from the bottom row up. The buffer is only valid until
+            the next tile is taken.
+
+        '''
+        tiles = self.tiles
+        if self.farm is not None:
+            jobs = ((_draw_tile, (draw, args) + tile + (clear_color,),
+                     tile.width, tile.height) for tile in tiles)
+            for tile, frame in zip(tiles, self.farm.stream(jobs)):
+                yield tile, frame.pixels
+            return
+
+        from .render import read_pixels
+        buffer = bytearray(self.tile_width * self.tile_height * 4)
+        view = memoryview(buffer)
+        for tile in tiles:
+            _draw_tile(draw, args, *tile, clear_color=clear_color)
+            size = tile.width * tile.height * 4
+            read_pixels(0, 0, tile.width, tile.height, into=view[:size])
+            yield tile, view[:size]
+
+    def render_into(self, target, draw, *args, **kwargs):
+        '''Render the image into a buffer, one tile at a time.
+
+        Keyword arguments:
+            target -- A writable buffer of width × height × 4 bytes, such
+                as an mmap. The image is written to it row by row from
+                the top row down, as most image formats expect.
+            draw -- As for render().
+            Any others are passed on to render().
+
+        '''
+        target = memoryview(target)
+        if len(target) < self.width * self.height * 4:
+            raise ValueError('target buffer is too small')
+        stride = self.width * 4
+        for tile, pixels in self.render(draw, *args, **kwargs):
+            row_bytes = tile.width * 4
+            for row in range(tile.height):
+                # Rows come bottom-up, but go into the target top-down.
+                start = ((self.height - 1 - tile.y - row) * stride +
+                         tile.x * 4)
+                target[start:start + row_bytes] = pixels[row * row_bytes:
+                                                         (row + 1) *
+                                                         row_bytes]
+
+    def render_to_file(self, filename, draw, *args, **kwargs):
+        '''Render the image into a file of raw RGBA pixels.
+
+        The file is mapped into memory and written tile by tile, so only
+        the pages being written need be in memory at once.
+
+        Keyword arguments:
+            filename -- The path of the file to create (or overwrite).
+            draw -- As for render().
+            Any others are passed on to render().
+
+        '''
+        size = self.width * self.height * 4
+        with open(filename, 'w+b') as f:
+            f.truncate(size)
+            with mmap.mmap(f.fileno(), size) as target:
+                self.render_into(target, draw, *args, **kwargs)
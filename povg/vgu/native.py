@@ -29,7 +29,8 @@ from ctypes import c_float, c_int
 # Local imports.
 from . import vgu_error_codes
 from .. import OpenVGError
-from ..native import vg, c_enum, c_handle, c_ibool, c_float_p
+from ..native import (vg, c_enum, c_handle, c_ibool, c_float_p,
+                      modifies_path)
 
 ############## 17 (VGU) #############
 
@@ -57,21 +58,21 @@ def vgu_error_check(fn):
 vg.vguLine.argtypes = (c_handle, c_float, c_float, c_float, c_float)
 vg.vguLine.restype = c_enum
 # Errors: BadHandleError, PathCapabilityError
-vguLine = vgu_error_check(vg.vguLine)
+vguLine = modifies_path(vgu_error_check(vg.vguLine))
 
 # VGUErrorCode vguPolygon(VGPath path, const VGfloat * points, VGint count,
 #                         VGboolean closed)
 vg.vguPolygon.argtypes = (c_handle, c_float_p, c_int, c_ibool)
 vg.vguPolygon.restype = c_enum
 # Errors: BadHandleError, PathCapabilityError, IllegalArgumentError
-vguPolygon = vgu_error_check(vg.vguPolygon)
+vguPolygon = modifies_path(vgu_error_check(vg.vguPolygon))
 
 # VGUErrorCode vguRect(VGPath path, VGfloat x, VGfloat y,
 #                      VGfloat width, VGfloat height)
 vg.vguRect.argtypes = (c_handle, c_float, c_float, c_float, c_float)
 vg.vguRect.restype = c_enum
 # Errors: BadHandleError, PathCapabilityError, IllegalArgumentError
-vguRect = vgu_error_check(vg.vguRect)
+vguRect = modifies_path(vgu_error_check(vg.vguRect))
 
 # VGUErrorCode vguRoundRect(VGPath path, VGfloat x, VGfloat y,
 #                           VGfloat width, VGfloat height,
@@ -80,14 +81,14 @@ vg.vguRoundRect.argtypes = (c_handle, c_float, c_float, c_float, c_float,
                             c_float, c_float)
 vg.vguRoundRect.restype = c_enum
 # Errors: BadHandleError, PathCapabilityError, IllegalArgumentError
-vguRoundRect = vgu_error_check(vg.vguRoundRect)
+vguRoundRect = modifies_path(vgu_error_check(vg.vguRoundRect))
 
 # VGUErrorCode vguEllipse(VGPath path, VGfloat cx, VGfloat cy,
 #                         VGfloat width, VGfloat height)
 vg.vguEllipse.argtypes = (c_handle, c_float, c_float, c_float, c_float)
 vg.vguEllipse.restype = c_enum
 # Errors: BadHandleError, PathCapabilityError, IllegalArgumentError
-vguEllipse = vgu_error_check(vg.vguEllipse)
+vguEllipse = modifies_path(vgu_error_check(vg.vguEllipse))
 
 # VGUErrorCode vguArc(VGPath path, VGfloat x, VGfloat y,
 #                     VGfloat width, VGfloat height,
@@ -97,7 +98,7 @@ vg.vguArc.argtypes = (c_handle, c_float, c_float, c_float, c_float, c_float,
                    c_float, c_enum)
 vg.vguArc.restype = c_enum
 # Errors: BadHandleError, PathCapabilityError, IllegalArgumentError
-vguArc = vgu_error_check(vg.vguArc)
+vguArc = modifies_path(vgu_error_check(vg.vguArc))
 
 ################ 17.2 ###############
 
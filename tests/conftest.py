@@ -0,0 +1,39 @@
+'''Test configuration: run Povg against the fake OpenVG library.
+
+The two scripts test_povg.py and test_povg_pegl.py need a real OpenVG
+implementation (and, for the latter, an X display), and are run by hand
+rather than collected.
+
+'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+# Third-party imports.
+import pytest
+
+# Local imports. The fake library must be in place before Povg loads.
+import fakevg
+from povg import native
+
+collect_ignore = ['test_povg.py', 'test_povg_pegl.py']
+
+@pytest.fixture(autouse=True)
+def vg():
+    '''Start each test with a fresh fake library and state record.'''
+    fakevg.reset()
+    native.set_state()
+    return fakevg
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+
+'''A stand-in for the native OpenVG library, for testing without one.
+
+Importing this module makes ctypes load it in place of any library with
+"OpenVG" in its name, so it must be imported before Povg is. It keeps
+just enough state to answer Povg's queries (context parameters, the
+current matrices, path parameters and data, and images), and counts and
+logs every call made, so that tests can check what was sent to OpenVG as
+well as what came back.
+
+'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+# Standard library imports.
+from collections import Counter
+import ctypes
+from math import cos, radians, sin
+
+# The number of coordinates taken by each segment type.
+_coord_counts = (0, 2, 2, 1, 1, 4, 6, 2, 4, 5, 5, 5, 5)
+
+IDENTITY = (1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0)
+
+def _f32(value):
+    return ctypes.c_float(value).value
+
+def _multiply(a, b):
+    '''Multiply two matrices, each as nine values in OpenVG order.'''
+    return tuple(_f32(sum(a[k * 3 + row] * b[col * 3 + k] for k in range(3)))
+                 for col in range(3) for row in range(3))
+
+class State:
+    '''Everything the fake library knows.
+
+    Instance attributes:
+        params -- A dict mapping context parameter types to values (a
+            tuple, for vector parameters).
+        matrices -- A dict mapping matrix modes to nine values.
+        paths -- A dict mapping path handles to dicts of their datatype,
+            scale, bias, segment commands and coordinates.
+        paints -- A dict mapping paint handles to their colours.
+        draws -- A list of (path handle, paint modes, matrix) 3-tuples,
+            one for each vgDrawPath() call.
+        clears -- A list of (x, y, width, height, clear colour) 5-tuples,
+            one for each vgClear() call.
+        images -- A dict mapping image handles to dicts of their format,
+            size and pixels.
+        accelerated -- A set of (query type, setting) 2-tuples for which
+            vgHardwareQuery() reports hardware acceleration.
+
+    '''
+    def __init__(self):
+        self.params = {0x1100: 0x1400, 0x1101: 0x1900, 0x1106: (),
+                       0x1110: 1.0, 0x1111: 0x1700, 0x1112: 0x1800,
+                       0x1113: 4.0, 0x1114: (), 0x1115: 0.0, 0x1116: 0,
+                       0x1120: (0.0, 0.0, 0.0, 0.0),
+                       0x1121: (0.0, 0.0, 0.0, 0.0), 0x1130: 0, 0x1131: 0,
+                       0x1170: 0, 0x1171: (1.0,) * 4 + (0.0,) * 4,
+                       0x1160: 32, 0x1161: 16, 0x1162: 7, 0x1163: 15,
+                       0x1164: 32, 0x1165: 2048, 0x1166: 2048,
+                       0x1167: 2 ** 22, 0x1168: 2 ** 24, 0x1169: 1e10,
+                       0x116A: 16.0}
+        self.matrices = {mode: IDENTITY for mode in range(0x1400, 0x1405)}
+        self.paths, self.paints, self.images = {}, {}, {}
+        self.draws, self.clears = [], []
+        self.accelerated = set()
+        self.next_handle = 1
+
+    def matrix(self):
+        return self.matrices[self.params[0x1100]]
+
+    def set_matrix(self, values):
+        self.matrices[self.params[0x1100]] = tuple(map(_f32, values))
+
+state = State()
+calls = Counter()
+# Every call but vgGetError(), as (name, arguments) 2-tuples. Arrays passed
+# in are logged as tuples of their values at the time.
+log = []
+
+def reset():
+    '''Forget all state and calls, as if the library were just loaded.'''
+    global state
+    state = State()
+    calls.clear()
+    del log[:]
+
+def _handle():
+    handle, state.next_handle = state.next_handle, state.next_handle + 1
+    return handle
+
+# The fake native functions.
+class _Functions:
+    def vgGetError():
+        return 0
+
+    def vgSeti(param, value):
+        state.params[param] = int(value)
+
+    def vgSetf(param, value):
+        state.params[param] = _f32(value)
+
+    def vgSetiv(param, count, values):
+        state.params[param] = tuple(int(values[n]) for n in range(count))
+
+    def vgSetfv(param, count, values):
+        state.params[param] = tuple(_f32(values[n]) for n in range(count))
+
+    def vgGeti(param):
+        return int(state.params.get(param, 0))
+
+    def vgGetf(param):
+        return float(state.params.get(param, 0))
+
+    def vgGetVectorSize(param):
+        value = state.params.get(param, ())
+        return len(value) if isinstance(value, tuple) else 1
+
+    def vgGetfv(param, count, values):
+        value = state.params.get(param, ())
+        for n in range(count):
+            values[n] = value[n]
+
+    vgGetiv = vgGetfv
+
+    def vgLoadIdentity():
+        state.set_matrix(IDENTITY)
+
+    def vgLoadMatrix(m):
+        state.set_matrix([m[n] for n in range(9)])
+
+    def vgGetMatrix(m):
+        for n, value in enumerate(state.matrix()):
+            m[n] = value
+
+    def vgMultMatrix(m):
+        state.set_matrix(_multiply(state.matrix(), [m[n] for n in range(9)]))
+
+    def vgTranslate(tx, ty):
+        state.set_matrix(_multiply(state.matrix(), (1, 0, 0, 0, 1, 0,
+                                                    tx, ty, 1)))
+
+    def vgScale(sx, sy):
+        state.set_matrix(_multiply(state.matrix(), (sx, 0, 0, 0, sy, 0,
+                                                    0, 0, 1)))
+
+    def vgShear(shx, shy):
+        state.set_matrix(_multiply(state.matrix(), (1, shy, 0, shx, 1, 0,
+                                                    0, 0, 1)))
+
+    def vgRotate(angle):
+        c, s = cos(radians(angle)), sin(radians(angle))
+        state.set_matrix(_multiply(state.matrix(), (c, s, 0, -s, c, 0,
+                                                    0, 0, 1)))
+
+    def vgCreatePath(path_format, datatype, scale, bias, segment_hint,
+                     coord_hint, capabilities):
+        handle = _handle()
+        state.paths[handle] = {'datatype': datatype, 'scale': _f32(scale),
+                               'bias': _f32(bias), 'commands': [],
+                               'coords': []}
+        return handle
+
+    def vgDestroyPath(handle):
+        state.paths.pop(handle, None)
+
+    def vgClearPath(handle, capabilities):
+        state.paths[handle]['commands'] = []
+        state.paths[handle]['coords'] = []
+
+    def vgGetParameteri(handle, param):
+        path = state.paths.get(handle, {})
+        return {0x1601: path.get('datatype', 0),
+                0x1604: len(path.get('commands', ())),
+                0x1605: len(path.get('coords', ()))}.get(param, 0)
+
+    def vgGetParameterf(handle, param):
+        path = state.paths.get(handle, {})
+        return {0x1602: path.get('scale', 1.0),
+                0x1603: path.get('bias', 0.0)}.get(param, 0.0)
+
+    def vgGetPathCapabilities(handle):
+        return 0xFFF
+
+    def vgAppendPathData(handle, count, commands, data):
+        path = state.paths[handle]
+        commands = [commands[n] for n in range(count)]
+        total = sum(_coord_counts[command >> 1] for command in commands)
+        path['commands'].extend(commands)
+        path['coords'].extend(data[n] for n in range(total))
+
+    def vgModifyPathCoords(handle, start, count, data):
+        path = state.paths[handle]
+        first = sum(_coord_counts[command >> 1]
+                    for command in path['commands'][:start])
+        total = sum(_coord_counts[command >> 1]
+                    for command in path['commands'][start:start + count])
+        path['coords'][first:first + total] = [data[n] for n in range(total)]
+
+    def vgDrawPath(handle, modes):
+        state.draws.append((handle, modes, state.matrices[0x1400]))
+
+    def vgClear(x, y, width, height):
+        state.clears.append((x, y, width, height, state.params[0x1121]))
+
+    def vgReadPixels(data, stride, image_format, sx, sy, width, height):
+        # Every pixel reads back as the number of paths drawn so far.
+        for row in range(height):
+            for n in range(row * stride, row * stride + width * 4):
+                data[n] = len(state.draws) & 0xFF
+
+    def vgCreatePaint():
+        handle = _handle()
+        state.paints[handle] = 0x000000FF
+        return handle
+
+    def vgSetColor(handle, rgba):
+        state.paints[handle] = rgba
+
+    def vgGetColor(handle):
+        return state.paints[handle]
+
+    def vgGetString(name):
+        return {0x2300: b'Povg', 0x2301: b'Fake', 0x2302: b'1.1',
+                0x2303: b''}.get(name, b'')
+
+    def vgCreateImage(image_format, width, height, quality):
+        handle = _handle()
+        state.images[handle] = {'format': image_format, 'width': width,
+                                'height': height, 'pixels': b''}
+        return handle
+
+    def vgDestroyImage(handle):
+        state.images.pop(handle, None)
+
+    def vgImageSubData(handle, data, stride, image_format, x, y, width,
+                       height):
+        state.images[handle]['pixels'] = bytes(data)[:stride * height]
+
+    def vgHardwareQuery(query_type, setting):
+        return 0x2200 if (query_type, setting) in state.accelerated else 0x2201
+
+def _plain(arg):
+    '''Get a plain Python value from a ctypes argument, where it has one.'''
+    arg = getattr(arg, '_as_parameter_', arg)
+    if isinstance(arg, ctypes._SimpleCData):
+        return arg.value
+    return arg
+
+class _Function:
+    '''One fake native function, as got from the fake library.'''
+    def __init__(self, name):
+        self.name = name
+        self.argtypes = self.restype = self.errcheck = None
+
+    def __call__(self, *args):
+        calls[self.name] += 1
+        args = tuple(map(_plain, args))
+        if self.name != 'vgGetError':
+            log.append((self.name, tuple(tuple(arg) if isinstance(
+                arg, ctypes.Array) else arg for arg in args)))
+        fn = getattr(_Functions, self.name, None)
+        return 0 if fn is None else fn(*args)
+
+class _Library:
+    '''The fake library. Functions it does nothing for return 0.'''
+    def __init__(self, name):
+        self._name = name
+        self._functions = {}
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self._functions[name]
+        except KeyError:
+            fn = self._functions[name] = _Function(name)
+            return fn
+
+_real_cdll = ctypes.CDLL
+
+def _cdll(name, *args, **kwargs):
+    if name is not None and 'OpenVG' in name:
+        return _Library(name)
+    return _real_cdll(name, *args, **kwargs)
+
+ctypes.CDLL = _cdll
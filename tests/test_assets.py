@@ -0,0 +1,133 @@
+'''Tests of asset stores in shared memory.'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+# Standard library imports.
+from multiprocessing import shared_memory
+import pickle
+
+# Third-party imports.
+import pytest
+
+# Local imports.
+from povg.assets import AssetKinds, AssetStore
+from povg.params import ImageFormats, PathDatatypes
+from povg.path import Path
+
+# A triangle: MOVE_TO, LINE_TO, LINE_TO, CLOSE_PATH.
+COMMANDS = [2, 4, 4, 0]
+COORDS = [0.0, 0.0, 10.0, 0.0, 5.0, 7.5]
+PIXELS = bytes(range(4 * 3)) * 2
+FLOAT = PathDatatypes.F
+
+@pytest.fixture
+def store():
+    with AssetStore(segment_size=256) as store:
+        yield store
+
+class TestAssetStore:
+    def test_add_path(self, vg, store):
+        store.add_path('triangle', (COMMANDS, COORDS), datatype=FLOAT)
+        store.add_path('small', (COMMANDS, [0, 0, 1, 0, 1, 1]),
+                       datatype=PathDatatypes.S_8, scale=0.5)
+        assert 'triangle' in store and len(store) == 2
+        asset = store['small']
+        assert asset.kind == AssetKinds.PATH
+        assert asset.details[1:] == (PathDatatypes.S_8, 0.5, 0.0, 4)
+        # Small assets share one segment.
+        assert asset.segment == store['triangle'].segment
+        with store.buffer('small') as buffer:
+            assert bytes(buffer[:4]) == bytes(COMMANDS)
+            assert bytes(buffer[8:14]) == bytes((0, 0, 1, 0, 1, 1))
+
+    def test_path_uploaded_once(self, vg, store):
+        store.add_path('triangle', (COMMANDS, COORDS), datatype=FLOAT)
+        path = store.path('triangle')
+        assert store.path('triangle') is path
+        assert vg.calls['vgAppendPathData'] == 1
+        uploaded = vg.state.paths[path._as_parameter_]
+        assert uploaded['commands'] == COMMANDS
+        assert uploaded['coords'] == COORDS
+        assert uploaded['datatype'] == PathDatatypes.F
+
+    def test_path_object(self, vg, store):
+        source = Path(datatype=PathDatatypes.S_16, scale=0.25, keep_data=True)
+        source.append_data(COMMANDS, [0, 0, 40, 0, 20, 30])
+        store.add_path('triangle', source)
+        assert store['triangle'].details[1:3] == (PathDatatypes.S_16, 0.25)
+        copy = store.path('triangle')
+        assert (vg.state.paths[copy._as_parameter_]['coords'] ==
+                [0, 0, 40, 0, 20, 30])
+
+    def test_add_image(self, vg, store):
+        store.add_image('tile', PIXELS, 3, 2)
+        handle = store.image('tile')
+        assert store.image('tile') == handle
+        assert vg.calls['vgCreateImage'] == 1
+        image = vg.state.images[handle]
+        assert (image['format'], image['width'], image['height']) == (
+            ImageFormats.sRGBA_8888, 3, 2)
+        assert image['pixels'] == PIXELS
+        with pytest.raises(ValueError):
+            store.add_image('short', PIXELS, 3, 3)
+
+    def test_large_asset_has_own_segment(self, vg, store):
+        store.add_image('small', PIXELS, 3, 2)
+        store.add_image('large', bytes(400), 10, 10)
+        store.add_image('next', PIXELS, 3, 2)
+        segments = [store[name].segment for name in ('small', 'large',
+                                                     'next')]
+        assert segments[0] == segments[2] != segments[1]
+
+    def test_duplicate_name(self, vg, store):
+        store.add_path('shape', (COMMANDS, COORDS), datatype=FLOAT)
+        with pytest.raises(ValueError):
+            store.add_path('shape', (COMMANDS, COORDS), datatype=FLOAT)
+        with pytest.raises(ValueError):
+            store.add_image('shape', PIXELS, 3, 2)
+
+    def test_wrong_kind(self, vg, store):
+        store.add_image('tile', PIXELS, 3, 2)
+        with pytest.raises(TypeError):
+            store.path('tile')
+
+    def test_pickled_copy(self, vg, store):
+        store.add_path('triangle', (COMMANDS, COORDS), datatype=FLOAT)
+        store.add_image('tile', PIXELS, 3, 2)
+        copy = pickle.loads(pickle.dumps(store))
+        assert store.owner and not copy.owner
+        assert len(copy) == 2
+        path = copy.path('triangle')
+        assert vg.state.paths[path._as_parameter_]['coords'] == COORDS
+        assert vg.state.images[copy.image('tile')]['pixels'] == PIXELS
+        with pytest.raises(ValueError):
+            copy.add_image('other', PIXELS, 3, 2)
+        # Closing the copy leaves the owner's assets alone.
+        copy.close()
+        with store.buffer('tile') as buffer:
+            assert bytes(buffer) == PIXELS
+
+    def test_close(self, vg):
+        store = AssetStore(segment_size=256)
+        store.add_image('tile', PIXELS, 3, 2)
+        handle = store.image('tile')
+        segment = store['tile'].segment
+        store.close()
+        assert len(store) == 0
+        assert handle not in vg.state.images
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(segment)
@@ -0,0 +1,99 @@
+'''Tests of M4 decimation, and of line series built up incrementally.'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+# Standard library imports.
+import random
+
+# Third-party imports.
+import pytest
+
+# Local imports.
+from povg.chart import LineSeries, m4_columns
+from povg.params import PathDatatypes
+from povg.path import Path
+
+def samples(count, seed=0):
+    rng = random.Random(seed)
+    xs = sorted(rng.uniform(0, 100) for _ in range(count))
+    ys = [rng.gauss(0, 10) for _ in range(count)]
+    return xs, ys
+
+def test_m4_keeps_extremes_of_each_column():
+    xs, ys = samples(1000)
+    columns = list(m4_columns(xs, ys, 0, 2.5))
+    assert [column for column, _ in columns] == sorted({int(x // 2.5)
+                                                        for x in xs})
+    for column, points in columns:
+        in_column = [(x, y) for x, y in zip(xs, ys) if int(x // 2.5) == column]
+        assert 1 <= len(points) <= 4
+        assert points[0] == in_column[0] and points[-1] == in_column[-1]
+        assert min(y for _, y in points) == min(y for _, y in in_column)
+        assert max(y for _, y in points) == max(y for _, y in in_column)
+        assert list(points) == sorted(points)
+
+def test_m4_range():
+    xs, ys = samples(100)
+    whole = list(m4_columns(xs, ys, 0, 10))
+    part = list(m4_columns(xs, ys, 0, 10, lo=0, hi=50))
+    assert part == list(m4_columns(xs[:50], ys[:50], 0, 10))
+    assert part[0] == whole[0]
+
+def series(chunks):
+    line = LineSeries((0, 100), 40,
+                      path=Path(datatype=PathDatatypes.F, keep_data=True))
+    for xs, ys in chunks:
+        line.extend(xs, ys)
+    return line
+
+@pytest.mark.parametrize('chunk', [1, 7, 100])
+def test_incremental_matches_one_shot(vg, chunk):
+    xs, ys = samples(700, seed=chunk)
+    one_shot = series([(xs, ys)])
+    incremental = series([(xs[n:n + chunk], ys[n:n + chunk])
+                          for n in range(0, len(xs), chunk)])
+    assert len(incremental) == len(one_shot)
+    assert (incremental.path.segment_data() ==
+            one_shot.path.segment_data())
+    # The native path, built by appending and rewriting the open column,
+    # agrees too.
+    native_path = vg.state.paths[incremental.path._phandle]
+    commands, data = one_shot.path.segment_data()
+    assert tuple(native_path['commands']) == commands
+    assert tuple(native_path['coords']) == data
+
+def test_columns_have_fixed_size():
+    xs, ys = samples(300)
+    line = series([(xs, ys)])
+    # One MOVE_TO, then four segments for each column.
+    assert (len(line) - 1) % LineSeries.SEGMENTS_PER_COLUMN == 0
+    assert (len(line) - 1) // 4 == len(list(m4_columns(xs, ys, 0, 2.5)))
+
+def test_extend_checks_order():
+    line = series([([1, 2, 3], [0, 0, 0])])
+    with pytest.raises(ValueError):
+        line.extend([2], [0])
+    with pytest.raises(ValueError):
+        line.extend([4, 5], [0])
+
+def test_clear(vg):
+    line = series([samples(50)])
+    line.clear()
+    assert len(line) == 0
+    assert vg.state.paths[line.path._phandle]['commands'] == []
+    line.extend([1, 2], [3, 4])
+    assert line.path.segment_data()[1][:2] == (1.0, 3.0)
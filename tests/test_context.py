@@ -0,0 +1,252 @@
+'''Tests of Context objects.'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+# Standard library imports.
+import asyncio
+import threading
+
+# Third-party imports.
+import pytest
+
+# Local imports.
+import povg.context
+from povg import ContextThreadError, native
+from povg.render import RenderThread
+from povg.context import Context, FillRule, MatrixMode, StateBlock
+from povg.matrix import Matrix
+
+FILL_RULE, LINE_WIDTH, DASH_PATTERN = 0x1101, 0x1110, 0x1114
+
+def translation(tx, ty):
+    m = Matrix()
+    m.translate(tx, ty)
+    return m
+
+def scaling(sx, sy):
+    m = Matrix()
+    m.scale(sx, sy)
+    return m
+
+def draw(vg):
+    '''Draw a path, and get the path matrix it was drawn with.'''
+    native.vgDrawPath(1, 0)
+    return vg.state.draws[-1][2]
+
+class TestMatrixStack:
+    def test_nested_transforms(self, vg):
+        ctx = Context()
+        ctx.tracking = True
+        ctx.load_matrix(Matrix())
+        with ctx.transform(translation(10, 20)):
+            assert draw(vg) == translation(10, 20).values
+            with ctx.transform(scaling(2, 3)):
+                assert draw(vg) == (translation(10, 20) *
+                                    scaling(2, 3)).values
+                with ctx.transform(translation(1, 1)):
+                    assert draw(vg) == (2, 0, 0, 0, 3, 0, 12, 23, 1)
+                assert draw(vg) == (2, 0, 0, 0, 3, 0, 10, 20, 1)
+            assert draw(vg) == translation(10, 20).values
+        assert draw(vg) == Matrix().values
+        assert vg.calls['vgGetMatrix'] == 0
+
+    def test_push_mult_pop(self, vg):
+        ctx = Context()
+        ctx.tracking = True
+        ctx.load_matrix(Matrix())
+        ctx.push_matrix()
+        ctx.mult_matrix(translation(5, 0))
+        ctx.push_matrix()
+        ctx.mult_matrix(translation(0, 7))
+        assert ctx.get_matrix() == translation(5, 7)
+        ctx.pop_matrix()
+        assert ctx.get_matrix() == translation(5, 0)
+        ctx.pop_matrix()
+        assert ctx.get_matrix() == Matrix()
+        with pytest.raises(IndexError):
+            ctx.pop_matrix()
+        assert vg.calls['vgGetMatrix'] == 0
+        # Nothing was drawn, so OpenVG was never touched.
+        assert vg.calls['vgLoadMatrix'] == vg.calls['vgMultMatrix'] == 0
+
+    def test_other_mode(self, vg):
+        ctx = Context()
+        ctx.tracking = True
+        mode = MatrixMode.FILL_PAINT_TO_USER
+        ctx.load_matrix(Matrix())
+        ctx.load_matrix(Matrix(), mode)
+        with ctx.transform(scaling(4, 4), mode):
+            assert ctx.get_matrix() == Matrix()
+            assert ctx.get_matrix(mode) == scaling(4, 4)
+            draw(vg)
+            assert vg.state.matrices[mode] == scaling(4, 4).values
+        assert ctx.get_matrix(mode) == Matrix()
+        assert ctx.matrix_mode == MatrixMode.PATH_USER_TO_SURFACE
+        assert vg.calls['vgGetMatrix'] == 0
+
+    def test_tracked_reads_back_once(self, vg):
+        ctx = Context()
+        ctx.tracking = True
+        vg.state.matrices[0x1400] = translation(8, 9).values
+        for _ in range(2):
+            with ctx.transform(scaling(2, 2)):
+                assert draw(vg) == (2, 0, 0, 0, 2, 0, 8, 9, 1)
+            assert draw(vg) == translation(8, 9).values
+        assert vg.calls['vgGetMatrix'] == 1
+
+    def test_untracked_after_load(self, vg):
+        ctx = Context()
+        ctx.load_matrix(translation(3, 3))
+        with ctx.transform(scaling(2, 2)):
+            with ctx.transform(translation(1, 0)):
+                assert ctx.get_matrix() == Matrix.from_values(
+                    (2, 0, 0, 0, 2, 0, 5, 3, 1))
+        assert ctx.get_matrix() == translation(3, 3)
+        assert vg.calls['vgGetMatrix'] == 0
+
+    def test_untracked_reads_back_once(self, vg):
+        ctx = Context()
+        vg.state.matrices[0x1400] = translation(8, 9).values
+        with ctx.transform(scaling(2, 2)):
+            with ctx.transform(scaling(3, 3)):
+                assert ctx.get_matrix() == Matrix.from_values(
+                    (6, 0, 0, 0, 6, 0, 8, 9, 1))
+        assert draw(vg) == translation(8, 9).values
+        assert vg.calls['vgGetMatrix'] == 1
+
+BLOCK = StateBlock(fill_rule=FillRule.NON_ZERO, stroke_line_width=2,
+                   stroke_dash_pattern=(4, 2))
+
+def sets(vg):
+    return [args[0] for name, args in vg.log if name.startswith('vgSet')]
+
+class TestStateBlock:
+    def test_block(self):
+        assert BLOCK.stroke_line_width == 2.0
+        assert BLOCK.stroke_dash_pattern == (4.0, 2.0)
+        assert BLOCK == StateBlock(stroke_dash_pattern=[4, 2],
+                                   stroke_line_width=2.0,
+                                   fill_rule=FillRule.NON_ZERO)
+        assert hash(BLOCK) == hash(BLOCK.replace())
+        assert [name for name, _ in BLOCK.items()] == [
+            'fill_rule', 'stroke_line_width', 'stroke_dash_pattern']
+        assert BLOCK.replace(fill_rule=None).fill_rule is None
+        with pytest.raises(TypeError):
+            StateBlock(colour=1)
+
+    def test_apply_and_get_state(self, vg):
+        ctx = Context()
+        ctx.apply(BLOCK)
+        assert vg.state.params[FILL_RULE] == FillRule.NON_ZERO
+        assert vg.state.params[LINE_WIDTH] == 2.0
+        assert vg.state.params[DASH_PATTERN] == (4.0, 2.0)
+        assert ctx.get_state(*(name for name, _ in BLOCK.items())) == BLOCK
+        assert ctx.get_state().replace(**dict(BLOCK.items())) == (
+            ctx.get_state())
+
+    def test_state_restored_on_exit(self, vg):
+        ctx = Context()
+        before = dict(vg.state.params)
+        with ctx.state(BLOCK):
+            assert vg.state.params[LINE_WIDTH] == 2.0
+        assert vg.state.params == before
+        with pytest.raises(RuntimeError):
+            with ctx.state(BLOCK):
+                raise RuntimeError
+        assert vg.state.params == before
+
+    def test_unshadowed_applies_all(self, vg):
+        ctx = Context()
+        for _ in range(2):
+            ctx.apply(BLOCK)
+        assert sets(vg) == [FILL_RULE, LINE_WIDTH, DASH_PATTERN] * 2
+
+    def test_shadowed_applies_changes(self, vg):
+        ctx = Context()
+        ctx.shadowing = True
+        ctx.apply(BLOCK)
+        del vg.log[:]
+        ctx.apply(BLOCK)
+        ctx.apply(BLOCK.replace(stroke_line_width=3))
+        assert sets(vg) == [LINE_WIDTH]
+
+    def test_shadowed_state(self, vg):
+        ctx = Context()
+        ctx.shadowing = True
+        ctx.apply(BLOCK)
+        del vg.log[:]
+        with ctx.state(BLOCK.replace(stroke_line_width=5)):
+            assert vg.state.params[LINE_WIDTH] == 5.0
+        assert vg.state.params[LINE_WIDTH] == 2.0
+        # Nothing was read back, and only the line width was set (and
+        # then restored).
+        assert sets(vg) == [LINE_WIDTH, LINE_WIDTH]
+        assert not any(name.startswith('vgGet') for name, _ in vg.log)
+
+@pytest.fixture
+def finished(monkeypatch):
+    '''Record the threads in which vgFlush() and vgFinish() are called.'''
+    threads = []
+    for name in ('vgFlush', 'vgFinish'):
+        monkeypatch.setattr(povg.context, name,
+                            lambda: threads.append(threading.get_ident()))
+    return threads
+
+class TestAsync:
+    def test_only_renderer(self, finished):
+        with RenderThread() as renderer:
+            asyncio.run(Context().flush_async())
+            asyncio.run(Context().finish_async())
+        assert finished == [renderer.ident] * 2
+
+    def test_renderer_given(self, finished):
+        with RenderThread() as first, RenderThread() as second:
+            asyncio.run(Context().finish_async(second))
+            asyncio.run(Context().flush_async(renderer=first))
+        assert finished == [second.ident, first.ident]
+
+    def test_renderer_of_context(self, finished):
+        ctx = Context()
+        with RenderThread(lambda: ctx) as owner, RenderThread():
+            asyncio.run(ctx.finish_async())
+            # Any other plain Context is ambiguous, with two running.
+            with pytest.raises(ContextThreadError):
+                asyncio.run(Context().finish_async())
+        assert finished == [owner.ident]
+
+    def test_no_renderer(self, finished):
+        with pytest.raises(ContextThreadError):
+            asyncio.run(Context().finish_async())
+        renderer = RenderThread()
+        with pytest.raises(ContextThreadError):
+            asyncio.run(Context().flush_async(renderer))
+        assert finished == []
+
+    def test_event_loop_not_blocked(self, finished):
+        release = threading.Event()
+        async def main(renderer):
+            renderer.submit(release.wait)
+            task = asyncio.ensure_future(Context().finish_async())
+            # The loop still runs other coroutines while the renderer is
+            # busy.
+            await asyncio.sleep(0.01)
+            assert not task.done()
+            release.set()
+            await task
+        with RenderThread() as renderer:
+            asyncio.run(main(renderer))
+        assert finished == [renderer.ident]
@@ -0,0 +1,121 @@
+'''Tests of merging damaged rectangles.'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+# Standard library imports.
+import random
+
+# Third-party imports.
+import pytest
+
+# Local imports.
+from povg.damage import DamageTracker, merge_rects
+
+def cells(rects):
+    '''Get the set of unit cells covered by integer rectangles.'''
+    return {(x, y) for rx, ry, w, h in rects
+            for x in range(rx, rx + w) for y in range(ry, ry + h)}
+
+def random_rects(count, seed):
+    rng = random.Random(seed)
+    return [(rng.randrange(100), rng.randrange(100), rng.randrange(1, 20),
+             rng.randrange(1, 20)) for _ in range(count)]
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('max_rects', [1, 3, 8])
+def test_merged_rects_cover_the_originals(seed, max_rects):
+    rects = random_rects(30, seed)
+    merged = merge_rects(rects, max_rects)
+    assert 1 <= len(merged) <= max_rects
+    assert cells(rects) <= cells(merged)
+
+def test_edge_aligned_rects_merge_for_free():
+    # A row of strips, in no particular order, makes one rectangle.
+    strips = [(x, 5, 1, 10) for x in (3, 0, 4, 1, 2)]
+    assert merge_rects(strips, 10) == [(0, 5, 5, 10)]
+    # So do contained and banded overlaps.
+    assert merge_rects([(0, 0, 10, 10), (2, 2, 3, 3)], 10) == [(0, 0, 10, 10)]
+    assert merge_rects([(0, 0, 10, 4), (5, 0, 10, 4)], 10) == [(0, 0, 15, 4)]
+
+def test_corner_pairs_are_kept_apart():
+    # Merging these would cover area that neither does.
+    rects = [(0, 0, 5, 5), (5, 5, 5, 5), (20, 0, 5, 5)]
+    assert sorted(merge_rects(rects, 3)) == sorted(rects)
+
+def test_cheapest_pair_is_merged():
+    rects = [(0, 0, 10, 10), (11, 0, 10, 10), (80, 80, 10, 10)]
+    merged = merge_rects(rects, 2)
+    assert sorted(merged) == [(0, 0, 21, 10), (80, 80, 10, 10)]
+
+def test_empty_rects_are_ignored():
+    assert merge_rects([(0, 0, 0, 10), (5, 5, 10, -1)], 4) == []
+    assert merge_rects([(0, 0, 0, 10), (1, 1, 2, 2)], 4) == [(1, 1, 2, 2)]
+
+def test_many_rects():
+    rects = random_rects(2000, 0)
+    merged = merge_rects(rects, 16)
+    assert len(merged) <= 16
+    assert cells(rects) <= cells(merged)
+
+class TestScroll:
+    @pytest.fixture
+    def tracker(self, vg):
+        tracker = DamageTracker(100, 80, max_rects=8)
+        with tracker.frame():
+            pass
+        del vg.log[:]
+        return tracker
+
+    def copies(self, vg):
+        return [args for name, args in vg.log if name == 'vgCopyPixels']
+
+    @pytest.mark.parametrize('dx, dy, rect, copy, exposed', [
+        (10, -5, None, (10, 0, 0, 5, 90, 75),
+         [(0, 0, 10, 80), (0, 75, 100, 5)]),
+        (-3, 0, None, (0, 0, 3, 0, 97, 80), [(97, 0, 3, 80)]),
+        (0, 7, (20, 10, 40, 30), (20, 17, 20, 10, 40, 23),
+         [(20, 10, 40, 7)]),
+        (-4, -6, (20, 10, 40, 30), (20, 10, 24, 16, 36, 24),
+         [(56, 10, 4, 30), (20, 34, 40, 6)])])
+    def test_copy_and_exposed_strips(self, vg, tracker, dx, dy, rect, copy,
+                                     exposed):
+        assert tracker.scroll(dx, dy, rect)
+        assert self.copies(vg) == [copy]
+        assert cells(tracker.begin_frame()) == cells(exposed)
+        tracker.end_frame()
+
+    def test_no_distance(self, vg, tracker):
+        assert tracker.scroll(0, 0)
+        assert not tracker and self.copies(vg) == []
+
+    @pytest.mark.parametrize('dx, dy', [(2.5, 0), (0, 40), (-50, 0)])
+    def test_fallback(self, vg, tracker, dx, dy):
+        assert not tracker.scroll(dx, dy)
+        assert self.copies(vg) == []
+        assert tracker.begin_frame() == [(0, 0, 100, 80)]
+        tracker.end_frame()
+
+    def test_fallback_on_damage(self, vg, tracker):
+        tracker.add((25, 15, 2, 2))
+        assert not tracker.scroll(0, 3, (20, 10, 40, 30))
+        assert self.copies(vg) == []
+        assert cells(tracker.begin_frame()) == cells([(20, 10, 40, 30)])
+        tracker.end_frame()
+        # Damage elsewhere does not stop a scroll.
+        tracker.add((0, 0, 5, 5))
+        assert tracker.scroll(0, 3, (20, 10, 40, 30))
+        assert len(self.copies(vg)) == 1
@@ -0,0 +1,143 @@
+'''Tests of EGLContext binding to threads, with a stand-in for Pegl.'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+# Standard library imports.
+from importlib.util import find_spec
+import sys
+import threading
+from types import ModuleType, SimpleNamespace
+
+# Third-party imports.
+import pytest
+
+def _fake_pegl():
+    '''Install just enough of Pegl for EGLContext, unless it is installed.'''
+    if find_spec('pegl') is not None:
+        return
+    modules = {name: ModuleType(name)
+               for name in ('pegl', 'pegl.attribs', 'pegl.attribs.config',
+                            'pegl.config', 'pegl.context', 'pegl.display',
+                            'pegl.surface')}
+    for name, module in modules.items():
+        if '.' in name:
+            parent, _, child = name.rpartition('.')
+            setattr(modules[parent], child, module)
+
+    class Context:
+        api = 'OpenVG'
+        def __init__(self, display, config, share_context=None):
+            self.display, self.config = display, config
+        def make_current(self, *args, **kwargs):
+            pass
+
+    modules['pegl.attribs.config'].ClientAPIs = dict
+    modules['pegl.config'].get_configs = lambda display, attribs: ['config']
+    modules['pegl.context'].Context = Context
+    modules['pegl.context'].bind_api = lambda api: None
+    modules['pegl.display'].current_display = lambda: 'display'
+    modules['pegl.surface'].WindowSurface = SimpleNamespace
+    modules['pegl.surface'].PbufferSurface = SimpleNamespace
+    sys.modules.update(modules)
+
+_fake_pegl()
+
+# Local imports.
+from povg import ContextThreadError, native
+from povg.context.egl import EGLContext
+from povg.render import RenderThread
+
+def in_thread(fn):
+    '''Run a function in a new thread, and get its result or exception.'''
+    outcome = {}
+    def target():
+        try:
+            outcome['result'] = fn()
+        except Exception as exc:
+            outcome['error'] = exc
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome.get('result')
+
+class TestUnbind:
+    def test_unbind_in_bound_thread(self, vg):
+        ctx = EGLContext()
+        ctx.make_current()
+        assert ctx.state_record.thread == threading.get_ident()
+        assert native.current_state() is ctx.state_record
+        with pytest.raises(ContextThreadError):
+            in_thread(ctx.make_current)
+        ctx.unbind()
+        assert ctx.state_record.thread is None
+        assert native.current_state() is not ctx.state_record
+        with pytest.raises(ContextThreadError):
+            ctx.max_dash_count
+        in_thread(ctx.make_current)
+
+    def test_unbind_after_thread_ends(self, vg):
+        ctx = EGLContext()
+        in_thread(ctx.make_current)
+        # The thread has ended, but the context is still bound to it...
+        assert ctx.state_record.thread is not None
+        with pytest.raises(ContextThreadError):
+            ctx.make_current()
+        # ...until it is unbound.
+        ctx.unbind()
+        ctx.make_current()
+        assert ctx.state_record.thread == threading.get_ident()
+
+    def test_record_kept(self, vg):
+        ctx = EGLContext()
+        ctx.make_current()
+        ctx.shadowing = True
+        ctx.stroke_line_width = 3
+        ctx.unbind()
+        ctx.make_current()
+        assert ctx.shadowing
+        assert ctx.stroke_line_width == 3.0
+        assert vg.calls['vgGetf'] == 0
+
+class TestRenderThread:
+    def make_context(self):
+        ctx = EGLContext()
+        ctx.make_current()
+        return ctx
+
+    def test_unbound_when_stopped(self, vg):
+        renderer = RenderThread(self.make_context)
+        with renderer:
+            ctx = renderer.context
+            assert ctx.state_record.thread == renderer.ident
+            assert renderer.call(lambda: ctx.max_dash_count) == 16
+            with pytest.raises(ContextThreadError):
+                ctx.make_current()
+        assert ctx.state_record.thread is None
+        ctx.make_current()
+        assert ctx.max_dash_count == 16
+
+    @pytest.mark.filterwarnings(
+        'ignore::pytest.PytestUnhandledThreadExceptionWarning')
+    def test_unbound_after_failed_teardown(self, vg):
+        def teardown(ctx):
+            raise RuntimeError
+        renderer = RenderThread(self.make_context, teardown)
+        renderer.start()
+        renderer.stop()
+        assert renderer.context.state_record.thread is None
@@ -0,0 +1,97 @@
+'''Tests of the farm module, with workers drawing through the fake library.'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+# Standard library imports.
+import multiprocessing
+import os
+
+# Third-party imports.
+import pytest
+
+# Local imports.
+from povg.farm import Farm
+
+# The value that each worker's last drawing left on its "surface".
+_drawn = [0]
+
+class Backend:
+    '''A surface that reads back as the last value drawn, in every byte.'''
+    def __init__(self, width, height):
+        pass
+
+    def read_pixels(self, width, height, into):
+        into[:] = bytes((_drawn[0],)) * (width * height * 4)
+
+def draw_value(value):
+    _drawn[0] = value
+
+def draw_failure(message):
+    raise ValueError(message)
+
+@pytest.fixture
+def farm():
+    with Farm(4, 2, workers=2, backend=Backend, slots=3,
+              mp_context=multiprocessing.get_context('fork')) as farm:
+        yield farm
+
+def test_map_streams_frames_in_order(farm):
+    values = list(range(1, 11))
+    pixels = [frame.tobytes() for frame in
+              farm.map(draw_value, [(value,) for value in values])]
+    assert pixels == [bytes((value,)) * 32 for value in values]
+
+def test_submit_smaller_frame(farm):
+    with farm.submit(draw_value, 7, width=2, height=1).result() as frame:
+        assert (frame.width, frame.height) == (2, 1)
+        assert frame.tobytes() == bytes((7,)) * 8
+        assert frame.worker != os.getpid()
+
+def test_submit_rejects_oversized_frame(farm):
+    with pytest.raises(ValueError):
+        farm.submit(draw_value, 1, width=5, height=2)
+
+def test_release_returns_shared_memory(farm):
+    frames = [farm.submit(draw_value, n).result() for n in range(3)]
+    assert farm._free.empty()
+    for frame in frames:
+        frame.release()
+        assert frame.pixels is None
+    assert farm._free.qsize() == 3
+    # Releasing twice gives nothing back twice.
+    frames[0].release()
+    assert farm._free.qsize() == 3
+
+def test_worker_failure(farm):
+    future = farm.submit(draw_failure, 'no scene')
+    with pytest.raises(ValueError, match='no scene'):
+        future.result()
+    # The failed scene's shared memory is free again, and the workers
+    # carry on.
+    assert farm._free.qsize() == 3
+    with farm.submit(draw_value, 3).result() as frame:
+        assert frame.tobytes() == bytes((3,)) * 32
+
+def test_map_failure_releases_frames(farm):
+    scenes = [(draw_value, (1,), None, None),
+              (draw_failure, ('bad',), None, None),
+              (draw_value, (2,), None, None)]
+    frames = farm.stream(scenes)
+    assert next(frames).tobytes() == bytes((1,)) * 32
+    with pytest.raises(ValueError, match='bad'):
+        next(frames)
+    assert farm._free.qsize() == 3
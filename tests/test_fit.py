@@ -0,0 +1,90 @@
+'''Tests of curve fitting, and of fitting strokes incrementally.'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+# Standard library imports.
+from math import cos, hypot, sin
+
+# Third-party imports.
+import pytest
+
+# Local imports.
+from povg.fit import StrokeFitter, cubics_to_data, fit_cubics
+from povg.params import PathDatatypes
+from povg.path import Path
+
+# A looping, spiralling stroke, as from a pen.
+STROKE = [(40 * t / 50 * cos(t / 4) + t, 40 * t / 50 * sin(t / 4))
+          for t in range(50)]
+
+def bezier(curve, t):
+    return tuple((1 - t) ** 3 * a + 3 * (1 - t) ** 2 * t * b +
+                 3 * (1 - t) * t ** 2 * c + t ** 3 * d
+                 for a, b, c, d in zip(curve.p0, curve.ctrl0, curve.ctrl1,
+                                       curve.p1))
+
+def miss(curves, point, steps=200):
+    '''Get roughly how far a point lies from the nearest of some curves.'''
+    return min(hypot(x - point[0], y - point[1]) for curve in curves
+               for x, y in (bezier(curve, n / steps)
+                            for n in range(steps + 1)))
+
+@pytest.mark.parametrize('error', [0.5, 2.0])
+def test_fit_cubics_within_error(error):
+    curves = fit_cubics(STROKE, error)
+    assert curves[0].p0 == STROKE[0] and curves[-1].p1 == STROKE[-1]
+    for before, after in zip(curves, curves[1:]):
+        assert before.p1 == after.p0
+    for point in STROKE:
+        assert miss(curves, point) <= error * 1.05
+
+def test_fitter_curves_fit_every_point():
+    fitter = StrokeFitter(error=1.0,
+                          path=Path(datatype=PathDatatypes.F, keep_data=True))
+    for point in STROKE:
+        fitter.add_point(point)
+    curves = fitter.all_curves
+    assert len(fitter) == len(curves) > 1
+    assert curves[0].p0 == STROKE[0] and curves[-1].p1 == STROKE[-1]
+    for point in STROKE:
+        assert miss(curves, point) <= 1.05
+
+@pytest.mark.parametrize('chunk', [1, 3, 50])
+def test_fitter_path_matches_curves(vg, chunk):
+    path = Path(datatype=PathDatatypes.F, keep_data=True)
+    fitter = StrokeFitter(error=1.0, path=path)
+    for n in range(0, len(STROKE), chunk):
+        fitter.extend(STROKE[n:n + chunk])
+
+    commands, data = cubics_to_data(fitter.all_curves, PathDatatypes.F)
+    assert path.segment_data()[0] == tuple(commands)
+    assert path.segment_data()[1] == pytest.approx(data, abs=1e-4)
+    # What was sent to OpenVG, by appending and modifying segments,
+    # agrees with the client-side copy.
+    native_path = vg.state.paths[path._phandle]
+    assert tuple(native_path['commands']) == path.segment_data()[0]
+    assert tuple(native_path['coords']) == path.segment_data()[1]
+
+def test_fitter_clear(vg):
+    path = Path(datatype=PathDatatypes.F, keep_data=True)
+    fitter = StrokeFitter(path=path)
+    fitter.extend(STROKE[:10])
+    fitter.clear()
+    assert len(fitter) == 0 and fitter.all_curves == []
+    assert vg.state.paths[path._phandle]['commands'] == []
+    fitter.extend(STROKE[10:20])
+    assert fitter.all_curves[0].p0 == STROKE[10]
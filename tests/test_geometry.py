@@ -0,0 +1,169 @@
+'''Tests of the geometry module: containment, clipping and simplifying.'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+# Standard library imports.
+from math import cos, hypot, pi, sin
+
+# Third-party imports.
+import pytest
+
+# Local imports.
+from povg.geometry import (Subpath, clip_polylines, contains,
+                           simplify_polylines, significance)
+
+def square(x, y, size, clockwise=False):
+    points = [(x, y), (x + size, y), (x + size, y + size), (x, y + size)]
+    return Subpath(points[::-1] if clockwise else points, True)
+
+def area(subpath):
+    '''Get the signed area of a closed subpath (shoelace formula).'''
+    points = subpath.points
+    return sum(ax * by - bx * ay for (ax, ay), (bx, by)
+               in zip(points, points[1:] + points[:1])) / 2
+
+def distance_to_polyline(point, points):
+    px, py = point
+    best = float('inf')
+    for (ax, ay), (bx, by) in zip(points, points[1:]):
+        dx, dy = bx - ax, by - ay
+        t = 0.0 if dx == dy == 0 else max(0.0, min(1.0, (
+            (px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)))
+        best = min(best, hypot(px - ax - t * dx, py - ay - t * dy))
+    return best
+
+class TestContains:
+    def test_fill_rules_with_hole(self):
+        # A hole wound the same way as its outer ring is filled under the
+        # non-zero rule, but not under the even/odd rule.
+        same = [square(0, 0, 10), square(3, 3, 4)]
+        assert contains(same, (5, 5))
+        assert not contains(same, (5, 5), even_odd=True)
+        # Wound the other way, it is a hole under both.
+        opposite = [square(0, 0, 10), square(3, 3, 4, clockwise=True)]
+        assert not contains(opposite, (5, 5))
+        assert not contains(opposite, (5, 5), even_odd=True)
+        for subpaths in (same, opposite):
+            assert contains(subpaths, (1, 1))
+            assert contains(subpaths, (1, 1), even_odd=True)
+
+    def test_concave(self):
+        # An L shape, whose bounding box includes its notch.
+        ell = [Subpath([(0, 0), (10, 0), (10, 4), (4, 4), (4, 10), (0, 10)],
+                       True)]
+        assert contains(ell, (2, 8))
+        assert contains(ell, (8, 2))
+        assert not contains(ell, (8, 8))
+
+    def test_open_subpath_is_filled_closed(self):
+        triangle = [Subpath([(0, 0), (10, 0), (0, 10)], False)]
+        assert contains(triangle, (2, 2))
+        assert not contains(triangle, (8, 8))
+
+class TestClip:
+    # Filled subpaths are clipped with Sutherland-Hodgman, and stroked
+    # ones with Liang-Barsky.
+    rect = (0, 0, 10, 10)
+
+    @pytest.mark.parametrize('fill', [True, False])
+    def test_inside_is_kept(self, fill):
+        inside = square(2, 2, 6)
+        # A stroke that is never cut stays closed, joined at its start.
+        assert clip_polylines([inside], self.rect, fill=fill) == [inside]
+
+    @pytest.mark.parametrize('fill', [True, False])
+    def test_outside_is_dropped(self, fill):
+        for outside in (square(20, 2, 5), square(-8, -8, 5),
+                        Subpath([(-5, 12), (15, 12)], False)):
+            assert clip_polylines([outside], self.rect, fill=fill) == []
+
+    def test_fill_crossing_edge(self):
+        clipped, = clip_polylines([square(5, 2, 10)], self.rect)
+        assert clipped.closed
+        assert sorted(clipped.points) == [(5, 2), (5, 10), (10, 2), (10, 10)]
+
+    def test_stroke_crossing_edge(self):
+        across = Subpath([(-5, 5), (15, 5)], False)
+        assert clip_polylines([across], self.rect, fill=False) == [
+            Subpath([(0, 5), (10, 5)], False)]
+        # One end inside: cut where it leaves.
+        leaving = Subpath([(5, 5), (5, 20), (8, 20)], False)
+        assert clip_polylines([leaving], self.rect, fill=False) == [
+            Subpath([(5, 5), (5, 10)], False)]
+
+    def test_fill_surrounding_rect(self):
+        clipped, = clip_polylines([square(-5, -5, 20)], self.rect)
+        assert sorted(clipped.points) == [(0, 0), (0, 10), (10, 0), (10, 10)]
+        # A stroke round the outside never enters it.
+        assert clip_polylines([square(-5, -5, 20)], self.rect,
+                              fill=False) == []
+
+    def test_fill_keeps_area_inside(self):
+        circle = Subpath([(5 + 5 * cos(2 * pi * n / 64),
+                           5 + 5 * sin(2 * pi * n / 64)) for n in range(64)],
+                         True)
+        clipped = clip_polylines([circle], (5, 5, 10, 10))
+        assert len(clipped) == 1 and clipped[0].closed
+        assert area(clipped[0]) == pytest.approx(area(circle) / 4)
+        for x, y in clipped[0].points:
+            assert 5 - 1e-9 <= x <= 15 + 1e-9 and 5 - 1e-9 <= y <= 15 + 1e-9
+
+    def test_fill_preserves_winding(self):
+        subpaths = [square(0, 0, 10), square(3, 3, 4, clockwise=True)]
+        clipped = clip_polylines(subpaths, (2, 2, 4, 4))
+        assert not contains(clipped, (5, 5))
+        assert contains(clipped, (2.5, 2.5))
+
+    def test_stroke_is_cut_into_pieces(self):
+        # A zigzag that leaves and re-enters the rectangle.
+        zigzag = Subpath([(0, 5), (5, 15), (10, 5), (15, 15), (20, 5)], False)
+        pieces = clip_polylines([zigzag], (0, 0, 20, 10), fill=False)
+        assert len(pieces) == 3
+        assert all(not piece.closed for piece in pieces)
+        for piece in pieces:
+            for x, y in piece.points:
+                assert 0 <= x <= 20 and 0 <= y <= 10 + 1e-9
+
+class TestSimplify:
+    wave = Subpath([(x / 4, sin(x / 4)) for x in range(100)], False)
+
+    @pytest.mark.parametrize('method', ['douglas-peucker', 'visvalingam'])
+    def test_levels(self, method):
+        levels = simplify_polylines([self.wave], (0, 0.01, 0.1, 10), method)
+        counts = [len(level[0].points) for level in levels]
+        assert counts[0] == len(self.wave.points)
+        assert counts == sorted(counts, reverse=True)
+        # The endpoints of an open subpath always survive.
+        assert levels[-1][0].points == [self.wave.points[0],
+                                        self.wave.points[-1]]
+
+    def test_douglas_peucker_tolerance(self):
+        tolerance = 0.05
+        simplified, = simplify_polylines([self.wave], (tolerance,))
+        for point in self.wave.points:
+            assert distance_to_polyline(point,
+                                        simplified[0].points) <= tolerance
+
+    def test_closed_keeps_triangle(self):
+        sig = significance(square(0, 0, 10))
+        simplified, = simplify_polylines([square(0, 0, 10)], (1e9,))
+        assert len(simplified[0].points) == 3
+        assert sum(s == float('inf') for s in sig) >= 3
+
+    def test_unknown_method(self):
+        with pytest.raises(ValueError):
+            significance(self.wave, 'nearest')
@@ -0,0 +1,163 @@
+'''Tests of Matrix, and of MatrixArray against it.'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+# Standard library imports.
+import random
+
+# Third-party imports.
+import pytest
+
+# Local imports.
+from povg import native
+from povg.matrix import Matrix
+
+def affine(seed):
+    rng = random.Random(seed)
+    m = Matrix()
+    m.translate(rng.uniform(-50, 50), rng.uniform(-50, 50))
+    m.rotate(deg=rng.uniform(0, 360))
+    m.scale(rng.uniform(0.5, 2), rng.uniform(0.5, 2))
+    m.shear(rng.uniform(-0.5, 0.5), 0)
+    return m
+
+PROJECTIVE = Matrix.from_values((1, 0, 0.001, 0, 1, 0.002, 5, 6, 1))
+POINTS = [(0, 0), (10, 0), (3, -7), (-20, 15)]
+
+def close(a, b, tol=1e-3):
+    return all(x == pytest.approx(y, abs=tol) for x, y in zip(a, b))
+
+class TestMatrix:
+    def test_is_affine(self):
+        assert Matrix().is_affine
+        assert affine(1).is_affine
+        assert not PROJECTIVE.is_affine
+        assert not (affine(1) * PROJECTIVE).is_affine
+
+    def test_values_order(self):
+        m = Matrix()
+        m.translate(3, 4)
+        m.scale(2, 5)
+        # (sx, shy, w0, shx, sy, w1, tx, ty, w2), as OpenVG has it.
+        assert m.values == (2, 0, 0, 0, 5, 0, 3, 4, 1)
+        assert m.transform_point((1, 1)) == (5, 9)
+        assert Matrix.from_values(m.values) == m
+
+    @pytest.mark.parametrize('matrix', [affine(1), affine(2), PROJECTIVE],
+                             ids=['affine1', 'affine2', 'projective'])
+    def test_inverse(self, matrix):
+        inverse = matrix.inverse()
+        assert close((matrix * inverse).values, Matrix().values)
+        assert close((inverse * matrix).values, Matrix().values)
+        for point, moved in zip(POINTS, matrix.transform_points(POINTS)):
+            assert close(inverse.transform_point(moved), point)
+        assert inverse.is_affine == matrix.is_affine
+
+    def test_unhashable(self):
+        m = affine(4)
+        with pytest.raises(TypeError):
+            hash(m)
+        assert {m.values: 'a'}[Matrix.from_values(m.values).values] == 'a'
+
+    def test_singular(self):
+        m = Matrix()
+        m.scale(0, 1)
+        assert m.determinant == 0
+        with pytest.raises(ValueError):
+            m.inverse()
+
+    def test_make_current(self, vg):
+        m = affine(3)
+        m.make_current()
+        assert close(vg.state.matrices[0x1400], m.values, 1e-6)
+        assert Matrix(from_current=True) == m
+
+class TestMatrixArray:
+    np = pytest.importorskip('numpy')
+
+    @pytest.fixture
+    def matrices(self):
+        return [affine(seed) for seed in range(6)] + [PROJECTIVE]
+
+    @pytest.fixture
+    def array(self, matrices):
+        from povg.matrixarray import MatrixArray
+        return MatrixArray.from_matrices(matrices)
+
+    def test_items_and_rows(self, array, matrices):
+        assert len(array) == len(matrices)
+        for n, m in enumerate(matrices):
+            assert array[n] == m
+            # The array's rows are mathematical: the transpose of
+            # Matrix.rows, which follows OpenVG's order.
+            assert close(array.rows[n].ravel(),
+                         self.np.array(m.rows).T.ravel(), 1e-6)
+
+    def test_from_rows(self, array):
+        from povg.matrixarray import MatrixArray
+        again = MatrixArray.from_rows(array.rows)
+        assert self.np.array_equal(again.data, array.data)
+
+    def test_compose(self, array, matrices):
+        right = affine(99)
+        products = array.compose(right)
+        pairwise = array.compose(array)
+        for n, m in enumerate(matrices):
+            assert close(products[n].values, (m * right).values)
+            assert close(pairwise[n].values, (m * m).values)
+
+    def test_inverse(self, array, matrices):
+        inverses = array.inverse()
+        for n, m in enumerate(matrices):
+            assert close(inverses[n].values, m.inverse().values, 1e-5)
+
+    def test_singular(self):
+        from povg.matrixarray import MatrixArray
+        flat = Matrix()
+        flat.scale(1, 0)
+        with pytest.raises(ValueError):
+            MatrixArray.from_matrices([Matrix(), flat]).inverse()
+
+    def test_transform_points(self, array, matrices):
+        result = array.transform_points(POINTS)
+        assert result.shape == (len(matrices), len(POINTS), 2)
+        for n, m in enumerate(matrices):
+            for got, expected in zip(result[n].tolist(),
+                                     m.transform_points(POINTS)):
+                assert close(got, expected)
+
+    def test_propagate(self, array, matrices):
+        parents = [-1, 0, 1, 0, -1, 4, 2]
+        world = array.propagate(parents)
+        for n in range(len(matrices)):
+            expected, node = Matrix(), n
+            chain = []
+            while node >= 0:
+                chain.append(matrices[node])
+                node = parents[node]
+            for m in reversed(chain):
+                expected *= m
+            assert close(world[n].values, expected.values, 1e-3)
+        with pytest.raises(ValueError):
+            array.propagate([1, 0, -1, -1, -1, -1, -1])
+
+    def test_pointer_loads_without_copying(self, vg, array):
+        array.data[2] = affine(42).values
+        native.vgLoadMatrix(array.pointer(2))
+        assert close(vg.state.matrices[0x1400], affine(42).values, 1e-6)
+        with pytest.raises(IndexError):
+            array.pointer(len(array))
@@ -0,0 +1,255 @@
+'''Tests of the client-side state record in the native module.'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+# Standard library imports.
+from ctypes import c_float
+
+# Third-party imports.
+import pytest
+
+# Local imports.
+from povg import native
+from povg.native import MATRIX_MODE
+
+PATH_MODE, IMAGE_MODE = 0x1400, 0x1401
+LINE_WIDTH, DASH_PATTERN, SCISSOR_RECTS = 0x1110, 0x1114, 0x1106
+MAX_SCISSOR_RECTS, MAX_DASH_COUNT = 0x1160, 0x1161
+SHIFT = (1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 3.0, 4.0, 1.0)
+IDENTITY = (1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0)
+DOUBLE = (2.0, 0.0, 0.0, 0.0, 2.0, 0.0, 0.0, 0.0, 1.0)
+
+def load(values):
+    native.vgLoadMatrix((c_float * 9)(*values))
+
+def get():
+    m = (c_float * 9)()
+    native.vgGetMatrix(m)
+    return tuple(m)
+
+class TestTracking:
+    def test_off_by_default(self, vg):
+        assert not native.current_state().tracking
+        for _ in range(2):
+            native.vgSeti(MATRIX_MODE, IMAGE_MODE)
+            load(SHIFT)
+        assert vg.calls['vgSeti'] == 2
+        assert vg.calls['vgLoadMatrix'] == 2
+        assert vg.state.matrices[IMAGE_MODE] == SHIFT
+        assert native.vgGeti(MATRIX_MODE) == IMAGE_MODE
+        assert vg.calls['vgGeti'] == 1
+
+    def test_redundant_calls_skipped(self, vg):
+        native.set_tracking(True)
+        for _ in range(3):
+            native.vgSeti(MATRIX_MODE, IMAGE_MODE)
+            load(SHIFT)
+        assert vg.calls['vgSeti'] == 1
+        assert vg.calls['vgLoadMatrix'] == 1
+        assert vg.state.params[MATRIX_MODE] == IMAGE_MODE
+        assert vg.state.matrices[IMAGE_MODE] == SHIFT
+        assert native.vgGeti(MATRIX_MODE) == IMAGE_MODE
+        assert get() == SHIFT
+        assert vg.calls['vgGeti'] == vg.calls['vgGetMatrix'] == 0
+
+    def test_mode_selected_only_when_needed(self, vg):
+        native.set_tracking(True)
+        native.vgSeti(MATRIX_MODE, IMAGE_MODE)
+        native.vgSeti(MATRIX_MODE, PATH_MODE)
+        load(SHIFT)
+        # The first mode was never needed, so never sent.
+        assert [args for name, args in vg.log
+                if name == 'vgSeti'] == [(MATRIX_MODE, PATH_MODE)]
+        assert vg.state.matrices[PATH_MODE] == SHIFT
+
+    def test_set_state(self, vg):
+        native.set_tracking(True)
+        first = native.current_state()
+        native.vgSeti(MATRIX_MODE, IMAGE_MODE)
+        load(SHIFT)
+
+        # Another context knows nothing of the first one's state...
+        second = native.set_state()
+        assert not second.tracking
+        native.set_tracking(True)
+        assert second.matrix_mode is None and second.matrices == {}
+        vg.state.params[MATRIX_MODE] = PATH_MODE
+        native.vgSeti(MATRIX_MODE, IMAGE_MODE)
+        load(SHIFT)
+        assert vg.calls['vgLoadMatrix'] == 2
+        assert vg.calls['vgSeti'] == 2
+        assert second.thread is not None and first.thread is None
+
+        # ...and switching back finds the first one's as it was left.
+        native.set_state(first)
+        assert first.matrix_mode == IMAGE_MODE
+        assert first.matrices[IMAGE_MODE] == SHIFT
+        load(SHIFT)
+        assert vg.calls['vgLoadMatrix'] == 2
+        assert second.thread is None
+
+    def test_invalidate_state(self, vg):
+        native.set_tracking(True)
+        native.vgSeti(MATRIX_MODE, IMAGE_MODE)
+        load(SHIFT)
+        # Changed behind Povg's back.
+        vg.state.matrices[IMAGE_MODE] = DOUBLE
+        vg.state.params[MATRIX_MODE] = PATH_MODE
+        native.invalidate_state()
+        record = native.current_state()
+        assert record.tracking
+        assert record.matrix_mode is None and record.matrices == {}
+        assert native.vgGeti(MATRIX_MODE) == PATH_MODE
+        native.vgSeti(MATRIX_MODE, IMAGE_MODE)
+        assert get() == DOUBLE
+        load(SHIFT)
+        assert vg.calls['vgLoadMatrix'] == 2
+        assert vg.state.matrices[IMAGE_MODE] == SHIFT
+
+    def test_invalidate_keeps_deferred(self, vg):
+        native.set_tracking(True)
+        native.defer_matrix(PATH_MODE, SHIFT)
+        native.invalidate_state()
+        native.flush_matrices()
+        assert vg.state.matrices[PATH_MODE] == SHIFT
+
+    def test_switch_off_selects_mode(self, vg):
+        native.set_tracking(True)
+        native.vgSeti(MATRIX_MODE, IMAGE_MODE)
+        assert vg.state.params[MATRIX_MODE] == PATH_MODE
+        native.set_tracking(False)
+        assert vg.state.params[MATRIX_MODE] == IMAGE_MODE
+        record = native.current_state()
+        assert record.matrix_mode is None and record.matrices == {}
+
+def relative_ops(lib):
+    lib.vgTranslate(10, -4)
+    lib.vgRotate(30)
+    lib.vgScale(2, 0.5)
+    lib.vgShear(0.25, 0)
+
+class TestClientTransforms:
+    def native_result(self, vg, start):
+        '''Get what the fake makes of the operations by itself.'''
+        vg.reset()
+        vg.state.matrices[PATH_MODE] = start
+        relative_ops(native.vg)
+        return vg.state.matrices[PATH_MODE]
+
+    def test_known_matrix_loaded_once(self, vg):
+        native.set_tracking(True)
+        native.vgLoadIdentity()
+        relative_ops(native)
+        native.vgDrawPath(1, 0)
+        assert [name for name, _ in vg.log] == ['vgGeti', 'vgLoadMatrix',
+                                                'vgDrawPath']
+        loaded = vg.log[1][1][0]
+        assert loaded == pytest.approx(self.native_result(vg, IDENTITY))
+
+    def test_unknown_matrix_multiplied_once(self, vg):
+        native.set_tracking(True)
+        vg.state.matrices[PATH_MODE] = SHIFT
+        relative_ops(native)
+        native.vgDrawPath(1, 0)
+        assert [name for name, _ in vg.log] == ['vgGeti', 'vgMultMatrix',
+                                                'vgDrawPath']
+        drawn = vg.state.draws[0][2]
+        assert drawn == pytest.approx(self.native_result(vg, SHIFT))
+
+    def test_untracked_native(self, vg):
+        relative_ops(native)
+        assert vg.calls['vgTranslate'] == vg.calls['vgRotate'] == 1
+        assert vg.calls['vgScale'] == vg.calls['vgShear'] == 1
+        assert vg.calls['vgMultMatrix'] == vg.calls['vgLoadMatrix'] == 0
+
+class TestUntracked:
+    def test_deferred_then_native(self, vg):
+        native.defer_matrix(PATH_MODE, SHIFT)
+        native.vgSeti(MATRIX_MODE, IMAGE_MODE)
+        native.vgScale(2, 2)
+        assert vg.calls['vgScale'] == 1
+        assert vg.state.matrices[PATH_MODE] == SHIFT
+        assert vg.state.matrices[IMAGE_MODE] == DOUBLE
+        # The selected mode is put back after loading the deferred matrix.
+        assert vg.state.params[MATRIX_MODE] == IMAGE_MODE
+        assert native.current_state().matrices == {}
+
+    def test_reads_native(self, vg):
+        native.vgSeti(MATRIX_MODE, IMAGE_MODE)
+        load(SHIFT)
+        vg.state.matrices[IMAGE_MODE] = DOUBLE
+        assert get() == DOUBLE
+        assert vg.calls['vgGetMatrix'] == 1
+
+def set_vector(param_type, values):
+    native.vgSetfv(param_type, len(values), (c_float * len(values))(*values))
+
+class TestShadowing:
+    def test_off_by_default(self, vg):
+        for _ in range(2):
+            native.vgSetf(LINE_WIDTH, 3)
+            set_vector(DASH_PATTERN, (4, 2))
+        assert vg.calls['vgSetf'] == vg.calls['vgSetfv'] == 2
+
+    def test_redundant_sets_skipped(self, vg):
+        native.current_state().shadowing = True
+        for _ in range(3):
+            native.vgSetf(LINE_WIDTH, 3)
+        native.vgSetf(LINE_WIDTH, 4)
+        assert vg.calls['vgSetf'] == 2
+        assert native.vgGetf(LINE_WIDTH) == 4.0
+        assert vg.calls['vgGetf'] == 0
+
+    @pytest.mark.parametrize('param_type, limit_type, value', [
+        (DASH_PATTERN, MAX_DASH_COUNT, (4, 2, 1, 1)),
+        (SCISSOR_RECTS, MAX_SCISSOR_RECTS, (0, 0, 5, 5, 10, 10, 2, 2))])
+    def test_vector_not_resent(self, vg, param_type, limit_type, value):
+        native.current_state().shadowing = True
+        for _ in range(3):
+            set_vector(param_type, value)
+        assert vg.calls['vgSetfv'] == 1
+        # The limit was read just once, and is kept.
+        assert vg.log.count(('vgGeti', (limit_type,))) == 1
+        limit = vg.state.params[limit_type]
+        assert native.current_state().limits[limit_type] == (None, limit)
+
+    @pytest.mark.parametrize('value', [(4, 2, 1), (1,) * 18])
+    def test_adjusted_dash_pattern_resent(self, vg, value):
+        # OpenVG drops the odd dash, or those beyond the limit, so the
+        # value set is not what it keeps.
+        native.current_state().shadowing = True
+        for _ in range(2):
+            set_vector(DASH_PATTERN, value)
+        assert vg.calls['vgSetfv'] == 2
+
+    def test_empty_scissor_rect_resent(self, vg):
+        native.current_state().shadowing = True
+        for _ in range(2):
+            set_vector(SCISSOR_RECTS, (0, 0, 0, 5))
+        assert vg.calls['vgSetfv'] == 2
+
+    def test_invalidate_state(self, vg):
+        native.current_state().shadowing = True
+        native.vgSetf(LINE_WIDTH, 3)
+        native.invalidate_state()
+        native.vgSetf(LINE_WIDTH, 3)
+        assert vg.calls['vgSetf'] == 2
+        # The limits are fixed, so they are not forgotten.
+        set_vector(DASH_PATTERN, (1, 1))
+        native.invalidate_state()
+        set_vector(DASH_PATTERN, (1, 1))
+        assert vg.calls['vgGeti'] == 1
@@ -0,0 +1,160 @@
+'''Tests of the path module's helpers, and of Path objects.'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+# Standard library imports.
+import random
+
+# Third-party imports.
+import pytest
+
+# Local imports.
+from povg import path as path_module
+from povg.geometry import PathSegments, SegmentCommand
+from povg.params import PathDatatypes
+from povg.path import Path, RollingPath
+
+MOVE, LINE, CLOSE = (SegmentCommand(PathSegments.MOVE_TO),
+                     SegmentCommand(PathSegments.LINE_TO),
+                     SegmentCommand(PathSegments.CLOSE_PATH))
+SQUARE = ((MOVE, LINE, LINE, LINE, CLOSE), (2, 2, 8, 2, 8, 8, 2, 8))
+VIEWPORT = (0, 0, 10, 10)
+
+class TestClip:
+    def test_inside(self):
+        assert path_module.clip(SQUARE, VIEWPORT) == (list(SQUARE[0]),
+                                                      list(SQUARE[1]))
+
+    def test_outside(self):
+        assert path_module.clip(SQUARE, (20, 20, 10, 10)) == ([], [])
+        assert path_module.clip(SQUARE, (20, 20, 10, 10),
+                                fill=False) == ([], [])
+
+    def test_crossing(self):
+        commands, data = path_module.clip(SQUARE, (5, 0, 10, 10))
+        assert commands == list(SQUARE[0])
+        assert data == [5, 2, 8, 2, 8, 8, 5, 8]
+
+    def test_stroke_margin(self):
+        line = ((MOVE, LINE), (-5, 5, 15, 5))
+        assert path_module.clip(line, VIEWPORT, fill=False) == (
+            [MOVE, LINE], [0, 5, 10, 5])
+        # The margin leaves room for the caps at the cut ends.
+        assert path_module.clip(line, VIEWPORT, fill=False, margin=1) == (
+            [MOVE, LINE], [-1, 5, 11, 5])
+
+    def test_path_object_and_datatype(self, vg):
+        path = Path(datatype=PathDatatypes.F, keep_data=True)
+        path.append_data(*SQUARE)
+        commands, data = path_module.clip(path, (5.5, 0, 10, 10),
+                                          to_datatype=PathDatatypes.S_16)
+        assert data == [6, 2, 8, 2, 8, 8, 6, 8]
+        commands, data = path_module.clip(path, (5.5, 0, 10, 10))
+        assert data == [5.5, 2, 8, 2, 8, 8, 5.5, 8]
+
+class TestSimplify:
+    # A nearly straight bend, then a corner.
+    bent = ((MOVE, LINE, LINE, LINE), (0, 0, 5, 0.01, 10, 0, 10, 10))
+
+    def test_tolerance(self):
+        assert path_module.simplify(self.bent, 0.1) == (
+            [MOVE, LINE, LINE], [0, 0, 10, 0, 10, 10])
+        assert path_module.simplify(self.bent, 0.001,
+                                    datatype=PathDatatypes.F) == (
+            [MOVE, LINE, LINE, LINE], [0, 0, 5, 0.01, 10, 0, 10, 10])
+
+    def test_levels(self):
+        levels = path_module.simplify(self.bent, (0.001, 0.1, 100),
+                                      datatype=PathDatatypes.F)
+        assert [len(commands) for commands, _ in levels] == [4, 3, 2]
+
+    def test_clipped(self):
+        commands, data = path_module.simplify(self.bent, 0.1,
+                                              clip_rect=(0, 0, 20, 5),
+                                              fill=False)
+        assert commands == [MOVE, LINE, LINE]
+        assert data == [0, 0, 10, 0, 10, 5]
+
+class TestRollingPath:
+    @staticmethod
+    def drawn(vg, rolling):
+        '''Draw a rolling path, and get the points drawn, in order.'''
+        del vg.state.draws[:]
+        rolling.draw(stroke=True)
+        points = []
+        for handle, _, _ in vg.state.draws:
+            native_path = vg.state.paths[handle]
+            coords = native_path['coords']
+            chunk = list(zip(coords[::2], coords[1::2]))
+            assert native_path['commands'] == [MOVE] + [LINE] * (
+                len(chunk) - 1)
+            if points:
+                # Each chunk starts where the last one ended.
+                assert chunk[0] == points[-1]
+                chunk = chunk[1:]
+            points.extend(chunk)
+        return points
+
+    def test_window_slides_and_chunks_rotate(self, vg):
+        rolling = RollingPath(10, chunks=3)
+        assert rolling.chunk_size == 5
+        handles = [path._phandle for path in rolling.paths]
+        points = [(float(n), float(n % 3)) for n in range(16)]
+
+        rolling.extend(points[:5])
+        assert self.drawn(vg, rolling) == points[:5]
+        assert len(vg.state.draws) == 1
+        rolling.extend(points[5:15])
+        assert self.drawn(vg, rolling) == points[:15]
+        assert [handle for handle, _, _ in vg.state.draws] == handles
+        # The next point retires the oldest chunk, which is emptied and
+        # reused for the newest points.
+        rolling.append(points[15])
+        assert len(rolling) == 11
+        # The oldest chunk left starts from the last point retired.
+        assert self.drawn(vg, rolling) == points[4:16]
+        assert [handle for handle, _, _ in vg.state.draws] == [
+            handles[1], handles[2], handles[0]]
+        assert vg.calls['vgCreatePath'] == 3
+
+    def test_any_batches(self, vg):
+        rng = random.Random(0)
+        rolling = RollingPath(50, chunks=4)
+        points = []
+        for _ in range(60):
+            batch = [(float(len(points) + n), rng.randrange(-8, 8) / 4)
+                     for n in range(rng.randrange(1, 30))]
+            points += batch
+            rolling.extend(batch)
+            drawn = self.drawn(vg, rolling)
+            assert drawn == points[-len(drawn):]
+            assert len(drawn) - len(rolling) in (0, 1)
+            assert (min(len(points), 50) <= len(rolling) <=
+                    4 * rolling.chunk_size)
+            assert len(vg.state.draws) <= 4
+
+    def test_clear(self, vg):
+        rolling = RollingPath(4, chunks=2)
+        rolling.extend([(0, 0), (1, 1), (2, 2), (3, 3), (4, 4), (5, 5)])
+        rolling.clear()
+        assert len(rolling) == 0 and self.drawn(vg, rolling) == []
+        rolling.extend([(7, 7), (8, 8)])
+        assert self.drawn(vg, rolling) == [(7, 7), (8, 8)]
+
+    def test_needs_two_chunks(self):
+        with pytest.raises(ValueError):
+            RollingPath(10, chunks=1)
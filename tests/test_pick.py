@@ -0,0 +1,134 @@
+'''Tests of hit-testing paths with a PickIndex.'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+# Standard library imports.
+import random
+
+# Third-party imports.
+import pytest
+
+# Local imports.
+from povg.context import FillRule
+from povg.geometry import PathSegments, SegmentCommand
+from povg.matrix import Matrix
+from povg.pick import PickIndex
+
+MOVE, LINE, CLOSE = (SegmentCommand(PathSegments.MOVE_TO),
+                     SegmentCommand(PathSegments.LINE_TO),
+                     SegmentCommand(PathSegments.CLOSE_PATH))
+
+def rect(x, y, width, height, clockwise=False):
+    corners = [(x, y), (x + width, y), (x + width, y + height),
+               (x, y + height)]
+    if clockwise:
+        corners.reverse()
+    return ((MOVE, LINE, LINE, LINE, CLOSE),
+            tuple(value for corner in corners for value in corner))
+
+def line(x0, y0, x1, y1):
+    return (MOVE, LINE), (x0, y0, x1, y1)
+
+@pytest.fixture
+def index():
+    index = PickIndex(cell_size=10)
+    index.add('back', rect(0, 0, 100, 100))
+    index.add('middle', rect(20, 20, 30, 30))
+    index.add('front', rect(40, 40, 30, 30))
+    return index
+
+def test_topmost_first(index):
+    assert index.pick((45, 45)) == 'front'
+    assert index.pick_all((45, 45)) == ['front', 'middle', 'back']
+    assert index.pick((25, 25)) == 'middle'
+    assert index.pick((5, 5)) == 'back'
+    assert index.pick((150, 5)) is None
+    assert index.pick_all((150, 5)) == []
+
+def test_pick_rect(index):
+    assert index.pick_rect((60, 60, 5, 5)) == ['front', 'back']
+    assert index.pick_rect((15, 15, 30, 30)) == ['front', 'middle', 'back']
+    assert index.pick_rect((200, 200, 5, 5)) == []
+
+def test_add_again_goes_on_top_but_update_keeps_place(index):
+    index.update('middle', path=rect(40, 40, 30, 30))
+    assert index.pick((45, 45)) == 'front'
+    index.add('middle', rect(40, 40, 30, 30))
+    assert index.pick((45, 45)) == 'middle'
+    assert len(index) == 3
+
+def test_update_matrix(index):
+    moved = Matrix()
+    moved.translate(500, 0)
+    index.update('front', matrix=moved)
+    assert index.pick((45, 45)) == 'middle'
+    assert index.pick((545, 45)) == 'front'
+
+def test_remove_and_clear(index):
+    index.remove('front')
+    assert 'front' not in index
+    assert index.pick((45, 45)) == 'middle'
+    index.clear()
+    assert len(index) == 0 and index.pick((5, 5)) is None
+
+def test_fill_rules():
+    index = PickIndex()
+    ring = (rect(0, 0, 10, 10)[0] * 2,
+            rect(0, 0, 10, 10)[1] + rect(3, 3, 4, 4)[1])
+    index.add('non-zero', ring)
+    index.add('even-odd', ring, matrix=(1, 0, 0, 0, 1, 0, 20, 0, 1),
+              fill_rule=FillRule.EVEN_ODD)
+    assert index.pick((5, 5)) == 'non-zero'
+    assert index.pick((25, 5)) is None
+    assert index.pick((21, 1)) == 'even-odd'
+
+def test_stroke_width_is_in_user_coordinates():
+    index = PickIndex()
+    scaled = Matrix()
+    scaled.scale(4, 1)
+    index.add('stroke', line(0, 0, 10, 0), matrix=scaled, fill=False,
+              stroke_width=2)
+    # One user unit either side of the line is 1 unit up and down, but
+    # 4 units past the ends.
+    assert index.pick((20, 0.9)) == 'stroke'
+    assert index.pick((20, 1.1)) is None
+    assert index.pick((43.9, 0)) == 'stroke'
+    assert index.pick((44.1, 0)) is None
+    assert index.pick_rect((43, -0.5, 0.5, 1)) == ['stroke']
+    # Without a stroke, an unfilled path cannot be hit.
+    index.update('stroke', stroke_width=None)
+    assert index.pick((20, 0)) is None
+
+def test_large_paths_and_queries():
+    rng = random.Random(0)
+    index = PickIndex(cell_size=10, max_cells=16)
+    boxes = {}
+    for n in range(300):
+        box = (rng.uniform(0, 500), rng.uniform(0, 500),
+               rng.uniform(1, 80), rng.uniform(1, 80))
+        boxes[n] = box
+        index.add(n, rect(*box))
+    query = (100, 100, 300, 300)
+    expected = [n for n in reversed(range(300))
+                if boxes[n][0] <= 400 and boxes[n][0] + boxes[n][2] >= 100 and
+                boxes[n][1] <= 400 and boxes[n][1] + boxes[n][3] >= 100]
+    assert index.pick_rect(query) == expected
+    for point in ((0, 0), (250, 250), (480, 10)):
+        assert index.pick_all(point) == [
+            n for n in reversed(range(300))
+            if boxes[n][0] <= point[0] <= boxes[n][0] + boxes[n][2] and
+            boxes[n][1] <= point[1] <= boxes[n][1] + boxes[n][3]]
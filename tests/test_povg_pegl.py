@@ -95,6 +95,7 @@ class TestApp:
                 self.step = -self.step
             self.pos += self.step
             self.transform.translate(tx=self.step)
+            self.transform.make_current()
 
             self.path.draw()
             self.surface.swap_buffers()
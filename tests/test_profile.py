@@ -0,0 +1,136 @@
+'''Tests of capability profiles.'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+# Local imports.
+from povg import native
+from povg.context import Context
+from povg.params import ImageFormats, PathDatatypes
+from povg.profile import HardwareQueryType, Profile, current_profile
+
+def accelerate(vg, datatypes=(), formats=()):
+    vg.state.accelerated.update(
+        [(HardwareQueryType.PATH_DATATYPE_QUERY, d) for d in datatypes] +
+        [(HardwareQueryType.IMAGE_FORMAT_QUERY, f) for f in formats])
+
+class TestProbe:
+    def test_probe(self, vg):
+        vg.state.params[0x1161] = 9
+        accelerate(vg, [PathDatatypes.S_16],
+                   [ImageFormats.sRGBA_8888, ImageFormats.lL_8])
+        profile = Profile.probe()
+        assert profile.max_dash_count == 9
+        assert profile.max_scissor_rects == 32
+        assert profile.max_gaussian_std_deviation == 16.0
+        assert (profile.vendor, profile.renderer, profile.version) == (
+            'Povg', 'Fake', '1.1')
+        assert profile.extensions == ()
+        assert profile.accelerated_datatypes == (PathDatatypes.S_16,)
+        assert set(profile.accelerated_formats) == {ImageFormats.sRGBA_8888,
+                                                    ImageFormats.lL_8}
+
+    def test_current_profile_probes_once(self, vg):
+        profile = current_profile()
+        calls = sum(vg.calls.values())
+        assert current_profile() is profile
+        assert Context().profile() is profile
+        assert sum(vg.calls.values()) == calls
+
+    def test_json_round_trip(self, vg):
+        accelerate(vg, [PathDatatypes.F], [ImageFormats.sRGBA_8888])
+        profile = Profile.probe()
+        again = Profile.from_json(profile.to_json())
+        assert again == profile
+        assert type(again.extensions) is tuple
+        assert Profile.from_dict(profile.to_dict()) == profile
+
+    def test_install_makes_no_calls(self, vg):
+        vg.state.params[0x1161] = 9
+        profile = Profile.from_json(Profile.probe().to_json())
+        native.set_state()
+        del vg.log[:]
+        profile.install()
+        ctx = Context()
+        assert ctx.max_dash_count == 9
+        assert ctx.max_image_width == 2048
+        assert ctx.profile() is profile
+        assert vg.log == []
+
+def profile(datatypes=(), formats=()):
+    '''Get a profile with only the given datatypes and formats accelerated.'''
+    return Profile(32, 16, 7, 15, 32, 2048, 2048, 2 ** 22, 2 ** 24, 1e10,
+                   16.0, 'Povg', 'Fake', '1.1', (), tuple(datatypes),
+                   tuple(formats))
+
+class TestFastestDatatype:
+    def test_accelerated_kept(self):
+        accelerated = profile([PathDatatypes.S_8, PathDatatypes.F])
+        assert (accelerated.fastest_datatype(PathDatatypes.S_8) ==
+                PathDatatypes.S_8)
+
+    def test_nearest_exact_substitute(self):
+        wide = profile([PathDatatypes.S_32, PathDatatypes.F])
+        assert wide.fastest_datatype(PathDatatypes.S_8) == PathDatatypes.S_32
+        assert wide.fastest_datatype(PathDatatypes.S_16) == PathDatatypes.S_32
+        floats = profile([PathDatatypes.F])
+        assert floats.fastest_datatype(PathDatatypes.S_16) == PathDatatypes.F
+
+    def test_no_inexact_substitute(self):
+        # Floats round the largest 32-bit integers; integers round floats.
+        assert (profile([PathDatatypes.F]).fastest_datatype(
+            PathDatatypes.S_32) == PathDatatypes.S_32)
+        assert (profile([PathDatatypes.S_32]).fastest_datatype(
+            PathDatatypes.F) == PathDatatypes.F)
+        assert (profile([PathDatatypes.S_8]).fastest_datatype(
+            PathDatatypes.S_16) == PathDatatypes.S_16)
+
+class TestFastestFormat:
+    def test_accelerated_kept(self):
+        accelerated = profile(formats=[ImageFormats.sRGBA_8888,
+                                       ImageFormats.sARGB_8888])
+        assert (accelerated.fastest_format(ImageFormats.sARGB_8888) ==
+                ImageFormats.sARGB_8888)
+
+    def test_channel_order_substituted(self):
+        bgra = profile(formats=[ImageFormats.sBGRA_8888])
+        for fmt in (ImageFormats.sRGBA_8888, ImageFormats.sARGB_8888,
+                    ImageFormats.sABGR_8888):
+            assert bgra.fastest_format(fmt) == ImageFormats.sBGRA_8888
+        assert (profile(formats=[ImageFormats.sARGB_5551]).fastest_format(
+            ImageFormats.sRGBA_5551) == ImageFormats.sARGB_5551)
+
+    def test_lowest_value_chosen(self):
+        both = profile(formats=[ImageFormats.sABGR_8888,
+                                ImageFormats.sBGRA_8888])
+        assert both.fastest_format(ImageFormats.sRGBA_8888) == min(
+            ImageFormats.sABGR_8888, ImageFormats.sBGRA_8888)
+
+    def test_lossy_conversions_refused(self):
+        # Other colour spaces, premultiplication, channels or depths.
+        other = profile(formats=[ImageFormats.lRGBA_8888,
+                                 ImageFormats.sRGBA_8888_PRE,
+                                 ImageFormats.sRGBX_8888,
+                                 ImageFormats.sRGBA_4444,
+                                 ImageFormats.lL_8])
+        for fmt in (ImageFormats.sBGRA_8888, ImageFormats.sL_8,
+                    ImageFormats.sRGBA_5551, ImageFormats.lBGRA_8888_PRE):
+            assert other.fastest_format(fmt) == fmt
+
+    def test_single_channel_formats(self):
+        alpha = profile(formats=[ImageFormats.A_8, ImageFormats.BW_1])
+        assert alpha.fastest_format(ImageFormats.A_4) == ImageFormats.A_4
+        assert alpha.fastest_format(ImageFormats.A_1) == ImageFormats.A_1
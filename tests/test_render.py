@@ -0,0 +1,137 @@
+'''Tests of RenderThread command queueing.'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+# Standard library imports.
+from concurrent.futures import CancelledError
+import threading
+
+# Third-party imports.
+import pytest
+
+# Local imports.
+from povg.render import RenderThread, renderer_for
+
+@pytest.fixture
+def renderer():
+    with RenderThread() as renderer:
+        yield renderer
+
+class TestRenderThread:
+    def test_runs_in_order_in_render_thread(self, renderer):
+        done = []
+        futures = [renderer.submit(done.append, n) for n in range(50)]
+        assert renderer.call(threading.get_ident) == renderer.ident
+        assert all(future.done() for future in futures)
+        assert done == list(range(50))
+        assert renderer_for(renderer.ident) is renderer
+
+    def test_order_kept_per_producer(self, renderer):
+        done = []
+        def produce(name):
+            for n in range(100):
+                renderer.submit(done.append, (name, n))
+        producers = [threading.Thread(target=produce, args=(name,))
+                     for name in 'abcd']
+        for producer in producers:
+            producer.start()
+        for producer in producers:
+            producer.join()
+        renderer.call(lambda: None)
+        for name in 'abcd':
+            assert [n for who, n in done if who == name] == list(range(100))
+
+    def test_errors_reach_the_future(self, renderer):
+        future = renderer.submit(int, 'x')
+        with pytest.raises(ValueError):
+            future.result()
+        assert renderer.call(int, '7') == 7
+
+    def test_batch_queued_when_block_ends(self, renderer):
+        with renderer.batch():
+            futures = [renderer.submit(pow, n, 2) for n in range(5)]
+            with renderer.batch():
+                futures.append(renderer.submit(pow, 5, 2))
+            # Nothing is queued until the outermost block ends.
+            assert renderer._queue.empty()
+            assert not any(future.done() for future in futures)
+        assert [future.result() for future in futures] == [
+            n ** 2 for n in range(6)]
+
+    def test_call_inside_batch(self, renderer):
+        done = []
+        with renderer.batch():
+            renderer.submit(done.append, 1)
+            # Queues what came before, and waits for it all to run.
+            assert renderer.call(done.append, 2) is None
+            assert done == [1, 2]
+            later = renderer.submit(done.append, 3)
+            assert renderer._queue.empty() and not later.done()
+        later.result()
+        assert done == [1, 2, 3]
+
+    def test_submit_from_render_thread(self, renderer):
+        def nested():
+            inner = renderer.submit(threading.get_ident)
+            return inner.done(), inner.result()
+        assert renderer.call(nested) == (True, renderer.ident)
+
+class TestStop:
+    def test_queued_commands_run_first(self):
+        release = threading.Event()
+        renderer = RenderThread()
+        renderer.start()
+        renderer.submit(release.wait)
+        futures = [renderer.submit(pow, n, 2) for n in range(5)]
+        renderer.stop(wait=False)
+        with pytest.raises(RuntimeError):
+            renderer.submit(pow, 9, 2)
+        release.set()
+        renderer.join()
+        assert [future.result() for future in futures] == [
+            n ** 2 for n in range(5)]
+        assert renderer_for(renderer.ident) is None
+
+    def test_pending_futures_cancelled(self):
+        renderer = RenderThread()
+        renderer.start()
+        with renderer.batch():
+            futures = [renderer.submit(pow, n, 2) for n in range(3)]
+            renderer.stop()
+        assert all(future.cancelled() for future in futures)
+        with pytest.raises(CancelledError):
+            futures[0].result()
+
+    def test_call_after_stop(self):
+        renderer = RenderThread()
+        renderer.start()
+        renderer.stop()
+        with pytest.raises(RuntimeError):
+            renderer.call(pow, 2, 2)
+
+    def test_setup_and_teardown(self):
+        seen = []
+        renderer = RenderThread(lambda: 'context', seen.append)
+        with renderer:
+            assert renderer.context == 'context'
+        assert seen == ['context']
+
+    def test_failed_setup(self):
+        def setup():
+            raise OSError('no display')
+        with pytest.raises(OSError):
+            RenderThread(setup).start()
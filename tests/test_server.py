@@ -0,0 +1,89 @@
+'''Tests of the render server's scenes, drawn through the fake library.'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+# Third-party imports.
+import pytest
+
+# Local imports.
+from povg import server
+from povg.server import Scene, draw_scene
+
+IDENTITY = (1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0)
+TRIANGLE = ((2, 4, 4, 0), (0.0, 0.0, 8.0, 0.0, 0.0, 6.0))
+
+@pytest.fixture(autouse=True)
+def scratch():
+    '''Give each test new scratch objects, made in its fake library.'''
+    server._scratch.clear()
+    yield
+    server._scratch.clear()
+
+def paint_colors(vg):
+    return {vg.state.paints[server._scratch[name]._as_parameter_]
+            for name in ('fill', 'stroke')}
+
+def test_round_trip(vg):
+    scene = (Scene().clear((255, 255, 255, 255))
+             .fill((255, 0, 0, 255)).stroke((0, 0, 255, 128), width=3)
+             .matrix(sx=2, sy=2, tx=5, ty=-1).path(*TRIANGLE, stroke=True)
+             .matrix().path((2, 4), (1.0, 1.0, 2.0, 2.0), fill=False,
+                            stroke=True))
+    draw_scene(scene.tobytes(), 32, 16)
+
+    # Cleared first to transparent black, then to the scene's colour.
+    assert vg.state.clears == [(0, 0, 32, 16, (0.0, 0.0, 0.0, 0.0)),
+                               (0, 0, 32, 16, (1.0, 1.0, 1.0, 1.0))]
+    assert paint_colors(vg) == {0xFF0000FF, 0x0000FF80}
+    assert vg.state.params[0x1110] == 3.0
+    # Both paths were drawn with the scratch path, with their own modes
+    # and matrices; the path now holds the last one's data.
+    (handle, modes, matrix), (handle2, modes2, matrix2) = vg.state.draws
+    assert handle == handle2 == server._scratch['path']._phandle
+    assert (modes, modes2) == (3, 1)
+    assert matrix == (2.0, 0.0, 0.0, 0.0, 2.0, 0.0, 5.0, -1.0, 1.0)
+    assert matrix2 == IDENTITY
+    assert vg.state.paths[handle]['commands'] == [2, 4]
+    assert vg.state.paths[handle]['coords'] == [1.0, 1.0, 2.0, 2.0]
+
+def test_path_data_reaches_library(vg):
+    draw_scene(Scene().path(*TRIANGLE).tobytes(), 8, 8)
+    path = vg.state.paths[server._scratch['path']._phandle]
+    assert tuple(path['commands']) == TRIANGLE[0]
+    assert tuple(path['coords']) == TRIANGLE[1]
+    assert [modes for _, modes, _ in vg.state.draws] == [2]
+
+def test_undrawn_path_is_not_drawn(vg):
+    draw_scene(Scene().path(*TRIANGLE, fill=False).tobytes(), 8, 8)
+    assert vg.state.draws == []
+
+def test_each_scene_starts_afresh(vg):
+    draw_scene(Scene().clear((9, 9, 9, 9)).fill((255, 0, 0, 255))
+               .stroke((0, 255, 0, 255), width=7).matrix(tx=10)
+               .tobytes(), 8, 8)
+    draw_scene(Scene().path(*TRIANGLE, stroke=True).tobytes(), 8, 8)
+    _, _, matrix = vg.state.draws[-1]
+    assert matrix == IDENTITY
+    assert paint_colors(vg) == {0x000000FF}
+    assert vg.state.params[0x1110] == 1.0
+    assert vg.state.clears[-1] == (0, 0, 8, 8, (0.0, 0.0, 0.0, 0.0))
+
+@pytest.mark.parametrize('data', [b'\x09', b'\x01\x00', b'\x04' + bytes(20),
+                                  Scene().path(*TRIANGLE).tobytes()[:-1]])
+def test_malformed(data):
+    with pytest.raises(ValueError):
+        draw_scene(data, 8, 8)
@@ -0,0 +1,96 @@
+'''Tests of stroke styles, and of copies made with _replace().'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+# Standard library imports.
+import pickle
+
+# Third-party imports.
+import pytest
+
+# Local imports.
+from povg.context import CapStyle
+from povg.stroke import StrokeStyle
+
+DASH_PATTERN = 0x1114
+LINE_WIDTH = 0x1110
+MAX_DASH_COUNT = 0x1161
+
+def test_new_style_is_checked_and_converted():
+    style = StrokeStyle(width=2, dash_pattern=[1, 0.1])
+    assert type(style.width) is float
+    assert style.dash_pattern == (1.0, pytest.approx(0.1, rel=1e-6))
+    for pattern in ((1, 2, 3), (1, -2)):
+        with pytest.raises(ValueError):
+            StrokeStyle(dash_pattern=pattern)
+
+@pytest.mark.parametrize('kwargs', [{'dash_pattern': (1, 2, 3)},
+                                    {'dash_pattern': (1, -2)},
+                                    {'dash_pattern': (1, 2, 3, 4),
+                                     'max_dash_count': 2}])
+def test_replace_is_checked(kwargs):
+    with pytest.raises(ValueError):
+        StrokeStyle()._replace(**kwargs)
+
+def test_replace_uses_context_limit(vg):
+    vg.state.params[MAX_DASH_COUNT] = 2
+    with pytest.raises(ValueError):
+        StrokeStyle()._replace(dash_pattern=(1, 2, 3, 4))
+    style = StrokeStyle()._replace(dash_pattern=(1, 2, 3, 4),
+                                   max_dash_count=4)
+    assert style.dash_pattern == (1.0, 2.0, 3.0, 4.0)
+
+def test_replace_converts_like_new():
+    style = StrokeStyle()._replace(width=3, dash_pattern=[4, 0.1],
+                                   dash_phase_reset=1)
+    assert style == StrokeStyle(width=3, dash_pattern=[4, 0.1],
+                                dash_phase_reset=1)
+    assert type(style.width) is float and style.dash_phase_reset is True
+    assert isinstance(style.dash_pattern, tuple)
+    with pytest.raises(TypeError):
+        StrokeStyle()._replace(colour=1)
+
+def test_make():
+    style = StrokeStyle(width=5, cap=CapStyle.ROUND, dash_pattern=(2, 2))
+    assert StrokeStyle._make(list(style)) == style
+    with pytest.raises(ValueError):
+        StrokeStyle._make([1.0, CapStyle.BUTT, style.join, 4.0, (1,), 0.0,
+                           False])
+
+def test_subclass_is_kept():
+    class Thick(StrokeStyle):
+        pass
+    assert type(Thick(width=9)._replace(dash_pattern=(1, 1))) is Thick
+
+def test_pickle():
+    style = StrokeStyle(width=2, dash_pattern=(3, 1), dash_phase=0.5)
+    assert pickle.loads(pickle.dumps(style)) == style
+
+def test_copy_applies_its_own_pattern(vg):
+    dashed = StrokeStyle(dash_pattern=(3, 1))
+    dashed.apply()
+    assert vg.state.params[DASH_PATTERN] == (3.0, 1.0)
+    copy = dashed._replace(dash_pattern=(5, 5, 1, 1))
+    copy.apply()
+    assert vg.state.params[DASH_PATTERN] == (5.0, 5.0, 1.0, 1.0)
+    # Only what changed is set.
+    vg.calls.clear()
+    copy._replace(width=4).apply()
+    assert vg.calls['vgSetf'] == 1 and not vg.calls['vgSetfv']
+    assert vg.state.params[LINE_WIDTH] == 4.0
+    dashed.apply()
+    assert vg.state.params[DASH_PATTERN] == (3.0, 1.0)
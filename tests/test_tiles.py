@@ -0,0 +1,88 @@
+'''Tests of splitting an image into tiles, and rendering it tile by tile.'''
+# Copyright © 2014 Tim Pederick.
+#
+# This file is part of Povg.
+#
+# Povg is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Povg is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public
+# License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Povg. If not, see <http://www.gnu.org/licenses/>.
+
+# Third-party imports.
+import pytest
+
+# Local imports.
+from povg import native
+from povg.tiles import Tile, TiledRenderer, tile_grid
+
+PATH_MATRIX = 0x1400
+IDENTITY = (1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0)
+
+@pytest.mark.parametrize('size', [(5, 3, 2, 2), (8, 8, 4, 4), (1, 9, 4, 4),
+                                  (7, 5, 10, 10)])
+def test_tile_grid_covers_exactly(size):
+    width, height, tile_width, tile_height = size
+    tiles = tile_grid(width, height, tile_width, tile_height)
+    covered = [(x, y) for tile in tiles
+               for x in range(tile.x, tile.x + tile.width)
+               for y in range(tile.y, tile.y + tile.height)]
+    # Every pixel, each exactly once.
+    assert sorted(covered) == [(x, y) for x in range(width)
+                               for y in range(height)]
+    for tile in tiles:
+        assert 0 < tile.width <= tile_width
+        assert 0 < tile.height <= tile_height
+    # Bottom row first, left to right.
+    assert tiles == sorted(tiles, key=lambda tile: (tile.y, tile.x))
+
+def test_tile_size_required_without_farm():
+    with pytest.raises(ValueError):
+        TiledRenderer(10, 10)
+    assert TiledRenderer(10, 10, 4, 4).tiles[-1] == Tile(8, 8, 2, 2)
+
+def draw():
+    native.vgDrawPath(1, 0x4)
+
+def test_render_shifts_each_tile(vg):
+    renderer = TiledRenderer(5, 3, 2, 2)
+    for n, (tile, pixels) in enumerate(renderer.render(draw,
+                                                       clear_color=(1, 0,
+                                                                    0, 1))):
+        # Drawn with the tile at the origin, after clearing just the tile
+        # to the given colour.
+        _, _, matrix = vg.state.draws[-1]
+        assert matrix[6:8] == (-tile.x, -tile.y)
+        assert vg.state.clears[-1] == (0, 0, tile.width, tile.height,
+                                       (1.0, 0.0, 0.0, 1.0))
+        assert bytes(pixels) == bytes((n + 1,)) * (tile.width *
+                                                   tile.height * 4)
+        # The context is left as it was found, once the restored
+        # matrices are sent.
+        native.flush_matrices()
+        assert vg.state.matrices[PATH_MATRIX] == IDENTITY
+        assert vg.state.params[0x1121] == (0.0, 0.0, 0.0, 0.0)
+    assert len(vg.state.draws) == len(renderer.tiles)
+
+def test_render_into_places_tiles(vg):
+    renderer = TiledRenderer(5, 3, 2, 2)
+    target = bytearray(5 * 3 * 4)
+    renderer.render_into(target, draw)
+    for row in range(3):
+        for x in range(5):
+            # The target runs from the top row down; tiles from the bottom.
+            y = 2 - row
+            number = next(n for n, tile in enumerate(renderer.tiles)
+                          if tile.x <= x < tile.x + tile.width and
+                          tile.y <= y < tile.y + tile.height)
+            start = (row * 5 + x) * 4
+            assert target[start:start + 4] == bytes((number + 1,)) * 4
+    with pytest.raises(ValueError):
+        renderer.render_into(bytearray(10), draw)